@@ -90,9 +90,9 @@ def run(algo_interface):
             func_name="logistic_regression.logistic_loss",
             positional_args={"v1": y, "v2": s},
         )  # newlogloss = logistic_loss(y, s)
-        newlogloss = sum(
-            newlogloss.get_table_data()
-        )  # is not a single value, its one value per local node
+        # is not a single value, its one value per local node
+        (newlogloss,) = newlogloss.get_table_data()
+        newlogloss = newlogloss.sum()
 
         # ******** Global part ******** #
         hessian_global = run_on_global(
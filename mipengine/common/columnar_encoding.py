@@ -0,0 +1,237 @@
+"""
+Columnar binary encoding of table data, an alternative to TableData's json.
+
+An encoded table is made of a json header, with the schema and the layout of
+the columns, followed by the zlib compressed column buffers:
+    <header size: uint32><header: json><compressed buffers>
+
+Numeric columns are stored as little endian numpy buffers. Text columns are
+stored as their concatenated utf-8 values plus the int32 offsets of each
+value. Columns holding NULLs carry an extra uint8 null mask.
+
+The numeric columns are decoded as numpy arrays that are views over the
+decompressed buffer, without copying. Text columns are decoded to object
+arrays. Columns with NULLs are decoded as masked arrays.
+"""
+import base64
+import json
+import struct
+import zlib
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import Union
+
+import numpy
+
+from mipengine.common.node_tasks_DTOs import TableSchema
+
+HEADER_SIZE_FORMAT = "<I"
+NUMERIC_DTYPES = {"int": "<i8", "real": "<f8"}
+OFFSETS_DTYPE = "<i4"
+NULL_MASK_DTYPE = "u1"
+COMPRESSION_LEVEL = 1
+
+
+def encode_table_data(
+    schema: TableSchema, data: List[List[Union[str, int, float, bool]]]
+) -> bytes:
+    """
+    Encodes the rows of a table, in the columnar format.
+
+    Parameters
+    ----------
+    schema : TableSchema
+        The schema of the table
+    data : List[List[Union[str, int, float, bool]]]
+        The rows of the table
+
+    Returns
+    ------
+    bytes
+        The encoded table.
+    """
+    columns_values = list(zip(*data)) if data else [() for _ in schema.columns]
+
+    columns_layout = []
+    buffers = []
+    for column, values in zip(schema.columns, columns_values):
+        null_mask = numpy.fromiter(
+            (value is None for value in values), dtype=NULL_MASK_DTYPE, count=len(data)
+        )
+        has_nulls = bool(null_mask.any())
+        if column.data_type in NUMERIC_DTYPES:
+            column_buffers = [
+                _encode_numeric_values(values, NUMERIC_DTYPES[column.data_type])
+            ]
+        else:
+            column_buffers = _encode_text_values(values)
+        if has_nulls:
+            column_buffers.append(null_mask.tobytes())
+        columns_layout.append(
+            {
+                "has_nulls": has_nulls,
+                "buffer_sizes": [len(buffer) for buffer in column_buffers],
+            }
+        )
+        buffers.extend(column_buffers)
+
+    header = json.dumps(
+        {
+            "schema": schema.to_dict(),
+            "row_count": len(data),
+            "columns": columns_layout,
+        }
+    ).encode()
+    return (
+        struct.pack(HEADER_SIZE_FORMAT, len(header))
+        + header
+        + zlib.compress(b"".join(buffers), COMPRESSION_LEVEL)
+    )
+
+
+def decode_table_data(
+    encoded_table_data: bytes,
+) -> Tuple[TableSchema, Dict[str, numpy.ndarray]]:
+    """
+    Decodes a table encoded by encode_table_data.
+
+    Parameters
+    ----------
+    encoded_table_data : bytes
+        The encoded table
+
+    Returns
+    ------
+    Tuple[TableSchema, Dict[str, numpy.ndarray]]
+        The schema of the table and its columns, keyed by column name.
+    """
+    (header_size,) = struct.unpack_from(HEADER_SIZE_FORMAT, encoded_table_data)
+    header_end = struct.calcsize(HEADER_SIZE_FORMAT) + header_size
+    header = json.loads(
+        encoded_table_data[struct.calcsize(HEADER_SIZE_FORMAT) : header_end]
+    )
+    buffers = memoryview(zlib.decompress(encoded_table_data[header_end:]))
+
+    schema = TableSchema.from_dict(header["schema"])
+    row_count = header["row_count"]
+
+    columns = {}
+    position = 0
+    for column, layout in zip(schema.columns, header["columns"]):
+        column_buffers = []
+        for buffer_size in layout["buffer_sizes"]:
+            column_buffers.append(buffers[position : position + buffer_size])
+            position += buffer_size
+
+        if layout["has_nulls"]:
+            null_mask = numpy.frombuffer(column_buffers.pop(), dtype=NULL_MASK_DTYPE)
+        if column.data_type in NUMERIC_DTYPES:
+            (values_buffer,) = column_buffers
+            values = numpy.frombuffer(
+                values_buffer, dtype=NUMERIC_DTYPES[column.data_type]
+            )
+        else:
+            values = _decode_text_values(*column_buffers, row_count)
+
+        if layout["has_nulls"]:
+            if column.data_type in NUMERIC_DTYPES:
+                values = numpy.ma.masked_array(values, mask=null_mask.astype(bool))
+            else:
+                values[null_mask.astype(bool)] = None
+        columns[column.name] = values
+
+    return schema, columns
+
+
+def encode_table_data_b64(
+    schema: TableSchema, data: List[List[Union[str, int, float, bool]]]
+) -> str:
+    """
+    Encodes a table like encode_table_data, as a base64 string, so that it can
+    be sent with the json serializer the celery apps are configured with.
+    """
+    return base64.b64encode(encode_table_data(schema, data)).decode()
+
+
+def decode_table_data_b64(
+    encoded_table_data: str,
+) -> Tuple[TableSchema, Dict[str, numpy.ndarray]]:
+    return decode_table_data(base64.b64decode(encoded_table_data))
+
+
+def columns_to_rows(
+    schema: TableSchema, columns: Dict[str, numpy.ndarray]
+) -> List[List[Union[str, int, float, bool]]]:
+    """
+    Converts decoded columns back to the rows format of TableData, with None
+    in place of the NULLs.
+    """
+    columns_values = [columns[column.name].tolist() for column in schema.columns]
+    return [list(row) for row in zip(*columns_values)]
+
+
+def rows_to_columns(
+    schema: TableSchema, data: List[List[Union[str, int, float, bool]]]
+) -> Dict[str, numpy.ndarray]:
+    """
+    Converts the rows of TableData to columns, with the same dtypes as the
+    ones decode_table_data returns.
+    """
+    columns_values = list(zip(*data)) if data else [() for _ in schema.columns]
+
+    columns = {}
+    for column, values in zip(schema.columns, columns_values):
+        if column.data_type in NUMERIC_DTYPES:
+            null_mask = numpy.fromiter(
+                (value is None for value in values), dtype=bool, count=len(values)
+            )
+            array = numpy.fromiter(
+                (0 if value is None else value for value in values),
+                dtype=NUMERIC_DTYPES[column.data_type],
+                count=len(values),
+            )
+            if null_mask.any():
+                array = numpy.ma.masked_array(array, mask=null_mask)
+        else:
+            array = numpy.empty(len(values), dtype=object)
+            array[:] = values
+        columns[column.name] = array
+    return columns
+
+
+def concatenate_columns(columns: List[numpy.ndarray]) -> numpy.ndarray:
+    """
+    Concatenates the parts of a column, keeping the NULLs masked if any of
+    the parts has NULLs.
+    """
+    if any(isinstance(column, numpy.ma.MaskedArray) for column in columns):
+        return numpy.ma.concatenate(columns)
+    return numpy.concatenate(columns)
+
+
+def _encode_numeric_values(values, dtype) -> bytes:
+    return numpy.fromiter(
+        (0 if value is None else value for value in values),
+        dtype=dtype,
+        count=len(values),
+    ).tobytes()
+
+
+def _encode_text_values(values) -> List[bytes]:
+    encoded_values = [b"" if value is None else str(value).encode() for value in values]
+    offsets = numpy.zeros(len(encoded_values) + 1, dtype=OFFSETS_DTYPE)
+    numpy.cumsum(
+        [len(encoded_value) for encoded_value in encoded_values],
+        out=offsets[1:],
+    )
+    return [b"".join(encoded_values), offsets.tobytes()]
+
+
+def _decode_text_values(data_buffer, offsets_buffer, row_count) -> numpy.ndarray:
+    offsets = numpy.frombuffer(offsets_buffer, dtype=OFFSETS_DTYPE)
+    data = bytes(data_buffer)
+    values = numpy.empty(row_count, dtype=object)
+    for index in range(row_count):
+        values[index] = data[offsets[index] : offsets[index + 1]].decode()
+    return values
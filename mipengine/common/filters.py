@@ -0,0 +1,227 @@
+"""
+Compiles the filters of an experiment, given in the jQuery QueryBuilder
+format (https://querybuilder.js.org/), to a sql WHERE clause.
+
+A filter is a tree of groups and rules:
+    {"condition": "AND", "rules": [
+        {"id": "age_value", "operator": "greater", "value": 20},
+        {"condition": "OR", "rules": [...]},
+    ]}
+
+The fields of the rules are checked against the common data elements of the
+pathology, so they can be used as identifiers in the query. The values never
+become part of the query text, they are returned as pyformat parameters to
+be escaped by the db driver.
+"""
+import json
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from mipengine.common.common_data_elements import CommonDataElement
+from mipengine.common.common_data_elements import common_data_elements
+
+CONDITIONS = {"AND", "OR"}
+COMPARISON_OPERATORS = {
+    "equal": "=",
+    "not_equal": "<>",
+    "less": "<",
+    "less_or_equal": "<=",
+    "greater": ">",
+    "greater_or_equal": ">=",
+}
+LIKE_OPERATORS = {
+    "begins_with": ("LIKE", "{}%"),
+    "not_begins_with": ("NOT LIKE", "{}%"),
+    "contains": ("LIKE", "%{}%"),
+    "not_contains": ("NOT LIKE", "%{}%"),
+    "ends_with": ("LIKE", "%{}"),
+    "not_ends_with": ("NOT LIKE", "%{}"),
+}
+LIKE_ESCAPE_CHARACTER = "#"
+ENUMERATED_VALUE_OPERATORS = {"equal", "not_equal", "in", "not_in"}
+
+
+def load_filters(filters_json: Optional[Union[str, dict]]) -> Optional[dict]:
+    """
+    Returns the filters given either as a json string or already decoded,
+    or None when there are no filters.
+    """
+    if not filters_json:
+        return None
+    if isinstance(filters_json, str):
+        try:
+            filters_json = json.loads(filters_json)
+        except json.JSONDecodeError:
+            raise ValueError(f"Filters are not valid json: {filters_json}")
+    if not isinstance(filters_json, dict):
+        raise ValueError(f"Filters should be an object, got: {filters_json}")
+    return filters_json or None
+
+
+def build_filter_clause(filters: dict, pathology: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Compiles a QueryBuilder filter to a sql boolean expression.
+
+    Parameters
+    ----------
+    filters : dict
+        The root group of the QueryBuilder filter
+    pathology : str
+        The pathology whose common data elements the rules refer to
+
+    Returns
+    ------
+    Tuple[str, Dict[str, Any]]
+        The expression, with %(name)s placeholders in place of the values,
+        and the values of the placeholders.
+
+    Raises
+    ------
+    ValueError
+        If the filter is malformed or does not match the common data elements.
+    """
+    if pathology not in common_data_elements.pathologies:
+        raise ValueError(f"Pathology '{pathology}' does not exist.")
+    compiler = _FilterCompiler(common_data_elements.pathologies[pathology])
+    clause = compiler.compile_group(filters)
+    return clause, compiler.parameters
+
+
+def validate_filters(filters: Optional[dict], pathology: str):
+    """
+    Raises ValueError if the filters can not be applied on the pathology.
+    """
+    if filters:
+        build_filter_clause(filters, pathology)
+
+
+class _FilterCompiler:
+    def __init__(self, cdes: Dict[str, CommonDataElement]):
+        self._cdes = cdes
+        self.parameters = {}
+
+    def compile_group(self, group: Any) -> str:
+        if not isinstance(group, dict) or "rules" not in group:
+            raise ValueError(f"Filter group should have rules, got: {group}")
+        condition = str(group.get("condition", "AND")).upper()
+        if condition not in CONDITIONS:
+            raise ValueError(
+                f"Filter condition should be one of {CONDITIONS}, got: {condition}"
+            )
+        rules = group["rules"]
+        if not isinstance(rules, list) or not rules:
+            raise ValueError(f"Filter group should have a list of rules: {group}")
+
+        clauses = [
+            self.compile_group(rule)
+            if isinstance(rule, dict) and "rules" in rule
+            else self.compile_rule(rule)
+            for rule in rules
+        ]
+        clause = "(" + f" {condition} ".join(clauses) + ")"
+        if group.get("not"):
+            clause = f"NOT {clause}"
+        return clause
+
+    def compile_rule(self, rule: Any) -> str:
+        if not isinstance(rule, dict):
+            raise ValueError(f"Filter rule should be an object, got: {rule}")
+        field = rule.get("field", rule.get("id"))
+        if field not in self._cdes:
+            raise ValueError(f"Filter field '{field}' is not a common data element.")
+        cde = self._cdes[field]
+        operator = rule.get("operator")
+        value = rule.get("value")
+
+        if operator in COMPARISON_OPERATORS:
+            parameter = self._add_parameter(self._cast(value, cde, operator))
+            return f"{field} {COMPARISON_OPERATORS[operator]} {parameter}"
+        if operator in ("in", "not_in"):
+            values = self._get_values(value, operator)
+            parameters = ", ".join(
+                self._add_parameter(self._cast(value, cde, operator))
+                for value in values
+            )
+            sql_operator = "IN" if operator == "in" else "NOT IN"
+            return f"{field} {sql_operator} ({parameters})"
+        if operator in ("between", "not_between"):
+            values = self._get_values(value, operator)
+            if len(values) != 2:
+                raise ValueError(f"Filter operator '{operator}' needs two values.")
+            lower, upper = (
+                self._add_parameter(self._cast(value, cde, operator))
+                for value in values
+            )
+            sql_operator = "BETWEEN" if operator == "between" else "NOT BETWEEN"
+            return f"{field} {sql_operator} {lower} AND {upper}"
+        if operator == "is_null":
+            return f"{field} IS NULL"
+        if operator == "is_not_null":
+            return f"{field} IS NOT NULL"
+        if operator in LIKE_OPERATORS or operator in ("is_empty", "is_not_empty"):
+            if cde.sql_type != "text":
+                raise ValueError(
+                    f"Filter operator '{operator}' can only be used on text fields."
+                )
+            if operator == "is_empty":
+                return f"{field} = ''"
+            if operator == "is_not_empty":
+                return f"{field} <> ''"
+            sql_operator, pattern = LIKE_OPERATORS[operator]
+            parameter = self._add_parameter(
+                pattern.format(_escape_like(self._cast(value, cde, operator)))
+            )
+            return (
+                f"{field} {sql_operator} {parameter} "
+                f"ESCAPE '{LIKE_ESCAPE_CHARACTER}'"
+            )
+        raise ValueError(f"Filter operator '{operator}' is not supported.")
+
+    def _add_parameter(self, value) -> str:
+        name = f"p{len(self.parameters)}"
+        self.parameters[name] = value
+        return f"%({name})s"
+
+    @staticmethod
+    def _get_values(value, operator) -> List:
+        if not isinstance(value, list) or not value:
+            raise ValueError(f"Filter operator '{operator}' needs a list of values.")
+        return value
+
+    @staticmethod
+    def _cast(value, cde: CommonDataElement, operator: str):
+        if isinstance(value, bool) or value is None or isinstance(value, (list, dict)):
+            raise ValueError(f"Filter value '{value}' is not a valid {cde.sql_type}.")
+        try:
+            if cde.sql_type == "int":
+                if isinstance(value, float) and not value.is_integer():
+                    raise ValueError
+                value = int(value)
+            elif cde.sql_type == "real":
+                value = float(value)
+            else:
+                value = str(value)
+        except ValueError:
+            raise ValueError(f"Filter value '{value}' is not a valid {cde.sql_type}.")
+
+        if (
+            cde.categorical
+            and cde.enumerations
+            and operator in ENUMERATED_VALUE_OPERATORS
+            and str(value) not in cde.enumerations
+        ):
+            raise ValueError(
+                f"Filter value '{value}' is not one of the enumerations of the field: "
+                f"{sorted(cde.enumerations)}"
+            )
+        return value
+
+
+def _escape_like(value: str) -> str:
+    for character in (LIKE_ESCAPE_CHARACTER, "%", "_"):
+        value = value.replace(character, LIKE_ESCAPE_CHARACTER + character)
+    return value
@@ -1,5 +1,7 @@
 import importlib.resources as pkg_resources
+import os
 from dataclasses import dataclass
+from pathlib import Path
 from typing import List
 
 from dataclasses_json import dataclass_json
@@ -7,6 +9,9 @@ from dataclasses_json import dataclass_json
 from mipengine.common import resources
 from mipengine.common.node_exceptions import InvalidNodeId
 
+# The node catalog is read from this file, if set, instead of the one of the package
+NODE_CATALOG_PATH_ENV_VAR = "MIPENGINE_NODE_CATALOG_PATH"
+
 
 @dataclass_json
 @dataclass
@@ -51,7 +56,13 @@ class Nodes:
 
 class NodeCatalog:
     def __init__(self):
-        node_catalog_content = pkg_resources.read_text(resources, "node_catalog.json")
+        node_catalog_path = os.environ.get(NODE_CATALOG_PATH_ENV_VAR)
+        if node_catalog_path:
+            node_catalog_content = Path(node_catalog_path).read_text()
+        else:
+            node_catalog_content = pkg_resources.read_text(
+                resources, "node_catalog.json"
+            )
         self._nodes: Nodes = Nodes.from_json(node_catalog_content)
 
         for local_node in self._nodes.localNodes:
@@ -1,7 +1,9 @@
 from dataclasses import dataclass
+from dataclasses import field
 from typing import Any
 from typing import Dict
 from typing import List
+from typing import Optional
 from typing import Union
 
 from dataclasses_json import dataclass_json
@@ -79,6 +81,19 @@ class TableData:
     data: List[List[Union[str, int, float, bool]]]
 
 
+@dataclass_json
+@dataclass
+class TableDataPage:
+    """
+    A page of a table's data. next_cursor is passed to get the next page and
+    it is None on the last page.
+    """
+
+    schema: TableSchema
+    data: List[List[Union[str, int, float, bool]]]
+    next_cursor: Optional[str] = None
+
+
 @dataclass_json
 @dataclass
 class UDFArgument:
@@ -86,8 +101,71 @@ class UDFArgument:
     value: Any
 
     def __post_init__(self):
-        allowed_types = {"table", "literal"}
+        allowed_types = {"table", "literal", "step_result"}
         if self.type not in allowed_types:
             raise TypeError(
                 f"UDFArgument type  can have one of the following types: {allowed_types}"
             )
+
+
+@dataclass_json
+@dataclass
+class UDFPipelineStep:
+    """
+    A udf invocation of a udf pipeline. An argument of type "step_result" has
+    as value the index of an earlier step, whose result table it refers to.
+    """
+
+    command_id: str
+    func_name: str
+    positional_args: List[UDFArgument]
+    keyword_args: Dict[str, UDFArgument] = field(default_factory=dict)
+
+
+@dataclass_json
+@dataclass
+class UDFExecutionResult:
+    """
+    The result table of a udf execution, with its schema, its number of rows
+    and the time, in seconds, the udf took to run.
+
+    An inline result has no table, nor schema, its rows are in data instead.
+    """
+
+    table_name: Optional[str]
+    schema: Optional[TableSchema]
+    row_count: int
+    execution_time: float
+    data: Optional[List[List[Union[str, int, float, bool]]]] = None
+
+
+@dataclass_json
+@dataclass
+class ColumnStatistics:
+    """
+    Summary statistics of the values of a column in a dataset, computed when
+    the data are imported.
+
+    The sums, the min and the max are kept for numeric columns and the
+    frequencies of the values for categorical columns. The histogram counts
+    the values in equal bins between the bin edges, set by the min
+    and max of the column's cde, and is kept only for numeric cdes that have both.
+    """
+
+    dataset: str
+    column: str
+    count: int = 0
+    nulls: int = 0
+    sum: Optional[float] = None
+    sum_of_squares: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    frequencies: Optional[Dict[str, int]] = None
+    histogram: Optional[List[int]] = None
+    histogram_bin_edges: Optional[List[float]] = None
+
+
+@dataclass_json
+@dataclass
+class DatasetsStatistics:
+    columns: List[ColumnStatistics]
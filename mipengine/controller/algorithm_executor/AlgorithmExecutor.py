@@ -1,18 +1,34 @@
 from __future__ import annotations
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 
 import datetime
+import json
 import random
 import importlib
+import weakref
+from numbers import Number
 
-from celery import Celery
-
+import numpy
 
+from mipengine import config
 from mipengine.common.node_catalog import NodeCatalog
+from mipengine.common.columnar_encoding import concatenate_columns
+from mipengine.common.columnar_encoding import decode_table_data_b64
+from mipengine.common.columnar_encoding import rows_to_columns
+from mipengine.controller.celery_app import celery_app_registry
+from mipengine.controller.algorithm_executor.table_schema_cache import (
+    TableSchemaCache,
+    create_table_schema_cache,
+)
 from mipengine.controller.api.DTOs.AlgorithmRequestDTO import AlgorithmRequestDTO
 from mipengine.common.node_tasks_DTOs import ColumnInfo, TableSchema, TableInfo
 from mipengine.common.node_tasks_DTOs import TableView, TableData
+from mipengine.common.node_tasks_DTOs import TableDataPage
+from mipengine.common.node_tasks_DTOs import ColumnStatistics
+from mipengine.common.node_tasks_DTOs import DatasetsStatistics
 from mipengine.common.node_tasks_DTOs import UDFArgument
+from mipengine.common.node_tasks_DTOs import UDFExecutionResult
+from mipengine.common.node_tasks_DTOs import UDFPipelineStep
 
 # DEBUG
 import pdb
@@ -22,6 +38,20 @@ import time
 # TODO: TASK_TIMEOUT
 
 ALGORITHMS_FOLDER = "mipengine.algorithms"
+MIN_TASK_TIMEOUT = 0.01
+TASKS_POLLING_INTERVAL = 0.005
+MAX_TASKS_POLLING_INTERVAL = 0.1
+REPR_ROWS = 20
+
+# sql_linalg elementwise UDFs that can be fused, mapped to their operator
+FUSIBLE_UDFS = {
+    "sql.tensor1_mult": "*",
+    "sql.tensor1_add": "+",
+    "sql.tensor1_sub": "-",
+    "sql.tensor1_div": "/",
+    "sql.const_tensor1_sub": "-",
+}
+FUSED_UDF = "sql.fused_tensor1"
 
 
 class TableName:
@@ -60,6 +90,22 @@ class TableName:
         return self.full_table_name
 
 
+class NodeTasksFailedException(Exception):
+    def __init__(self, failed_nodes):
+        self.failed_nodes = failed_nodes
+        self.message = f"Tasks failed on nodes ->{failed_nodes}"
+        super().__init__(self.message)
+
+
+class NodeDownAlgorithmExecutionException(Exception):
+    def __init__(self, failed_nodes):
+        self.failed_nodes = failed_nodes
+        self.message = (
+            f"The algorithm cannot be executed, nodes are down ->{failed_nodes}"
+        )
+        super().__init__(self.message)
+
+
 class AlgorithmExecutor:
     def __init__(self, algorithm_name: str, algorithm_request_dto: AlgorithmRequestDTO):
 
@@ -72,26 +118,17 @@ class AlgorithmExecutor:
             algorithm_request_dto.inputdata.datasets
         )
 
+        table_schema_cache = create_table_schema_cache()
+
         # instantiate the GLOBAL Node object
         self.global_node = self.Node(
             node_id=global_node.nodeId,
             rabbitmq_url=global_node.rabbitmqURL,
             monetdb_socket_addr=f"{global_node.monetdbHostname}:{global_node.monetdbPort}",
             context_id=self.context_id,
+            table_schema_cache=table_schema_cache,
         )
 
-        # adding dataset column to the initial view tables
-        # algorithm_request_dto.inputdata.x.append("dataset")
-        # algorithm_request_dto.inputdata.y.append("dataset")
-        initial_view_tables_params = {
-            "commandId": get_next_command_id(),
-            "pathology": algorithm_request_dto.inputdata.pathology,
-            "datasets": algorithm_request_dto.inputdata.datasets,
-            "x": algorithm_request_dto.inputdata.x,
-            "y": algorithm_request_dto.inputdata.y,
-            "filters": algorithm_request_dto.inputdata.filters,
-        }
-
         # instantiate the LOCAL Node objects
         self.local_nodes = []
         for local_node in local_nodes:
@@ -100,15 +137,19 @@ class AlgorithmExecutor:
                     node_id=local_node.nodeId,
                     rabbitmq_url=local_node.rabbitmqURL,
                     monetdb_socket_addr=f"{local_node.monetdbHostname}:{local_node.monetdbPort}",
-                    initial_view_tables_params=initial_view_tables_params,
                     context_id=self.context_id,
+                    table_schema_cache=table_schema_cache,
                 )
             )
 
+        self._create_initial_views(algorithm_request_dto)
+
         self.execution_interface = self.AlgorithmExecutionInterface(
             global_node=self.global_node,
             local_nodes=self.local_nodes,
             algorithm_name=self.algorithm_name,
+            deferred=config.controller.deferred_execution,
+            drop_unreachable_tables=config.controller.drop_unreachable_tables,
         )
 
         # import the algorithm flow module
@@ -116,6 +157,42 @@ class AlgorithmExecutor:
             f"{ALGORITHMS_FOLDER}.{self.algorithm_name}"
         )
 
+    def _create_initial_views(self, algorithm_request_dto: AlgorithmRequestDTO):
+        # adding dataset column to the initial view tables
+        # algorithm_request_dto.inputdata.x.append("dataset")
+        # algorithm_request_dto.inputdata.y.append("dataset")
+        # the views of all the variable sets are created on all the local
+        # nodes concurrently, with a single task per node
+        command_id = str(get_next_command_id())
+        tasks = {
+            node: node.queue_create_initial_views(
+                command_id=command_id,
+                pathology=algorithm_request_dto.inputdata.pathology,
+                datasets=algorithm_request_dto.inputdata.datasets,
+                variables={
+                    "x": algorithm_request_dto.inputdata.x,
+                    "y": algorithm_request_dto.inputdata.y,
+                },
+                filters=algorithm_request_dto.inputdata.filters,
+            )
+            for node in self.local_nodes
+        }
+        try:
+            for node, task in as_completed(
+                tasks, timeout=config.controller.celery_tasks_timeout
+            ):
+                node.initial_view_tables = {
+                    variable: TableName(view_name)
+                    for variable, view_name in task.get().items()
+                }
+        except NodeTasksFailedException as exc:
+            # the experiment cannot run without all of its nodes, the views
+            # created on the rest of them are dropped
+            for node in self.local_nodes:
+                if node not in exc.failed_nodes:
+                    node.clean_up()
+            raise NodeDownAlgorithmExecutionException(exc.failed_nodes) from exc
+
     def run(self):
         algorithm_result = self.algorithm_flow_module.run(self.execution_interface)
 
@@ -124,6 +201,7 @@ class AlgorithmExecutor:
         return algorithm_result
 
     def clean_up(self):
+        self.execution_interface.detach_table_finalizers()
         self.global_node.clean_up()
         [node.clean_up() for node in self.local_nodes]
 
@@ -134,17 +212,21 @@ class AlgorithmExecutor:
             rabbitmq_url,
             monetdb_socket_addr,
             context_id,
-            initial_view_tables_params=None,
+            table_schema_cache=None,
         ):
 
             self.node_id = node_id
 
-            # TODO: user, pass, vhost how these should be set??
-            user = "user"
-            password = "password"
-            vhost = "user_vhost"
-            broker = f"amqp://{user}:{password}@{rabbitmq_url}/{vhost}"
-            self.__celery_obj = Celery(broker=broker, backend="rpc://")
+            # the schemas of the tables, shared with the other nodes of the
+            # experiment, filled by every task result that implies a schema
+            self.table_schema_cache = table_schema_cache or TableSchemaCache()
+
+            # the row counts of the udf result tables, {table name: row count}
+            self.table_row_counts = {}
+
+            self.__celery_obj = celery_app_registry.get_celery_app(
+                node_id=node_id, rabbitmq_url=rabbitmq_url
+            )
 
             self.monetdb_socket_addr = monetdb_socket_addr
 
@@ -154,24 +236,27 @@ class AlgorithmExecutor:
                 "get_table": "mipengine.node.tasks.tables.get_tables",
                 "get_table_schema": "mipengine.node.tasks.common.get_table_schema",
                 "get_table_data": "mipengine.node.tasks.common.get_table_data",
+                "get_table_data_columnar": "mipengine.node.tasks.common.get_table_data_columnar",
+                "get_table_data_page": "mipengine.node.tasks.common.get_table_data_page",
                 "create_table": "mipengine.node.tasks.tables.create_table",
                 "get_views": "mipengine.node.tasks.views.get_views",
                 "create_view": "mipengine.node.tasks.views.create_view",
+                "create_initial_views": "mipengine.node.tasks.views.create_initial_views",
                 "get_remote_tables": "mipengine.node.tasks.remote_tables.get_remote_tables",
                 "create_remote_table": "mipengine.node.tasks.remote_tables.create_remote_table",
                 "get_merge_tables": "mipengine.node.tasks.merge_tables.get_merge_tables",
                 "create_merge_table": "mipengine.node.tasks.merge_tables.create_merge_table",
                 "get_udfs": "mipengine.node.tasks.udfs.get_udfs",
                 "run_udf": "mipengine.node.tasks.udfs.run_udf",
+                "run_udf_pipeline": "mipengine.node.tasks.udfs.run_udf_pipeline",
                 "get_run_udf_query": "mipengine.node.tasks.udfs.get_run_udf_query",
+                "drop_tables": "mipengine.node.tasks.common.drop_tables",
                 "clean_up": "mipengine.node.tasks.common.clean_up",
+                "get_datasets_statistics": "mipengine.node.tasks.statistics.get_datasets_statistics",
             }
 
+            # the views of the variable sets, {variable set name: TableName}
             self.__initial_view_tables = None
-            if initial_view_tables_params is not None:
-                self.__initial_view_tables = self.__create_initial_view_tables(
-                    initial_view_tables_params
-                )
 
         def __repr__(self):
             return f"node_id: {self.node_id}"
@@ -180,38 +265,9 @@ class AlgorithmExecutor:
         def initial_view_tables(self):
             return self.__initial_view_tables
 
-        def __create_initial_view_tables(self, initial_view_tables_params):
-
-            # will contain the views created from the pathology, datasets. Its keys are the variable sets x, y etc
-            initial_view_tables = {}
-
-            # initial view for variables in X
-            variable = "x"
-            command_id = str(initial_view_tables_params["commandId"]) + variable
-            view_name = self.create_view(
-                command_id=command_id,
-                pathology=initial_view_tables_params["pathology"],
-                datasets=initial_view_tables_params["datasets"],
-                columns=initial_view_tables_params[variable],
-                filters=initial_view_tables_params["filters"],
-            )
-
-            initial_view_tables["x"] = view_name
-
-            # initial view for variables in Y
-            variable = "y"
-            command_id = str(initial_view_tables_params["commandId"]) + variable
-            view_name = self.create_view(
-                command_id=command_id,
-                pathology=initial_view_tables_params["pathology"],
-                datasets=initial_view_tables_params["datasets"],
-                columns=initial_view_tables_params[variable],
-                filters=initial_view_tables_params["filters"],
-            )
-
-            initial_view_tables["y"] = view_name
-
-            return initial_view_tables
+        @initial_view_tables.setter
+        def initial_view_tables(self, initial_view_tables: Dict[str, TableName]):
+            self.__initial_view_tables = initial_view_tables
 
         # TABLES functionality
         def get_tables(self) -> List[TableName]:
@@ -222,18 +278,118 @@ class AlgorithmExecutor:
             return [TableName(table_name) for table_name in result]
 
         def get_table_schema(self, table_name: TableName):
+            schema = self.table_schema_cache.get(table_name.full_table_name)
+            if schema is None:
+                result = self.queue_get_table_schema(table_name).get()
+                schema = TableSchema.from_json(result)
+                self.table_schema_cache.put(table_name.full_table_name, schema)
+            return schema
+
+        def queue_get_table_schema(self, table_name: TableName) -> "AsyncResult":
             task_signature = self.__celery_obj.signature(
                 self.task_signatures_str["get_table_schema"]
             )
-            result = task_signature.delay(table_name=table_name.full_table_name).get()
-            return TableSchema.from_json(result)
+            return task_signature.delay(table_name=table_name.full_table_name)
 
         def get_table_data(self, table_name: TableName) -> TableData:
+            # the callers of the rows get them as rows, the table_data_encoding
+            # applies to the callers of the columns, get_table_columns
             task_signature = self.__celery_obj.signature(
                 self.task_signatures_str["get_table_data"]
             )
-            result = task_signature.delay(table_name=table_name.full_table_name).get()
-            return TableData.from_json(result)
+            table_data = TableData.from_json(
+                task_signature.delay(table_name=table_name.full_table_name).get()
+            )
+            self.table_schema_cache.put(table_name.full_table_name, table_data.schema)
+            return table_data
+
+        def get_table_columns(
+            self, table_name: TableName
+        ) -> Tuple[TableSchema, Dict[str, numpy.ndarray]]:
+            return self.get_table_columns_result(
+                table_name, self.queue_get_table_columns(table_name)
+            )
+
+        def queue_get_table_columns(self, table_name: TableName) -> "AsyncResult":
+            # the table is transferred in the encoding of the controller's config
+            if config.controller.table_data_encoding == "columnar":
+                task_name = "get_table_data_columnar"
+            else:
+                task_name = "get_table_data"
+            task_signature = self.__celery_obj.signature(
+                self.task_signatures_str[task_name]
+            )
+            return task_signature.delay(table_name=table_name.full_table_name)
+
+        def get_table_columns_result(
+            self, table_name: TableName, async_result
+        ) -> Tuple[TableSchema, Dict[str, numpy.ndarray]]:
+            if config.controller.table_data_encoding == "columnar":
+                schema, columns = decode_table_data_b64(async_result.get())
+            else:
+                table_data = TableData.from_json(async_result.get())
+                schema = table_data.schema
+                columns = rows_to_columns(schema, table_data.data)
+            self.table_schema_cache.put(table_name.full_table_name, schema)
+            return schema, columns
+
+        def get_table_data_page(
+            self,
+            table_name: TableName,
+            page_size: int,
+            cursor: Optional[str] = None,
+            columns: Optional[List[str]] = None,
+        ) -> TableDataPage:
+            task_signature = self.__celery_obj.signature(
+                self.task_signatures_str["get_table_data_page"]
+            )
+            result = task_signature.delay(
+                table_name=table_name.full_table_name,
+                page_size=page_size,
+                cursor=cursor,
+                columns=columns,
+            ).get()
+            return TableDataPage.from_json(result)
+
+        def iter_table_data(
+            self,
+            table_name: TableName,
+            page_size: Optional[int] = None,
+            columns: Optional[List[str]] = None,
+        ) -> Iterator[List[Any]]:
+            """
+            Yields the rows of a table, fetching them one page at a time, so
+            only one page is held in memory.
+            """
+            page_size = page_size or config.controller.table_data_page_size
+            cursor = None
+            while True:
+                page = self.get_table_data_page(
+                    table_name, page_size=page_size, cursor=cursor, columns=columns
+                )
+                yield from page.data
+                cursor = page.next_cursor
+                if cursor is None:
+                    return
+
+        def head(
+            self, table_name: TableName, n: int, columns: Optional[List[str]] = None
+        ) -> TableData:
+            page = self.get_table_data_page(table_name, page_size=n, columns=columns)
+            return TableData(page.schema, page.data)
+
+        def get_datasets_statistics(
+            self, pathology: str, datasets: List[str]
+        ) -> List[ColumnStatistics]:
+            """
+            Returns the statistics of the columns of the node's datasets,
+            precomputed when the datasets were imported.
+            """
+            task_signature = self.__celery_obj.signature(
+                self.task_signatures_str["get_datasets_statistics"]
+            )
+            result = task_signature.delay(pathology=pathology, datasets=datasets).get()
+            return DatasetsStatistics.from_json(result).columns
 
         def create_table(self, command_id: str, schema: TableSchema) -> TableName:
             schema_json = schema.to_json()
@@ -243,6 +399,7 @@ class AlgorithmExecutor:
             result = task_signature.delay(
                 context_id=self.__context_id, schema_json=schema_json
             ).get()
+            self.table_schema_cache.put(result, schema)
             return TableName(result)
 
         # VIEWS functionality
@@ -287,6 +444,26 @@ class AlgorithmExecutor:
 
             return TableName(result)
 
+        def queue_create_initial_views(
+            self,
+            command_id: str,
+            pathology: str,
+            datasets: List[str],
+            variables: Dict[str, List[str]],
+            filters: List[str],
+        ) -> "AsyncResult":  # noqa: F821
+            task_signature = self.__celery_obj.signature(
+                self.task_signatures_str["create_initial_views"]
+            )
+            return task_signature.delay(
+                context_id=self.__context_id,
+                command_id=command_id,
+                pathology=pathology,
+                datasets=datasets,
+                variables=variables,
+                filters_json=filters,
+            )
+
         # MERGE TABLES functionality
         def get_merge_tables(self) -> List[TableName]:
             task_signature = self.__celery_obj.signature(
@@ -307,6 +484,10 @@ class AlgorithmExecutor:
                 context_id=self.__context_id,
                 table_names=table_names,
             ).get()
+            # a merge table has the schema of the tables it merges
+            schema = self.table_schema_cache.get(table_names[0])
+            if schema is not None:
+                self.table_schema_cache.put(result, schema)
             return TableName(result)
 
         # REMOTE TABLES functionality
@@ -319,19 +500,33 @@ class AlgorithmExecutor:
         def create_remote_table(
             self, table_info: TableInfo, native_node: Node
         ) -> TableName:  # noqa: F821
+            self.queue_create_remote_table(
+                table_info=table_info, native_node=native_node
+            ).get()  # does not return anything, get() so it blocks until complete
+
+        def queue_create_remote_table(
+            self, table_info: TableInfo, native_node: Node
+        ) -> "AsyncResult":  # noqa: F821
+            # a remote table has the name and schema of the table it points to
+            self.table_schema_cache.put(table_info.name, table_info.schema)
             table_info_json = table_info.to_json()
             monetdb_socket_addr = native_node.monetdb_socket_addr
             task_signature = self.__celery_obj.signature(
                 self.task_signatures_str["create_remote_table"]
             )
-            task_signature.delay(
+            return task_signature.delay(
                 table_info_json=table_info_json,
                 monetdb_socket_address=monetdb_socket_addr,
-            ).get()  # does not return anything, get() so it blocks until complete
+            )
 
         # UDFs functionality
         def queue_run_udf(
-            self, command_id: str, func_name: str, positional_args, keyword_args
+            self,
+            command_id: str,
+            func_name: str,
+            positional_args,
+            keyword_args,
+            inline_result: Optional[bool] = None,
         ) -> "AsyncResult":  #: positional_args: List[TableName or str]
             task_signature = self.__celery_obj.signature(
                 self.task_signatures_str["run_udf"]
@@ -342,11 +537,38 @@ class AlgorithmExecutor:
                 func_name=func_name,
                 positional_args_json=positional_args,
                 keyword_args_json=keyword_args,
+                inline_result=inline_result,
             )
 
-        # def get_result_run_udf(self, async_result) -> str:
-        #     result = async_result.get()
-        #     return TableName(result)
+        def queue_run_udf_pipeline(
+            self, steps: List[UDFPipelineStep]
+        ) -> "AsyncResult":  # noqa: F821
+            task_signature = self.__celery_obj.signature(
+                self.task_signatures_str["run_udf_pipeline"]
+            )
+            return task_signature.delay(
+                context_id=self.__context_id,
+                steps_json=[step.to_json() for step in steps],
+            )
+
+        def get_run_udf_result(self, async_result) -> UDFExecutionResult:
+            result = UDFExecutionResult.from_json(async_result.get())
+            self.__record_udf_execution_result(result)
+            return result
+
+        def get_run_udf_pipeline_result(self, async_result) -> List[UDFExecutionResult]:
+            results = [
+                UDFExecutionResult.from_json(result) for result in async_result.get()
+            ]
+            for result in results:
+                self.__record_udf_execution_result(result)
+            return results
+
+        def __record_udf_execution_result(self, result: UDFExecutionResult):
+            if result.table_name is None:  # inline result
+                return
+            self.table_schema_cache.put(result.table_name, result.schema)
+            self.table_row_counts[result.table_name] = result.row_count
 
         def get_udfs(self, algorithm_name) -> List[str]:
             task_signature = self.__celery_obj.signature(
@@ -372,6 +594,16 @@ class AlgorithmExecutor:
             return result
 
         # CLEANUP functionality
+        def queue_drop_tables(
+            self, table_names: List[TableName]
+        ) -> "AsyncResult":  # noqa: F821
+            task_signature = self.__celery_obj.signature(
+                self.task_signatures_str["drop_tables"]
+            )
+            return task_signature.delay(
+                table_names=[table_name.full_table_name for table_name in table_names]
+            )
+
         def clean_up(self):
             task_signature = self.__celery_obj.signature(
                 self.task_signatures_str["clean_up"]
@@ -379,11 +611,30 @@ class AlgorithmExecutor:
             task_signature.delay(self.__context_id)
 
     class AlgorithmExecutionInterface:
-        def __init__(self, global_node, local_nodes, algorithm_name):
+        def __init__(
+            self,
+            global_node,
+            local_nodes,
+            algorithm_name,
+            deferred=False,
+            drop_unreachable_tables=False,
+        ):
             self._global_node = global_node
             self._local_nodes = local_nodes
             self._algorithm_name = algorithm_name
 
+            # When enabled, the tables behind a LocalNodeTable/GlobalNodeTable
+            # returned by a udf are dropped as soon as the algorithm flow can
+            # no longer reach the handle, instead of at the experiment clean up.
+            self._drop_unreachable_tables = drop_unreachable_tables
+            self._table_finalizers = []
+
+            # In deferred mode the elementwise sql_linalg UDFs are not executed
+            # when called. They are recorded as an expression graph and each
+            # chain of them is executed as a single fused UDF, when its result
+            # is needed by another UDF, shared, or fetched.
+            self._deferred = deferred
+
             # TODO: validate all local nodes have created the base_view_table??
             self._initial_view_tables = {}  # {variable:LocalTable}
             tmp_variable_node_table = {}
@@ -416,13 +667,37 @@ class AlgorithmExecutor:
             func_name: str,
             positional_args: Dict[LocalNodeTable],
             share_to_global: bool = False,
-        ):  # -> GlobalNodeTable or LocalNodeTable
+            inline_result: Optional[bool] = None,
+        ):  # -> GlobalNodeTable or LocalNodeTable or LocalNodeData
+            # inline_result: return the result in LocalNodeData, instead of
+            # creating tables. By default the scalar udf results are inlined.
             # queue exec_udf task on all local nodes
             # wait for all nodes to complete the tasks execution
             # one new table per local node was generated
             # queue create_remote_table on global for each of the generated tables
             # create merge table on global node to merge the remote tables
 
+            if share_to_global:
+                if inline_result:
+                    raise ValueError("An inline result cannot be shared to global")
+                inline_result = False
+
+            # an inline result is requested from the nodes right away, so the
+            # udf is not deferred
+            if (
+                self._deferred
+                and not share_to_global
+                and not inline_result
+                and func_name in FUSIBLE_UDFS
+            ):
+                expression = self._build_elementwise_expression(
+                    func_name, list(positional_args.values())
+                )
+                if expression is not None:
+                    return self.DeferredLocalNodeTable(
+                        expression=expression, materialize=self._materialize
+                    )
+
             command_id = get_a_uniqueid()
 
             tasks = {}
@@ -435,6 +710,10 @@ class AlgorithmExecutor:
                 keyword_args_transformed = {}
                 for var_name, val in positional_args.items():
                     if isinstance(val, self.LocalNodeTable):
+                        if node in val.failed_nodes:
+                            raise NodeTasksFailedException(
+                                {node: val.failed_nodes[node]}
+                            )
                         udf_argument = UDFArgument(
                             type="table", value=val.nodes_tables[node].full_table_name
                         )
@@ -452,26 +731,44 @@ class AlgorithmExecutor:
                     func_name=func_name,
                     positional_args=positional_args_transfrormed,
                     keyword_args={},
+                    inline_result=inline_result,
                 )
                 tasks[node] = task
 
+            # The results are consumed in the order the nodes complete. When
+            # sharing to global, the remote table creation of each node is
+            # queued as soon as its udf completes, with the returned schema.
+            # The failed or timed out tasks, udfs or remote table creations,
+            # are raised, by node, once the rest have completed.
             udf_result_tables = {}
-            for node, task in tasks.items():
-                table_name = TableName(task.get())
-                udf_result_tables[node] = table_name
-
-                # ceate remote table on global node
+            udf_inline_results = {}
+            pending_tasks = {(node, "run_udf"): task for node, task in tasks.items()}
+            for (node, step), task in as_completed(
+                pending_tasks, timeout=config.controller.celery_tasks_timeout
+            ):
+                if step != "run_udf":
+                    continue  # a remote table was created
+                udf_result = node.get_run_udf_result(task)
+                if udf_result.table_name is None:
+                    udf_inline_results[node] = udf_result.data
+                    continue
+                udf_result_tables[node] = TableName(udf_result.table_name)
                 if share_to_global:
-                    # TODO: try block missing
-                    table_schema = node.get_table_schema(table_name)
-                    table_info = TableInfo(
-                        name=table_name.full_table_name, schema=table_schema
-                    )
-                    self._global_node.create_remote_table(
-                        table_info=table_info, native_node=node
+                    pending_tasks[
+                        (node, "create_remote_table")
+                    ] = self._global_node.queue_create_remote_table(
+                        table_info=TableInfo(
+                            name=udf_result.table_name, schema=udf_result.schema
+                        ),
+                        native_node=node,
                     )
+            if udf_inline_results:
+                return self.LocalNodeData(
+                    nodes_data={node: udf_inline_results[node] for node in tasks}
+                )
+            udf_result_tables = {node: udf_result_tables[node] for node in tasks}
 
-            # create merge table on global
+            # create merge table on global, once all remote tables exist
             if share_to_global:
                 remote_tables_info = list(udf_result_tables.values())
                 remote_table_names = [
@@ -480,19 +777,104 @@ class AlgorithmExecutor:
                 merge_table_global = self._global_node.create_merge_table(
                     command_id=command_id, table_names=remote_table_names
                 )
-                return self.GlobalNodeTable(
-                    node_table={self._global_node: merge_table_global}
+                # the merge table goes before the remote tables it merges
+                return self._track_tables(
+                    self.GlobalNodeTable(
+                        node_table={self._global_node: merge_table_global}
+                    ),
+                    [(self._global_node, [merge_table_global, *remote_table_names])]
+                    + [(node, [table]) for node, table in udf_result_tables.items()],
                 )
 
             else:
-                return self.LocalNodeTable(nodes_tables=udf_result_tables)
+                return self._track_tables(
+                    self.LocalNodeTable(nodes_tables=udf_result_tables),
+                    [(node, [table]) for node, table in udf_result_tables.items()],
+                )
+
+        def run_udf_pipeline_on_local_nodes(
+            self, steps: List[Tuple[str, Dict[str, Any]]]
+        ) -> List[LocalNodeTable]:
+            """
+            Runs a sequence of udfs on the local nodes with a single task per
+            node. Each step is a (func_name, positional_args) pair, like the
+            arguments of run_udf_on_local_nodes. A step can use the result of
+            an earlier step by passing PipelineStepResult(<step index>).
+
+            Returns a LocalNodeTable with the result of each step.
+            """
+            command_ids = [get_a_uniqueid() for _ in steps]
+
+            tasks = {}
+            for node in self._local_nodes:
+                pipeline_steps = []
+                for command_id, (func_name, positional_args) in zip(command_ids, steps):
+                    udf_arguments = []
+                    for val in positional_args.values():
+                        if isinstance(val, self.PipelineStepResult):
+                            udf_argument = UDFArgument(
+                                type="step_result", value=val.step_index
+                            )
+                        elif isinstance(val, self.LocalNodeTable):
+                            if node in val.failed_nodes:
+                                raise NodeTasksFailedException(
+                                    {node: val.failed_nodes[node]}
+                                )
+                            udf_argument = UDFArgument(
+                                type="table",
+                                value=val.nodes_tables[node].full_table_name,
+                            )
+                        elif isinstance(val, self.GlobalNodeTable):
+                            raise Exception(
+                                "(run_udf_pipeline_on_local_nodes) GlobalNodeTable types are not accepted from run_udf_pipeline_on_local_nodes"
+                            )
+                        else:
+                            udf_argument = UDFArgument(type="literal", value=str(val))
+                        udf_arguments.append(udf_argument)
+                    pipeline_steps.append(
+                        UDFPipelineStep(
+                            command_id=command_id,
+                            func_name=func_name,
+                            positional_args=udf_arguments,
+                        )
+                    )
+                tasks[node] = node.queue_run_udf_pipeline(pipeline_steps)
+
+            steps_result_tables = [{} for _ in steps]
+            for node, task in as_completed(
+                tasks, timeout=config.controller.celery_tasks_timeout
+            ):
+                udf_results = node.get_run_udf_pipeline_result(task)
+                for step_index, udf_result in enumerate(udf_results):
+                    steps_result_tables[step_index][node] = TableName(
+                        udf_result.table_name
+                    )
+
+            return [
+                self._track_tables(
+                    self.LocalNodeTable(
+                        nodes_tables={
+                            node: result_tables[node] for node in self._local_nodes
+                        }
+                    ),
+                    [(node, [table]) for node, table in result_tables.items()],
+                )
+                for result_tables in steps_result_tables
+            ]
+
+        class PipelineStepResult:
+            def __init__(self, step_index: int):
+                self.step_index = step_index
 
         def run_udf_on_global_node(
             self,
             func_name: str,
             positional_args: List[GlobalNodeTable],
             share_to_locals: bool = False,
-        ):  # -> GlobalNodeTable or LocalNodeTable
+            inline_result: Optional[bool] = None,
+        ):  # -> GlobalNodeTable or LocalNodeTable or GlobalNodeData
+            # inline_result: return the result in GlobalNodeData, instead of
+            # creating a table. By default the scalar udf results are inlined.
             # check the input tables are GlobalNodeTable(s)
             # queue exec_udf on the global node
             # wait for it to complete
@@ -518,34 +900,131 @@ class AlgorithmExecutor:
                     udf_argument = UDFArgument(type="literal", value=str(val))
                 positional_args_transfrormed.append(udf_argument.to_json())
 
-            udf_result_table: str = self._global_node.queue_run_udf(
-                command_id=command_id,
-                func_name=func_name,
-                positional_args=positional_args_transfrormed,
-                keyword_args={},
-            ).get()
-
             if share_to_locals:
-                table_schema: TableSchema = self._global_node.get_table_schema(
-                    TableName(udf_result_table)
+                if inline_result:
+                    raise ValueError("An inline result cannot be shared to locals")
+                inline_result = False
+
+            udf_result = self._global_node.get_run_udf_result(
+                self._global_node.queue_run_udf(
+                    command_id=command_id,
+                    func_name=func_name,
+                    positional_args=positional_args_transfrormed,
+                    keyword_args={},
+                    inline_result=inline_result,
                 )
+            )
+            if udf_result.table_name is None:
+                return self.GlobalNodeData(data=udf_result.data)
+            udf_result_table = udf_result.table_name
+
+            if share_to_locals:
                 table_info: TableInfo = TableInfo(
-                    name=udf_result_table, schema=table_schema
+                    name=udf_result_table, schema=udf_result.schema
                 )
-                local_nodes_tables = {}
-                for node in self._local_nodes:
-                    # TODO do not block here, first send the request to all local nodes and then block for the result
-                    node.create_remote_table(
+                # the remote tables are created on all local nodes concurrently
+                tasks = {
+                    node: node.queue_create_remote_table(
                         table_info=table_info, native_node=self._global_node
                     )
-                    local_nodes_tables[node] = TableName(udf_result_table)
+                    for node in self._local_nodes
+                }
+                _, failed_nodes = gather_async_results(
+                    tasks, timeout=config.controller.celery_tasks_timeout
+                )
+                if len(failed_nodes) == len(tasks):
+                    raise NodeTasksFailedException(failed_nodes)
+
+                local_nodes_tables = {
+                    node: TableName(udf_result_table)
+                    for node in tasks
+                    if node not in failed_nodes
+                }
+                # the remote tables go before the global table they point to
+                return self._track_tables(
+                    self.LocalNodeTable(
+                        nodes_tables=local_nodes_tables, failed_nodes=failed_nodes
+                    ),
+                    [(node, [table]) for node, table in local_nodes_tables.items()]
+                    + [(self._global_node, [TableName(udf_result_table)])],
+                )
 
-                return self.LocalNodeTable(nodes_tables=local_nodes_tables)
+            return self._track_tables(
+                self.GlobalNodeTable(
+                    node_table={self._global_node: TableName(udf_result_table)}
+                ),
+                [(self._global_node, [TableName(udf_result_table)])],
+            )
 
-            return self.GlobalNodeTable(
-                node_table={self._global_node: TableName(udf_result_table)}
+        def _track_tables(self, node_table, nodes_tables_to_drop):
+            # nodes_tables_to_drop: [(Node, [TableName])], in drop order
+            if self._drop_unreachable_tables:
+                finalizer = weakref.finalize(
+                    node_table, drop_nodes_tables, nodes_tables_to_drop
+                )
+                finalizer.atexit = False
+                self._table_finalizers = [
+                    finalizer for finalizer in self._table_finalizers if finalizer.alive
+                ]
+                self._table_finalizers.append(finalizer)
+            return node_table
+
+        def detach_table_finalizers(self):
+            # The experiment clean up drops all the remaining tables
+            for finalizer in self._table_finalizers:
+                finalizer.detach()
+            self._table_finalizers = []
+
+        def _build_elementwise_expression(self, func_name, args):
+            operands = []
+            for arg in args:
+                if isinstance(arg, self.LocalNodeTable):
+                    operands.append(("table", arg))
+                elif isinstance(arg, Number) and not isinstance(arg, bool):
+                    operands.append(("const", arg))
+                else:
+                    return None
+            if len(operands) != 2:
+                return None
+            return (FUSIBLE_UDFS[func_name], *operands)
+
+        def _materialize(self, deferred_table):
+            tables = []
+            expression = self._compile_expression(deferred_table.expression, tables)
+            positional_args = {"expression": json.dumps(expression)}
+            positional_args.update(
+                {f"t{index}": table for index, table in enumerate(tables)}
+            )
+            return self.run_udf_on_local_nodes(
+                func_name=FUSED_UDF, positional_args=positional_args
             )
 
+        def _compile_expression(self, expression, tables):
+            # Deferred tables that have not been materialized yet are inlined,
+            # all other tables become leaves referencing the fused UDF arguments
+            kind, *operands = expression
+            if kind == "table":
+                (table,) = operands
+                if (
+                    isinstance(table, self.DeferredLocalNodeTable)
+                    and not table.is_materialized
+                ):
+                    return self._compile_expression(table.expression, tables)
+                for index, known_table in enumerate(tables):
+                    if known_table is table:
+                        return ["table", index]
+                tables.append(table)
+                return ["table", len(tables) - 1]
+            if kind == "const":
+                (const,) = operands
+                return ["const", const]
+            lhs, rhs = operands
+            return [
+                kind,
+                self._compile_expression(lhs, tables),
+                self._compile_expression(rhs, tables),
+            ]
+
         # TABLES functionality
         def get_table_data(self, node_table) -> "TableData":
             return node_table.get_table_data()
@@ -566,9 +1045,16 @@ class AlgorithmExecutor:
             pass
 
         class LocalNodeTable:
-            def __init__(self, nodes_tables: dict[Node, TableName]):  # noqa: F821
+            def __init__(
+                self,
+                nodes_tables: dict[Node, TableName],  # noqa: F821
+                failed_nodes: dict[Node, Exception] = None,  # noqa: F821
+            ):
                 self.__nodes_tables = nodes_tables  # {node: TableName(table_name) for (node, table_name) in nodes_tables.items()}
 
+                # the nodes on which the table could not be created
+                self.__failed_nodes = failed_nodes or {}
+
                 if not self._validate_matching_table_names(
                     list(self.__nodes_tables.values())
                 ):
@@ -583,30 +1069,58 @@ class AlgorithmExecutor:
             def nodes_tables(self):
                 return self.__nodes_tables
 
+            @property
+            def failed_nodes(self):
+                return self.__failed_nodes
+
             # TODO this is redundant, either remove it or overload all node methods here?
             def get_table_schema(self):
                 node = list(self.nodes_tables.keys())[0]
                 table = self.nodes_tables[node]
                 return node.get_table_schema(table)
 
-            def get_table_data(self):  # -> {Node:TableData}
-                tables_data = []
-                for node, table_name in self.nodes_tables.items():
-                    tables_data.append(node.get_table_data(table_name))
-                tables_data_flat = [table_data.data for table_data in tables_data]
-                tables_data_flat = [
-                    k for i in tables_data_flat for j in i for k in j
-                ]  # TODO bejesus..
-                return tables_data_flat
+            def get_row_counts(self):  # -> {Node: int or None}
+                # None for the tables not created by a udf
+                return {
+                    node: node.table_row_counts.get(table_name.full_table_name)
+                    for node, table_name in self.nodes_tables.items()
+                }
+
+            def get_table_data(self) -> List[numpy.ndarray]:
+                # The columns of the table, in the order of its schema, each
+                # one stacked node by node with the dtype it was decoded with.
+                # The tables are fetched from all the nodes concurrently and
+                # each one is decoded as soon as it arrives.
+                tasks = {
+                    node: node.queue_get_table_columns(table_name)
+                    for node, table_name in self.nodes_tables.items()
+                }
+                nodes_columns = {}
+                for node, task in as_completed(
+                    tasks, timeout=config.controller.celery_tasks_timeout
+                ):
+                    schema, nodes_columns[node] = node.get_table_columns_result(
+                        self.nodes_tables[node], task
+                    )
+                return [
+                    concatenate_columns(
+                        [nodes_columns[node][column.name] for node in self.nodes_tables]
+                    )
+                    for column in schema.columns
+                ]
+
+            def head(self, n: int):  # -> {Node:TableData}
+                return {
+                    node: node.head(table_name, n)
+                    for node, table_name in self.nodes_tables.items()
+                }
 
             def __repr__(self):
                 r = "LocalNodeTable:\n"
                 r += f"schema: {self.get_table_schema()}\n"
-                for node, table_name in self.nodes_tables.items():
-                    r += f"{node} - {table_name} \ndata(LIMIT 20):\n"
-                    tmp = [
-                        str(row) for row in node.get_table_data(table_name).data[0:20]
-                    ]
+                for node, table_data in self.head(REPR_ROWS).items():
+                    r += f"{node} - {self.nodes_tables[node]} \ndata(LIMIT {REPR_ROWS}):\n"
+                    tmp = [str(row) for row in table_data.data]
                     r += "\n".join(tmp)
                     r += "\n"
                 return r
@@ -624,6 +1138,100 @@ class AlgorithmExecutor:
                 def __init__(self, table_names):
                     self.message = f"Mismatched table names ->{table_names}"
 
+        class DeferredLocalNodeTable(LocalNodeTable):
+            """
+            A LocalNodeTable whose tables are not created yet. It holds the
+            elementwise expression that produces it and it is materialized, on
+            all the local nodes, the first time its tables are needed.
+            """
+
+            def __init__(self, expression, materialize):
+                # LocalNodeTable.__init__ is not called, since there are no
+                # tables yet, the attributes it sets are the ones of the
+                # materialized table, see __getattr__
+                self.__expression = expression
+                self.__materialize = materialize
+                self.__local_node_table = None
+
+            def __getattr__(self, name):
+                # called only for the attributes the deferred table does not have
+                if name.startswith(("__", "_DeferredLocalNodeTable__")):
+                    raise AttributeError(name)
+                return getattr(self.local_node_table, name)
+
+            @property
+            def expression(self):
+                return self.__expression
+
+            @property
+            def is_materialized(self):
+                return self.__local_node_table is not None
+
+            @property
+            def local_node_table(self):
+                if self.__local_node_table is None:
+                    self.__local_node_table = self.__materialize(self)
+                return self.__local_node_table
+
+            @property
+            def nodes_tables(self):
+                return self.local_node_table.nodes_tables
+
+            @property
+            def failed_nodes(self):
+                if self.__local_node_table is None:
+                    return {}
+                return self.__local_node_table.failed_nodes
+
+        class LocalNodeData:
+            """
+            The inline result of a udf run on the local nodes, the result rows
+            of each node, as returned by the nodes without creating tables.
+            """
+
+            def __init__(self, nodes_data: dict[Node, List[List[Any]]]):  # noqa: F821
+                self.__nodes_data = nodes_data
+
+            @property
+            def nodes_data(self):
+                return self.__nodes_data
+
+            def get_table_data(self) -> List[numpy.ndarray]:
+                # like LocalNodeTable.get_table_data, the inline rows have no
+                # schema so the dtype of each column is the one numpy infers
+                rows = [row for data in self.nodes_data.values() for row in data]
+                return [numpy.array(values) for values in zip(*rows)]
+
+            def __repr__(self):
+                r = "LocalNodeData:\n"
+                for node, data in self.nodes_data.items():
+                    r += f"{node}\ndata(LIMIT {REPR_ROWS}):\n"
+                    r += "\n".join(str(row) for row in data[:REPR_ROWS])
+                    r += "\n"
+                return r
+
+        class GlobalNodeData:
+            """
+            The inline result of a udf run on the global node, the result rows
+            as returned by the node without creating a table.
+            """
+
+            def __init__(self, data: List[List[Any]]):
+                self.__data = data
+
+            @property
+            def data(self):
+                return self.__data
+
+            def get_table_data(self):
+                # like GlobalNodeTable.get_table_data
+                return self.data
+
+            def __repr__(self):
+                r = f"GlobalNodeData:\ndata (LIMIT {REPR_ROWS}): \n"
+                r += "\n".join(str(row) for row in self.data[:REPR_ROWS])
+                return r
+
         class GlobalNodeTable:
             def __init__(self, node_table: dict[Node, TableName]):  # noqa: F821
                 self.__node_table = node_table
@@ -645,17 +1253,101 @@ class AlgorithmExecutor:
                 table_data = node.get_table_data(table_name).data
                 return table_data
 
-            def __repr__(self):
+            def head(self, n: int):  # -> TableData
                 node = list(self.node_table.keys())[0]
+                table_name: TableName = list(self.node_table.values())[0]
+                return node.head(table_name, n)
+
+            def __repr__(self):
                 table_name: TableName = list(self.node_table.values())[0]
                 r = f"GlobalNodeTable: {table_name.full_table_name}"
                 r += f"\nschema: {self.get_table_schema()}"
-                r += f"\ndata (LIMIT 20): \n"
-                tmp = [str(row) for row in self.get_table_data()[0:20]]
+                r += f"\ndata (LIMIT {REPR_ROWS}): \n"
+                tmp = [str(row) for row in self.head(REPR_ROWS).data]
                 r += "\n".join(tmp)
                 return r
 
 
+def as_completed(
+    async_results: Dict[Any, "AsyncResult"], timeout: float
+) -> Iterator[Tuple[Any, "AsyncResult"]]:
+    """
+    Yields the (key, async result) pairs of the succeeded tasks in the order
+    the tasks complete.
+
+    Async results added to the given dict while iterating are waited for as
+    well, so a caller can queue the next step of a completed task right away.
+    The yielded pairs are removed from the dict.
+
+    The tasks run concurrently, so they all share the same deadline. Once
+    they are all done, or the deadline has passed, a NodeTasksFailedException
+    is raised with the exceptions of the tasks that failed or timed out, keyed
+    like the given async results. The tasks are polled with a growing
+    interval, reset every time a task completes.
+    """
+    deadline = time.monotonic() + timeout
+    polling_interval = TASKS_POLLING_INTERVAL
+    failures = {}
+    while async_results:
+        completed = [key for key, result in async_results.items() if result.ready()]
+        for key in completed:
+            async_result = async_results.pop(key)
+            if async_result.failed():
+                failures[key] = async_result.result
+            else:
+                yield key, async_result
+        if completed:
+            polling_interval = TASKS_POLLING_INTERVAL
+            continue
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            for key in async_results:
+                failures[key] = TimeoutError(f"Task not completed in {timeout}s")
+            async_results.clear()
+            break
+        time.sleep(min(polling_interval, remaining))
+        polling_interval = min(2 * polling_interval, MAX_TASKS_POLLING_INTERVAL)
+    if failures:
+        raise NodeTasksFailedException(failures)
+
+
+def gather_async_results(
+    async_results: Dict[Any, "AsyncResult"], timeout: float
+) -> Tuple[Dict[Any, Any], Dict[Any, Exception]]:
+    """
+    Collects the results of tasks that have already been sent to the nodes.
+
+    The tasks run concurrently, so they all share the same deadline. Returns
+    the results and the exceptions (failures or timeouts) keyed like the
+    given async results.
+    """
+    deadline = time.monotonic() + timeout
+    results = {}
+    failures = {}
+    for key, async_result in async_results.items():
+        # a zero timeout would block forever, the tasks that are not ready
+        # after the deadline get a minimal one
+        remaining = max(deadline - time.monotonic(), MIN_TASK_TIMEOUT)
+        try:
+            results[key] = async_result.get(timeout=remaining)
+        except Exception as exc:
+            failures[key] = exc
+    return results, failures
+
+
+def drop_nodes_tables(nodes_tables: List[Tuple["Node", List[TableName]]]):
+    """
+    Queues the drop of the given tables on their nodes, without waiting for it.
+    Called when the handle owning the tables is garbage collected, so the
+    errors are ignored, the experiment clean up drops any leftovers.
+    """
+    for node, table_names in nodes_tables:
+        try:
+            node.queue_drop_tables(table_names)
+        except Exception:
+            pass
+
+
 def get_a_uniqueid():
     return "{}".format(
         datetime.datetime.now().microsecond + (random.randrange(1, 100 + 1) * 100000)
@@ -0,0 +1,52 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from mipengine import config
+from mipengine.common.node_tasks_DTOs import TableSchema
+
+
+class TableSchemaCache:
+    """
+    The schemas of the node tables, keyed by table name.
+
+    Tables are immutable once created, so a cached schema never becomes
+    stale. A remote table has the name and the schema of the table it points
+    to, so one entry serves both. When max_size is given, the least recently
+    used schemas are evicted past that size.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self._schemas = OrderedDict()
+        self._max_size = max_size
+        self._lock = threading.Lock()
+
+    def get(self, table_name: str) -> Optional[TableSchema]:
+        with self._lock:
+            schema = self._schemas.get(table_name)
+            if schema is not None:
+                self._schemas.move_to_end(table_name)
+            return schema
+
+    def put(self, table_name: str, schema: TableSchema):
+        with self._lock:
+            self._schemas[table_name] = schema
+            self._schemas.move_to_end(table_name)
+            if self._max_size is not None and len(self._schemas) > self._max_size:
+                self._schemas.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._schemas)
+
+
+def create_table_schema_cache() -> TableSchemaCache:
+    """
+    Returns the schema cache of a new experiment, shared by its nodes only. The
+    table names of an experiment hold its context_id, so the schemas of one
+    experiment are of no use to the others, and a shared view may be recreated
+    with another schema between experiments. The cache keeps at most
+    controller.table_schema_cache_size schemas, if that is positive.
+    """
+    max_size = config.controller.table_schema_cache_size
+    return TableSchemaCache(max_size=max_size if max_size > 0 else None)
@@ -18,6 +18,8 @@ from mipengine.controller.api.errors.exceptions import BadUserInput
 from mipengine.controller.algorithms_specifications import GenericParameterSpecification
 from mipengine.common.common_data_elements import CommonDataElement
 from mipengine.common.common_data_elements import common_data_elements
+from mipengine.common.filters import load_filters
+from mipengine.common.filters import validate_filters
 
 
 def validate_algorithm(algorithm_name: str, request_body: str):
@@ -75,7 +77,8 @@ def validate_inputdata(inputdata_specs: InputDataSpecificationsDTO,
     validate_inputdata_pathology_and_dataset_values(input_data.pathology,
                                                     input_data.datasets)
 
-    validate_inputdata_filter(input_data.filters)
+    validate_inputdata_filter(input_data.pathology,
+                              input_data.filters)
 
     validate_inputdata_cdes(inputdata_specs,
                             input_data)
@@ -98,13 +101,17 @@ def validate_inputdata_pathology_and_dataset_values(pathology: str,
         raise BadUserInput(f"Datasets '{datasets}' do not belong in pathology '{pathology}'.")
 
 
-def validate_inputdata_filter(filter):
+def validate_inputdata_filter(pathology: str,
+                              filters: Any):
     """
     Validates that the filter provided have the correct format
     following: https://querybuilder.js.org/
+    and that it only refers to cdes of the pathology with proper values.
     """
-    # TODO Add filter
-    pass
+    try:
+        validate_filters(load_filters(filters), pathology)
+    except ValueError as exc:
+        raise BadUserInput(f"Invalid filters. {exc}")
 
 
 def validate_inputdata_cdes(input_data_specs: InputDataSpecificationsDTO,
@@ -0,0 +1,95 @@
+import threading
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from celery import Celery
+
+from mipengine import config
+
+
+class CeleryAppRegistry:
+    """
+    Process wide registry of the Celery apps used to communicate with the nodes.
+
+    There is one Celery app per node, created the first time the node is used
+    and shared by all the experiments afterwards. This way the broker
+    connections are pooled (controller.celery.broker_pool_limit) instead of
+    opened for every request. Celery keeps one result backend per app and
+    thread, so the rpc reply queue of each thread is reused as well.
+    """
+
+    def __init__(self):
+        # {node id: (rabbitmq url, celery app)}
+        self._celery_apps: Dict[str, Tuple[str, Celery]] = {}
+        self._lock = threading.Lock()
+
+    def get_celery_app(self, node_id: str, rabbitmq_url: str) -> Celery:
+        """
+        Returns the Celery app of the node. A node whose rabbitmq url changed,
+        in the node catalog, gets a new app for the new url and the app of the
+        old url is closed, releasing its broker connections.
+        """
+        replaced_celery_app = None
+        with self._lock:
+            if node_id in self._celery_apps:
+                celery_app_url, celery_app = self._celery_apps[node_id]
+                if celery_app_url == rabbitmq_url:
+                    return celery_app
+                replaced_celery_app = celery_app
+            celery_app = self._create_celery_app(rabbitmq_url)
+            self._celery_apps[node_id] = (rabbitmq_url, celery_app)
+        # closed outside of the lock, closing the connections may block
+        if replaced_celery_app is not None:
+            replaced_celery_app.close()
+        return celery_app
+
+    def get_pool_stats(self) -> Dict[str, Dict[str, Optional[int]]]:
+        """
+        Returns, per node id, the size limit of the broker connection pool and
+        the connections of the pool that are currently in use or idle.
+
+        The usage is best-effort, for monitoring only. kombu has no public api
+        for it, so it is read from the pool's internals and it is None if a
+        kombu version does not have them.
+        """
+        with self._lock:
+            celery_apps = {
+                node_id: celery_app
+                for node_id, (_, celery_app) in self._celery_apps.items()
+            }
+        return {
+            node_id: _get_pool_stats(celery_app.pool)
+            for node_id, celery_app in celery_apps.items()
+        }
+
+    @staticmethod
+    def _create_celery_app(rabbitmq_url: str) -> Celery:
+        user = config.rabbitmq.user
+        password = config.rabbitmq.password
+        vhost = config.rabbitmq.vhost
+        celery_app = Celery(
+            broker=f"amqp://{user}:{password}@{rabbitmq_url}/{vhost}",
+            backend="rpc://",
+        )
+        celery_app.conf.broker_pool_limit = config.controller.celery.broker_pool_limit
+        celery_app.conf.broker_connection_timeout = (
+            config.controller.celery.broker_connection_timeout
+        )
+        return celery_app
+
+
+def _get_pool_stats(pool) -> Dict[str, Optional[int]]:
+    # Only the limit is public. The connections in use and the idle ones are
+    # kept in the private _dirty set and _resource queue of kombu's Resource,
+    # read only if they are there.
+    dirty = getattr(pool, "_dirty", None)
+    resource = getattr(pool, "_resource", None)
+    return {
+        "limit": pool.limit,
+        "in_use": len(dirty) if dirty is not None else None,
+        "idle": resource.qsize() if resource is not None else None,
+    }
+
+
+celery_app_registry = CeleryAppRegistry()
@@ -1,4 +1,9 @@
+import re
+from typing import Any
+from typing import Dict
 from typing import List
+from typing import Optional
+from typing import Tuple
 from typing import Union
 
 from mipengine import config
@@ -9,6 +14,10 @@ from mipengine.common.validate_identifier_names import validate_identifier_names
 from mipengine.node.monetdb_interface.monet_db_connection import MonetDB
 
 MONETDB_VARCHAR_SIZE = 50
+# Not a MonetDB table type, marks the udfs among the catalog objects
+FUNCTION_OBJECT_TYPE = -1
+# The context id in the names of the views shared among the experiments
+SHARED_CONTEXT_ID = "shared"
 
 # TODO Add SQLAlchemy if possible
 # TODO We need to add the PRIVATE/OPEN table logic
@@ -29,6 +38,50 @@ def create_table_name(
     return f"{table_type}_{command_id}_{context_id}_{node_id}"
 
 
+def create_dataset_partition_name(pathology: str, dataset: str) -> str:
+    """
+    Creates the name of the partition table that holds a dataset, when the
+    data table of the pathology is partitioned by dataset, with the format
+    <pathology>_data_<dataset>. The characters of the dataset that are not
+    allowed in a table name are replaced by "_".
+    """
+    return f"{pathology}_data_{re.sub(r'[^0-9a-zA-Z_]', '_', dataset)}".lower()
+
+
+def get_dataset_partition_names(
+    pathology: str, datasets: List[str]
+) -> Optional[List[str]]:
+    """
+    Retrieves the partition tables of the given datasets, if the data table of
+    the pathology is a merge table partitioned by dataset. The datasets that
+    have no partition table have no data and are left out.
+
+    Returns
+    ------
+    Optional[List[str]]
+        The partition table names, or None if the data table is not partitioned.
+    """
+    data_table_type = MonetDB().execute_with_result(
+        f"SELECT type FROM tables WHERE name = '{pathology}_data' AND system = false"
+    )
+    merge_table_type = _convert_mip2monet_table_type("merge")
+    if not data_table_type or data_table_type[0][0] != merge_table_type:
+        return None
+
+    partition_names = [
+        create_dataset_partition_name(pathology, dataset) for dataset in datasets
+    ]
+    quoted_partition_names = ",".join(f"'{name}'" for name in partition_names)
+    existing_partition_names = {
+        name
+        for (name,) in MonetDB().execute_with_result(
+            f"""SELECT name FROM tables
+            WHERE name IN ({quoted_partition_names}) AND system = false"""
+        )
+    }
+    return [name for name in partition_names if name in existing_partition_names]
+
+
 def convert_schema_to_sql_query_format(schema: TableSchema) -> str:
     """
     Converts a table's schema to a sql query.
@@ -117,7 +170,14 @@ def get_table_names(table_type: str, context_id: str) -> List[str]:
 
 
 @validate_identifier_names
-def get_table_data(table_name: str) -> List[List[Union[str, int, float, bool]]]:
+def get_table_data(
+    table_name: str,
+    columns: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    order_by: Optional[List[str]] = None,
+    after: Optional[Tuple[Union[str, int, float], ...]] = None,
+) -> List[List[Union[str, int, float, bool]]]:
     """
     Retrieves the data of a table with specific type and name  from the monetdb.
 
@@ -125,39 +185,199 @@ def get_table_data(table_name: str) -> List[List[Union[str, int, float, bool]]]:
     ----------
     table_name : str
         The name of the table
+    columns : Optional[List[str]]
+        The columns to retrieve, all of them if not given
+    limit : Optional[int]
+        The maximum number of rows to retrieve, all of them if not given
+    offset : int
+        The number of rows to skip
+    order_by : Optional[List[str]]
+        The columns the rows are sorted by, in storage order if not given
+    after : Optional[Tuple[Union[str, int, float], ...]]
+        The values of the order_by columns of a row. Only the rows sorted
+        after it are retrieved. They are passed to the query as parameters,
+        so they are not identifiers to validate.
 
     Returns
     ------
     List[List[Union[str, int, float, bool]]
         The data of the table.
     """
+    if columns is None:
+        projection = f"{table_name}.*"
+    else:
+        projection = ", ".join(f"{table_name}.{column}" for column in columns)
+
+    parameters = {}
+    keyset = ""
+    if after is not None:
+        if not order_by or len(after) != len(order_by):
+            raise ValueError(f"The values {after} do not match the order {order_by}")
+        keyset = "AND " + _create_keyset_condition(
+            table_name, order_by, after, parameters
+        )
+    ordering = ""
+    if order_by:
+        ordering = "ORDER BY " + ", ".join(
+            f"{table_name}.{column}" for column in order_by
+        )
+    paging = f"LIMIT {int(limit)} " if limit is not None else ""
+    paging += f"OFFSET {int(offset)}" if offset else ""
 
     data = MonetDB().execute_with_result(
         f"""
-        SELECT {table_name}.*
+        SELECT {projection}
         FROM {table_name}
         INNER JOIN tables ON tables.name = '{table_name}'
         WHERE tables.system=false
-        """
+        {keyset}
+        {ordering}
+        {paging}
+        """,
+        parameters or None,
     )
 
     return data
 
 
+def get_table_key_columns(schema: TableSchema) -> Optional[List[str]]:
+    """
+    Returns the columns that identify the rows of a table: the row_id of the
+    relations, or the dimensions of the tensors, preceded by the node_id when
+    the table merges the tables of many nodes. None if the table has neither.
+    """
+    column_names = [column.name for column in schema.columns]
+    if "row_id" in column_names:
+        key_columns = ["row_id"]
+    else:
+        key_columns = sorted(
+            (name for name in column_names if re.fullmatch(r"dim[0-9]+", name)),
+            key=lambda name: int(name[3:]),
+        )
+    if not key_columns:
+        return None
+    if "node_id" in column_names:
+        key_columns.insert(0, "node_id")
+    return key_columns
+
+
+def _create_keyset_condition(
+    table_name: str,
+    order_by: List[str],
+    after: Tuple[Union[str, int, float], ...],
+    parameters: Dict[str, Any],
+) -> str:
+    # (k1, k2) > (v1, v2) expanded to: k1 > v1 OR (k1 = v1 AND k2 > v2)
+    for index, value in enumerate(after):
+        parameters[f"after{index}"] = value
+    disjuncts = []
+    for index, column in enumerate(order_by):
+        conditions = [
+            f"{table_name}.{previous_column} = %(after{previous_index})s"
+            for previous_index, previous_column in enumerate(order_by[:index])
+        ]
+        conditions.append(f"{table_name}.{column} > %(after{index})s")
+        disjuncts.append("(" + " AND ".join(conditions) + ")")
+    return "(" + " OR ".join(disjuncts) + ")"
+
+
+@validate_identifier_names
+def get_table_row_count(table_name: str) -> int:
+    """
+    Retrieves the number of rows of a table from the monetdb.
+
+    Parameters
+    ----------
+    table_name : str
+        The name of the table
+
+    Returns
+    ------
+    int
+        The number of rows.
+    """
+    [(row_count,)] = MonetDB().execute_with_result(f"SELECT COUNT(*) FROM {table_name}")
+    return row_count
+
+
 @validate_identifier_names
-def clean_up(context_id: str):
+def clean_up(context_id: str) -> int:
     """
-    Deletes all tables of any type with name that contain a specific
-    context_id from the DB.
+    Deletes all tables of any type and all udfs with name that contain a
+    specific context_id from the DB.
+
+    The objects are found with a single catalog query and dropped, in
+    dependency order, with a single statement in one transaction.
 
     Parameters
     ----------
     context_id : str
         The id of the experiment
+
+    Returns
+    ------
+    int
+        The number of dropped objects.
+    """
+    objects = MonetDB().execute_with_result(
+        f"""
+        SELECT name, type FROM tables
+        WHERE name LIKE '%{context_id.lower()}%'
+        AND system = false
+        UNION ALL
+        SELECT DISTINCT name, {FUNCTION_OBJECT_TYPE} FROM functions
+        WHERE name LIKE '%{context_id.lower()}%'
+        AND system = false
+        """
+    )
+    # The shared views are released separately, their names could contain
+    # the context_id by chance
+    objects = [
+        (name, object_type)
+        for name, object_type in objects
+        if name.split("_")[2:3] != [SHARED_CONTEXT_ID]
+    ]
+    if not objects:
+        return 0
+
+    # Views may depend on tables and merge tables on their members. Any other
+    # object type is dropped after them.
+    drop_order = [
+        _convert_mip2monet_table_type(table_type)
+        for table_type in ("view", "merge", "remote", "normal")
+    ] + [FUNCTION_OBJECT_TYPE]
+    drop_ranks = {object_type: rank for rank, object_type in enumerate(drop_order)}
+    objects = sorted(objects, key=lambda obj: drop_ranks.get(obj[1], len(drop_order)))
+
+    # IF EXISTS, the tables may also be dropped by drop_tables concurrently
+    drop_statements = []
+    for name, object_type in objects:
+        if object_type == _convert_mip2monet_table_type("view"):
+            drop_statements.append(f"DROP VIEW IF EXISTS {name};")
+        elif object_type == FUNCTION_OBJECT_TYPE:
+            drop_statements.append(f"DROP ALL FUNCTION {name};")
+        else:
+            drop_statements.append(f"DROP TABLE IF EXISTS {name};")
+
+    MonetDB().execute_in_transaction(
+        lambda: MonetDB().execute("\n".join(drop_statements))
+    )
+    return len(objects)
+
+
+@validate_identifier_names
+def drop_tables(table_names: List[str]):
+    """
+    Drops the given tables of any type, except views, in the given order.
+    Tables that do not exist are skipped.
+
+    Parameters
+    ----------
+    table_names : List[str]
+        The names of the tables. A merge table must precede its members.
     """
-    # TODO We also need to cleanup the udfs with the specific context_id
-    for table_type in ("merge", "remote", "view", "normal"):
-        _delete_table_by_type_and_context_id(table_type, context_id)
+    for table_name in table_names:
+        MonetDB().execute(f"DROP TABLE IF EXISTS {table_name}")
 
 
 def _convert_monet2mip_table_type(monet_table_type: int) -> str:
@@ -231,30 +451,3 @@ def _convert_monet2mip_column_type(column_type: str) -> str:
         raise ValueError(f"Type {column_type} cannot be converted to MIP's types.")
 
     return type_mapping.get(column_type)
-
-
-@validate_identifier_names
-def _delete_table_by_type_and_context_id(table_type: str, context_id: str):
-    """
-    Deletes all tables of specific type with name that contain a specific context_id from the monetdb.
-
-    Parameters
-    ----------
-    table_type : str
-        The type of the table
-    context_id : str
-        The id of the experiment
-    """
-    table_names_and_types = MonetDB().execute_with_result(
-        f"""
-        SELECT name, type FROM tables
-        WHERE name LIKE '%{context_id.lower()}%'
-        AND tables.type = {str(_convert_mip2monet_table_type(table_type))}
-        AND system = false
-        """
-    )
-    for name, table_type in table_names_and_types:
-        if table_type == _convert_mip2monet_table_type("view"):
-            MonetDB().execute(f"DROP VIEW {name}")
-        else:
-            MonetDB().execute(f"DROP TABLE {name}")
@@ -0,0 +1,133 @@
+"""
+The manifest of the csvs imported in a node's database, used to re-import
+only the csvs that changed since the last import.
+
+The manifest records, per pathology, the path, size and sha256 of every
+imported csv, along with its datasets, its row count and the range of the
+row ids of its datasets. A re-import compares the csvs on disk with the
+manifest and replaces only the rows of the datasets of the new, changed or
+removed csvs.
+"""
+import hashlib
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+
+HASH_READ_SIZE = 1024 * 1024
+
+
+@dataclass
+class CSVManifestEntry:
+    csv_path: str
+    size: int
+    sha256: str
+    datasets: Set[str] = field(default_factory=set)
+    row_count: Optional[int] = None
+    first_row_id: Optional[int] = None
+    last_row_id: Optional[int] = None
+
+
+@dataclass
+class IncrementalImportPlan:
+    csvs_to_import: List[str]
+    removed_csvs: List[str]
+    replaced_datasets: Set[str]
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.csvs_to_import or self.removed_csvs)
+
+
+def create_csv_manifest_entry(csv_file_path: Path, data_path: Path) -> CSVManifestEntry:
+    """
+    Creates the manifest entry of a csv, without its datasets and rows. The
+    path of the csv is kept relative to the folder of the data, so that the
+    manifest stays valid when the folder moves.
+    """
+    sha256 = hashlib.sha256()
+    with open(csv_file_path, "rb") as csv_file:
+        for chunk in iter(lambda: csv_file.read(HASH_READ_SIZE), b""):
+            sha256.update(chunk)
+    return CSVManifestEntry(
+        csv_path=Path(csv_file_path).relative_to(data_path).as_posix(),
+        size=Path(csv_file_path).stat().st_size,
+        sha256=sha256.hexdigest(),
+    )
+
+
+def get_changed_csvs(
+    csv_entries: Dict[str, CSVManifestEntry],
+    manifest_entries: Dict[str, CSVManifestEntry],
+) -> List[str]:
+    """
+    Returns the csvs that are not in the manifest or whose content changed.
+    """
+    return [
+        csv_path
+        for csv_path, csv_entry in csv_entries.items()
+        if csv_path not in manifest_entries
+        or manifest_entries[csv_path].size != csv_entry.size
+        or manifest_entries[csv_path].sha256 != csv_entry.sha256
+    ]
+
+
+def plan_incremental_import(
+    csv_entries: Dict[str, CSVManifestEntry],
+    manifest_entries: Dict[str, CSVManifestEntry],
+) -> IncrementalImportPlan:
+    """
+    Plans the re-import of the csvs of a pathology.
+
+    The rows are replaced per dataset, so the datasets of the changed csvs,
+    before and after the change, and of the removed csvs are replaced. Every
+    other csv holding rows of a replaced dataset is imported again as well,
+    which may in turn add its datasets to the replaced ones.
+
+    Parameters
+    ----------
+    csv_entries : Dict[str, CSVManifestEntry]
+        The entries of the csvs on disk, keyed by path. The entries of the
+        changed csvs must have their datasets.
+    manifest_entries : Dict[str, CSVManifestEntry]
+        The entries of the manifest, keyed by path.
+
+    Returns
+    ------
+    IncrementalImportPlan
+        The csvs to import, the csvs removed and the datasets whose rows are replaced.
+    """
+    csvs_to_import = set(get_changed_csvs(csv_entries, manifest_entries))
+    removed_csvs = {
+        csv_path for csv_path in manifest_entries if csv_path not in csv_entries
+    }
+
+    replaced_datasets = set()
+    for csv_path in csvs_to_import:
+        replaced_datasets |= csv_entries[csv_path].datasets
+    for csv_path in csvs_to_import | removed_csvs:
+        if csv_path in manifest_entries:
+            replaced_datasets |= manifest_entries[csv_path].datasets
+
+    while True:
+        csvs_of_replaced_datasets = {
+            csv_path
+            for csv_path in csv_entries
+            if csv_path not in csvs_to_import
+            and manifest_entries[csv_path].datasets & replaced_datasets
+        }
+        if not csvs_of_replaced_datasets:
+            break
+        for csv_path in csvs_of_replaced_datasets:
+            csv_entries[csv_path].datasets = manifest_entries[csv_path].datasets
+            replaced_datasets |= manifest_entries[csv_path].datasets
+        csvs_to_import |= csvs_of_replaced_datasets
+
+    return IncrementalImportPlan(
+        csvs_to_import=sorted(csvs_to_import),
+        removed_csvs=sorted(removed_csvs),
+        replaced_datasets=replaced_datasets,
+    )
@@ -1,9 +1,18 @@
 import csv
+import json
 import os
+import time
 from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 from typing import Dict
 from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import pymonetdb
 
 from sqlalchemy import Boolean
 from sqlalchemy import Column
@@ -14,12 +23,33 @@ from sqlalchemy import String
 from sqlalchemy import Table
 from sqlalchemy import create_engine
 from sqlalchemy import null
-from sqlalchemy.exc import OperationalError
+from sqlalchemy import text
 
 from mipengine.common.common_data_elements import CommonDataElement
 from mipengine.common.common_data_elements import common_data_elements
-
-AMOUNT_OF_ROWS_TO_INSERT_INTO_SQL_PER_CALL = 100
+from mipengine.node.monetdb_interface.common_actions import SHARED_CONTEXT_ID
+from mipengine.node.monetdb_interface.common_actions import create_dataset_partition_name
+from mipengine.node.monetdb_interface.csv_import_manifest import CSVManifestEntry
+from mipengine.node.monetdb_interface.csv_import_manifest import IncrementalImportPlan
+from mipengine.node.monetdb_interface.csv_import_manifest import create_csv_manifest_entry
+from mipengine.node.monetdb_interface.csv_import_manifest import get_changed_csvs
+from mipengine.node.monetdb_interface.csv_import_manifest import plan_incremental_import
+from mipengine.node.monetdb_interface.csv_validator import CSVValidationReport
+from mipengine.node.monetdb_interface.csv_validator import validate_csv
+from mipengine.node.monetdb_interface.statistics import ColumnStatisticsAccumulator
+from mipengine.node.monetdb_interface.statistics import convert_statistics_to_parameters
+from mipengine.node.monetdb_interface.statistics import create_statistics_table_query
+from mipengine.node.monetdb_interface.statistics import get_statistics_table_name
+from mipengine.node.monetdb_interface.statistics import insert_statistics_query
+from mipengine.node.monetdb_interface.views import SHARED_VIEWS_REGISTRY
+
+COPY_INTO_BATCH_SIZE = 100000
+IMPORT_OCC_MAX_ATTEMPTS = 10
+REPORTED_FAILED_ROWS = 10
+MANIFEST_TABLE_NAME = "csv_import_manifest"
+# The types of the views and the merge tables in the tables catalog
+VIEW_TABLE_TYPE = 1
+MERGE_TABLE_TYPE = 3
 
 
 def create_pathology_metadata_table(pathology: str,
@@ -81,6 +111,178 @@ def convert_sql_type_to_monetdb_type(sql_type: str):
     }[str.lower(sql_type)]
 
 
+def convert_sql_type_to_monetdb_sql_type(sql_type: str):
+    """ Converts metadata sql type to the monetdb type, used in raw sql queries
+    int -> INT
+    real -> FLOAT
+    text -> VARCHAR(100)
+    """
+    return {
+        "int": "INT",
+        "real": "FLOAT",
+        "text": "VARCHAR(100)"
+    }[str.lower(sql_type)]
+
+
+def drop_pathology_data_tables(pathology: str, force_release_shared_views: bool = False):
+    """
+    Drops the data table of the pathology and, if it is partitioned by dataset,
+    its partition tables and the sequence of its row ids.
+    """
+    data_table_name = pathology + "_data"
+    partition_names_prefix = create_dataset_partition_name(pathology, "")
+    partition_names = [name for (name,) in db_engine.execute("SELECT name FROM sys.tables WHERE system = false")
+                       if name.startswith(partition_names_prefix)]
+
+    release_dependent_shared_views([data_table_name] + partition_names, force_release_shared_views)
+    db_engine.execute(f"DROP TABLE IF EXISTS {data_table_name}")
+    for partition_name in partition_names:
+        db_engine.execute(f"DROP TABLE IF EXISTS {partition_name}")
+
+    row_id_sequence_name = pathology + "_row_id_seq"
+    if db_engine.execute(f"SELECT 1 FROM sys.sequences WHERE name = '{row_id_sequence_name}'").fetchall():
+        db_engine.execute(f"DROP SEQUENCE {row_id_sequence_name}")
+
+
+def create_pathology_partitioned_data_table(pathology: str,
+                                            pathology_common_data_elements: Dict[str, CommonDataElement],
+                                            datasets: Set[str]):
+    """
+    Creates the data table of the pathology as a MERGE TABLE partitioned by
+    the values of the dataset column, with one partition table per dataset.
+    The rows inserted in the data table are routed to the partition of their dataset.
+
+    A view on some of the datasets then reads only their partitions, instead of
+    scanning the data of all the datasets. The row ids are unique across the
+    partitions, they are all taken from the same sequence.
+    """
+    data_table_name = pathology + "_data"
+    row_id_sequence_name = pathology + "_row_id_seq"
+    db_engine.execute(f"CREATE SEQUENCE {row_id_sequence_name} AS INT")
+
+    columns_definitions = get_partitioned_data_table_columns_definitions(pathology,
+                                                                         pathology_common_data_elements)
+    db_engine.execute(f"CREATE MERGE TABLE {data_table_name} ({columns_definitions}) "
+                      f"PARTITION BY VALUES ON (dataset)")
+    for dataset in sorted(datasets):
+        add_dataset_partition(pathology, dataset, columns_definitions)
+
+
+def get_partitioned_data_table_columns_definitions(pathology: str,
+                                                   pathology_common_data_elements: Dict[str, CommonDataElement]):
+    row_id_sequence_name = pathology + "_row_id_seq"
+    columns_definitions = [f"row_id INT DEFAULT NEXT VALUE FOR {row_id_sequence_name}"]
+    columns_definitions += [f"{cde_code.lower()} {convert_sql_type_to_monetdb_sql_type(cde.sql_type)}"
+                            for cde_code, cde in pathology_common_data_elements.items()]
+    return ", ".join(columns_definitions)
+
+
+def add_dataset_partition(pathology: str, dataset: str, columns_definitions: str):
+    data_table_name = pathology + "_data"
+    partition_name = create_dataset_partition_name(pathology, dataset)
+    dataset_sql_value = dataset.replace("'", "''")
+    db_engine.execute(f"CREATE TABLE {partition_name} ({columns_definitions})")
+    db_engine.execute(f"ALTER TABLE {data_table_name} ADD TABLE {partition_name} "
+                      f"AS PARTITION IN ('{dataset_sql_value}')")
+
+
+def drop_dataset_partition(pathology: str, dataset: str, force_release_shared_views: bool = False):
+    data_table_name = pathology + "_data"
+    partition_name = create_dataset_partition_name(pathology, dataset)
+    if db_engine.execute(text("SELECT 1 FROM sys.tables WHERE name = :name"), name=partition_name).fetchall():
+        release_dependent_shared_views([partition_name], force_release_shared_views)
+        db_engine.execute(f"ALTER TABLE {data_table_name} DROP TABLE {partition_name}")
+        db_engine.execute(f"DROP TABLE {partition_name}")
+
+
+def release_dependent_shared_views(table_names: List[str], force_release_shared_views: bool = False):
+    """
+    Drops the shared views that read the given tables, so that the tables can be
+    dropped. Refuses, with an error, if a running experiment still uses one of them.
+
+    The expired references of the registry, left by experiments that crashed before
+    releasing their views, are ignored. With force_release_shared_views, the views are
+    released even if experiments still use them.
+    """
+    table_names_parameters = {f"table{index}": table_name for index, table_name in enumerate(table_names)}
+    table_names_placeholders = ", ".join(f":{name}" for name in table_names_parameters)
+    dependent_view_names = [
+        name for (name,) in db_engine.execute(
+            text(f"SELECT DISTINCT views.name FROM sys.dependencies AS dependencies "
+                 f"INNER JOIN sys.tables AS tables ON tables.id = dependencies.id "
+                 f"INNER JOIN sys.tables AS views ON views.id = dependencies.depend_id "
+                 f"WHERE views.type = {VIEW_TABLE_TYPE} AND tables.name IN ({table_names_placeholders})"),
+            **table_names_parameters
+        ).fetchall()
+    ]
+    shared_view_names = [name for name in dependent_view_names if name.split("_")[2:3] == [SHARED_CONTEXT_ID]]
+    if not shared_view_names:
+        return
+
+    used_view_names = set()
+    registry_exists = bool(
+        db_engine.execute(text("SELECT 1 FROM sys.tables WHERE name = :name"), name=SHARED_VIEWS_REGISTRY).fetchall()
+    )
+    if registry_exists:
+        used_view_names = {name for (name,) in db_engine.execute(f"SELECT DISTINCT view_name FROM {SHARED_VIEWS_REGISTRY} "
+                                                                 f"WHERE expires_at >= CURRENT_TIMESTAMP")}
+    used_shared_view_names = [name for name in shared_view_names if name in used_view_names]
+    if used_shared_view_names and not force_release_shared_views:
+        raise ValueError(f"The tables: {', '.join(table_names)} can not be dropped, the shared views: "
+                         f"{', '.join(used_shared_view_names)} of running experiments read them. "
+                         f"Use --force_release_shared_views to release them anyway.")
+    for view_name in shared_view_names:
+        if registry_exists:
+            db_engine.execute(text(f"DELETE FROM {SHARED_VIEWS_REGISTRY} WHERE view_name = :view_name"),
+                              view_name=view_name)
+        db_engine.execute(f"DROP VIEW IF EXISTS {view_name}")
+
+
+def get_data_table_layout(pathology: str) -> Optional[str]:
+    """
+    Returns "partitioned" if the data table of the pathology is partitioned by
+    dataset, "normal" if it is not and None if it does not exist.
+    """
+    data_table_type = db_engine.execute(text("SELECT type FROM sys.tables WHERE name = :name AND system = false"),
+                                        name=pathology + "_data").fetchall()
+    if not data_table_type:
+        return None
+    return "partitioned" if data_table_type[0][0] == MERGE_TABLE_TYPE else "normal"
+
+
+def get_datasets_of_csvs(csv_file_paths: List[Path]) -> Set[str]:
+    """
+    Returns the values of the dataset column in all the csvs.
+    """
+    datasets = set()
+    for csv_file_path in csv_file_paths:
+        csv_datasets = get_datasets_of_csv(csv_file_path)
+        if csv_datasets is None:
+            raise KeyError(f"Column dataset does not exist in the csv: {csv_file_path}")
+        datasets |= csv_datasets
+    return datasets
+
+
+def get_datasets_of_csv(csv_file_path: Path) -> Optional[Set[str]]:
+    """
+    Returns the values of the dataset column of a csv, or None if the csv has
+    no dataset column.
+    """
+    datasets = set()
+    with open(csv_file_path, "r", encoding="utf-8") as dataset_csv_content:
+        dataset_csv_reader = csv.reader(dataset_csv_content)
+        csv_header = next(dataset_csv_reader)
+        if 'dataset' not in csv_header:
+            return None
+        dataset_column_index = csv_header.index('dataset')
+        for row in dataset_csv_reader:
+            dataset = row[dataset_column_index].strip()
+            if dataset == '':
+                raise ValueError(f"Empty dataset value in the csv: {csv_file_path}")
+            datasets.add(dataset)
+    return datasets
+
+
 def create_pathology_data_table(pathology: str,
                                 pathology_common_data_elements: Dict[str, CommonDataElement]):
     column_names = [cde_code for cde_code, cde in pathology_common_data_elements.items()]
@@ -106,204 +308,651 @@ def create_pathology_data_table(pathology: str,
 
 def import_dataset_csv_into_data_table(csv_file_path: Path,
                                        pathology: str,
-                                       pathology_common_data_elements: Dict[str, CommonDataElement]):
-    data_table_name = pathology + "_data"
+                                       pathology_common_data_elements: Dict[str, CommonDataElement],
+                                       manifest_entry: Optional[CSVManifestEntry] = None):
+    """
+    Loads a dataset csv into the data table of the pathology.
 
-    # Open the csv
-    dataset_csv_content = open(csv_file_path, "r", encoding="utf-8")
-    dataset_csv_reader = csv.reader(dataset_csv_content)
-
-    # Validate that all columns exist
-    csv_header = next(dataset_csv_reader)
-    for column in csv_header:
-        if column not in pathology_common_data_elements.keys():
-            raise KeyError('Column ' + column + ' does not exist in the metadata!')
-
-    # Create the prefix for the INSERT statement ("INSERT INTO ... ( COLUMN_A, ... )
-    insert_query_columns = ','.join(csv_header)
-    insert_query_prefix = f"INSERT INTO {data_table_name} ({insert_query_columns}) VALUES "
-
-    # Insert data
-    row_counter = 0
-    bulk_insert_query_values = "("
-    for row in dataset_csv_reader:
-        row_counter += 1
-
-        for (value, column) in zip(row, csv_header):
-            # Validate the value enumerations
-            # column_enumerations = pathology_common_data_elements[column].enumerations
-            # # print(f"column_enumerations-> {column_enumerations}")
-            # if column_enumerations and value and value not in column_enumerations:
-            #     breakpoint()
-            #     if value not in [str(c) for c in column_enumerations]:
-            #         breakpoint()
-            #         raise ValueError(f"Value {value} in column {column} does not "
-            #                          f"have one of the allowed enumerations: {column_enumerations}")
-
-            # Validate the value, min limit
-            column_min_value = pathology_common_data_elements[column].min
-            if column_min_value and value and value < column_min_value:
-                raise ValueError(f"Value {value} in column {column} should be less than {column_min_value}")
-
-            # Validate the value, max limit
-            column_max_value = pathology_common_data_elements[column].max
-            if column_max_value and value and value > column_max_value:
-                raise ValueError(f"Value {value} in column {column} should be greater than {column_max_value}")
-
-            # Add the value to the insert query
-            if value.strip() == '':
-                bulk_insert_query_values += 'null, '
-            elif pathology_common_data_elements[column].sql_type == 'text':
-                bulk_insert_query_values += "'" + value.strip() + "', "
-            else:
-                bulk_insert_query_values += value.strip() + ", "
-
-        # Execute insert query every AMOUNT_OF_ROWS_TO_INSERT_INTO_SQL_PER_CALL rows
-        if row_counter % AMOUNT_OF_ROWS_TO_INSERT_INTO_SQL_PER_CALL == 0:
-            bulk_insert_query_values = bulk_insert_query_values[:-2]
-            bulk_insert_query_values += ');'
-
-            try:
-                db_engine.execute(insert_query_prefix + bulk_insert_query_values)
-            except OperationalError:
-                find_error_on_bulk_insert_query(data_table_name,
-                                                bulk_insert_query_values,
-                                                csv_header,
-                                                pathology_common_data_elements,
-                                                csv_file_path)
-                raise ValueError("Error inserting the CSV to the database.")
-
-            bulk_insert_query_values = "("
-        else:
-            bulk_insert_query_values = bulk_insert_query_values[:-2]
-            bulk_insert_query_values += '),('
+    The csv is normalized in a single streaming pass and loaded
+    with COPY INTO ... FROM STDIN, COPY_INTO_BATCH_SIZE rows at a time. The
+    whole csv is loaded in one transaction, so a failing csv leaves no rows behind.
+    The manifest entry of the csv, if given, and the statistics of its columns
+    per dataset, computed on each batch, are recorded in the same transaction.
+    """
+    data_table_name = pathology + "_data"
 
-    # Insertion of the last rows
-    if row_counter % AMOUNT_OF_ROWS_TO_INSERT_INTO_SQL_PER_CALL != 0:
-        bulk_insert_query_values = bulk_insert_query_values[:-3]
-        bulk_insert_query_values += ');'
+    with open(csv_file_path, "r", encoding="utf-8") as dataset_csv_content:
+        dataset_csv_reader = csv.reader(dataset_csv_content)
+
+        # Validate that all columns exist
+        csv_header = next(dataset_csv_reader)
+        for column in csv_header:
+            if column not in pathology_common_data_elements.keys():
+                raise KeyError('Column ' + column + ' does not exist in the metadata!')
+        columns_common_data_elements = [pathology_common_data_elements[column] for column in csv_header]
+        # Without a dataset column the statistics can not be kept per dataset
+        statistics_accumulator = None
+        if 'dataset' in csv_header:
+            statistics_accumulator = ColumnStatisticsAccumulator(csv_header, columns_common_data_elements)
+
+        connection = db_engine.raw_connection()
+        try:
+            start_time = time.time()
+            rows_loaded = 0
+            batch = []
+            batch_rows = []
+            for row in dataset_csv_reader:
+                line_number = dataset_csv_reader.line_num
+                batch.append((line_number, normalize_csv_row(row, csv_header, columns_common_data_elements,
+                                                             csv_file_path, line_number)))
+                batch_rows.append(row)
+                if len(batch) == COPY_INTO_BATCH_SIZE:
+                    copy_batch_into_data_table(connection, data_table_name, csv_header, batch, csv_file_path)
+                    if statistics_accumulator is not None:
+                        statistics_accumulator.add_rows(batch_rows)
+                    rows_loaded += len(batch)
+                    print_import_progress(csv_file_path, rows_loaded, start_time)
+                    batch = []
+                    batch_rows = []
+
+            # Loading of the last rows
+            if batch:
+                copy_batch_into_data_table(connection, data_table_name, csv_header, batch, csv_file_path)
+                if statistics_accumulator is not None:
+                    statistics_accumulator.add_rows(batch_rows)
+                rows_loaded += len(batch)
+            if manifest_entry is not None:
+                manifest_entry.datasets = statistics_accumulator.datasets if statistics_accumulator is not None else set()
+                manifest_entry.row_count = rows_loaded
+                insert_manifest_entry(connection, pathology, manifest_entry)
+            if statistics_accumulator is not None:
+                csv_path = manifest_entry.csv_path if manifest_entry is not None else str(csv_file_path)
+                insert_statistics(connection, pathology, csv_path, statistics_accumulator)
+            connection.commit()
+            print_import_progress(csv_file_path, rows_loaded, start_time)
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+
+def normalize_csv_row(row: List[str],
+                      csv_header: List[str],
+                      columns_common_data_elements: List[CommonDataElement],
+                      csv_file_path: Path,
+                      line_number: int) -> List[str]:
+    """
+    Converts a csv row, already validated by validate_csv, to the values of a
+    line of COPY INTO data. Empty values become NULL.
+    """
+    if len(row) != len(csv_header):
+        raise ValueError(f"Line {line_number} of csv: {csv_file_path} has {len(row)} values, "
+                         f"while the header has {len(csv_header)} columns.")
+
+    copy_into_values = []
+    for (value, column, common_data_element) in zip(row, csv_header, columns_common_data_elements):
+        value = value.strip()
+        if value == '':
+            copy_into_values.append('')
+            continue
+
+        if common_data_element.sql_type == 'text':
+            escaped_value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            copy_into_values.append(f'"{escaped_value}"')
+            continue
 
         try:
-            db_engine.execute(insert_query_prefix + bulk_insert_query_values)
-        except OperationalError:
-            find_error_on_bulk_insert_query(data_table_name,
-                                            bulk_insert_query_values,
-                                            csv_header,
-                                            pathology_common_data_elements,
-                                            csv_file_path)
-
-
-def find_error_on_bulk_insert_query(data_table_name: str,
-                                    bulk_insert_query: str,
-                                    csv_header: List[str],
-                                    pathology_common_data_elements: Dict[str, CommonDataElement],
-                                    csv_file_path: Path):
-    # Removing the first and last parenthesis
-    bulk_insert_query = bulk_insert_query[1:-2]
-    # Removing the ' from character values
-    bulk_insert_query = bulk_insert_query.replace("\'", "")
-    # Call findErrorOnSqlQuery for each row in the bulk query
-    for row in bulk_insert_query.split('),('):
-        find_error_on_sql_query(data_table_name,
-                                row.split(','),
-                                csv_header,
-                                pathology_common_data_elements,
-                                csv_file_path)
+            if common_data_element.sql_type == 'int':
+                numeric_value = float(value)
+                if not numeric_value.is_integer():
+                    raise ValueError
+                numeric_value = int(numeric_value)
+            else:
+                numeric_value = float(value)
+        except ValueError:
+            raise ValueError(f"Value {value} in column {column}, at line {line_number} of csv: {csv_file_path}, "
+                             f"is not of type {common_data_element.sql_type}.")
+
+        copy_into_values.append(repr(numeric_value))
+    return copy_into_values
+
+
+def copy_batch_into_data_table(connection,
+                               data_table_name: str,
+                               csv_header: List[str],
+                               batch: List[Tuple[int, List[str]]],
+                               csv_file_path: Path):
+    try:
+        execute_copy_into(connection, data_table_name, csv_header, [values for _, values in batch])
+    except pymonetdb.exceptions.IntegrityError:
+        # A concurrency conflict, not an error of the data
+        raise
+    except pymonetdb.exceptions.Error:
+        connection.rollback()
+        find_error_on_copy_into_batch(connection, data_table_name, csv_header, batch, csv_file_path)
+        raise ValueError(f"Error inserting the csv: {csv_file_path} to the database.")
+
+
+def execute_copy_into(connection, data_table_name: str, columns: List[str], rows: List[List[str]]):
+    copy_into_query = (f"COPY {len(rows)} RECORDS INTO {data_table_name} ({','.join(columns)}) "
+                       f"FROM STDIN USING DELIMITERS ',', E'\\n', '\"' NULL AS '';\n")
+    copy_into_data = "".join(",".join(values) + "\n" for values in rows)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(copy_into_query + copy_into_data)
+    finally:
+        cursor.close()
+
+
+def get_copy_into_error(connection,
+                        data_table_name: str,
+                        columns: List[str],
+                        rows: List[List[str]]) -> Optional[Exception]:
+    """
+    Tries to load the rows and always rolls back, so nothing is written.
+    Returns the database error, if the rows can not be loaded.
+    """
+    try:
+        execute_copy_into(connection, data_table_name, columns, rows)
+        return None
+    except pymonetdb.exceptions.Error as exc:
+        return exc
+    finally:
+        connection.rollback()
+
+
+def find_error_on_copy_into_batch(connection,
+                                  data_table_name: str,
+                                  csv_header: List[str],
+                                  batch: List[Tuple[int, List[str]]],
+                                  csv_file_path: Path):
+    """
+    Finds the rows of a failed batch, and their columns, that the database
+    rejects, and raises an error reporting them.
+
+    The batch is split in halves recursively, loading each half in a transaction
+    that is rolled back, so a failing row is found with O(log n) statements and
+    nothing is written. The columns of a failing row are found by bisection too.
+    At most REPORTED_FAILED_ROWS rows are searched for.
+    """
+    failed_rows = find_failed_rows(connection, data_table_name, csv_header, batch)
+    if not failed_rows:
+        return
+
+    failed_rows_reports = []
+    for line_number, values, error in failed_rows:
+        failed_columns = find_failed_columns(connection, data_table_name, csv_header, values)
+        failed_values = ", ".join(f"{csv_header[index]}={values[index]}" for index in failed_columns)
+        failed_rows_reports.append(
+            f"""Could not insert line: {line_number},
+            with values: {failed_values or ','.join(values)},
+            Database error: {error}"""
+        )
     raise ValueError(
         f"""Error inserting into the database,
-        while inserting csv: {csv_file_path} 
-        """
+        while inserting csv: {csv_file_path}
+        """ + "\n".join(failed_rows_reports)
     )
 
 
-def find_error_on_sql_query(data_table_name: str,
-                            row_values: List[str],
-                            csv_header: List[str],
-                            pathology_common_data_elements: Dict[str, CommonDataElement],
-                            csv_file_path: Path):
-    # Insert the code column into the database
-    # and then update it for each row to find where the problem is
-    if csv_header[0] != 'subjectcode':
-        raise ValueError(
-            f"""Error inserting into the database, 
-                the csv: {csv_file_path} , 
-                subjectcode is not the first column.
-                """
+def find_failed_rows(connection,
+                     data_table_name: str,
+                     csv_header: List[str],
+                     batch: List[Tuple[int, List[str]]]) -> List[Tuple[int, List[str], Exception]]:
+    if len(batch) == 1:
+        (line_number, values), = batch
+        error = get_copy_into_error(connection, data_table_name, csv_header, [values])
+        return [(line_number, values, error)] if error else []
+
+    failed_rows = []
+    middle = len(batch) // 2
+    for half in (batch[:middle], batch[middle:]):
+        if len(failed_rows) >= REPORTED_FAILED_ROWS:
+            break
+        if len(half) > 1 and not get_copy_into_error(connection, data_table_name, csv_header,
+                                                     [values for _, values in half]):
+            continue
+        failed_rows += find_failed_rows(connection, data_table_name, csv_header, half)
+    return failed_rows[:REPORTED_FAILED_ROWS]
+
+
+def find_failed_columns(connection,
+                        data_table_name: str,
+                        csv_header: List[str],
+                        values: List[str],
+                        column_indexes: Optional[List[int]] = None) -> List[int]:
+    """
+    Returns the indexes of the columns of a failed row that the database rejects.
+    A subset of the columns is loaded with the rest left NULL. The dataset column
+    is always loaded, the row can not be routed to a partition without it.
+    When the columns only fail together, all of them are returned.
+    """
+    if column_indexes is None:
+        column_indexes = [index for index, column in enumerate(csv_header) if column != 'dataset']
+    if len(column_indexes) <= 1:
+        return column_indexes
+
+    middle = len(column_indexes) // 2
+    failed_columns = []
+    for half in (column_indexes[:middle], column_indexes[middle:]):
+        probed_indexes = half + [index for index, column in enumerate(csv_header) if column == 'dataset']
+        if get_copy_into_error(connection,
+                               data_table_name,
+                               [csv_header[index] for index in probed_indexes],
+                               [[values[index] for index in probed_indexes]]):
+            failed_columns += find_failed_columns(connection, data_table_name, csv_header, values, half)
+    return failed_columns or column_indexes
+
+
+def print_import_progress(csv_file_path: Path, rows_loaded: int, start_time: float):
+    elapsed_time = time.time() - start_time
+    rows_per_second = rows_loaded / elapsed_time if elapsed_time > 0 else 0
+    print(f"{csv_file_path}: {rows_loaded} rows loaded, {rows_per_second:.0f} rows/sec")
+
+
+def create_statistics_table(pathology: str):
+    db_engine.execute(f"DROP TABLE IF EXISTS {get_statistics_table_name(pathology)}")
+    db_engine.execute(create_statistics_table_query(pathology))
+
+
+def statistics_table_exists(pathology: str) -> bool:
+    return bool(db_engine.execute(text("SELECT 1 FROM sys.tables WHERE name = :name AND system = false"),
+                                  name=get_statistics_table_name(pathology)).fetchall())
+
+
+def delete_statistics(pathology: str, csv_paths: List[str]):
+    for csv_path in csv_paths:
+        db_engine.execute(text(f"DELETE FROM {get_statistics_table_name(pathology)} WHERE csv_path = :csv_path"),
+                          csv_path=csv_path)
+
+
+def insert_statistics(connection,
+                      pathology: str,
+                      csv_path: str,
+                      statistics_accumulator: ColumnStatisticsAccumulator):
+    """
+    Records the statistics of the columns of a csv, using the connection that imported it.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.executemany(
+            insert_statistics_query(pathology),
+            [convert_statistics_to_parameters(csv_path, column_statistics)
+             for column_statistics in statistics_accumulator.get_statistics()]
         )
+    finally:
+        cursor.close()
 
-    subject_code = row_values[0]
-    insert_query = f"INSERT INTO {data_table_name} (subjectcode) VALUES ('{subject_code}')"
-    db_engine.execute(insert_query)
 
-    for (value, column) in zip(row_values[1:], csv_header[1:]):
-        if pathology_common_data_elements[column].sql_type == 'text':
-            update_query = f"UPDATE {data_table_name} SET {column} = '{value.strip()}' " \
-                           f"WHERE subjectcode = '{subject_code}'"
-        elif value.strip() == '':
-            update_query = f"UPDATE {data_table_name} SET {column} = null WHERE subjectcode = '{subject_code}'"
-        else:
-            update_query = f"UPDATE {data_table_name} SET {column} = {value.strip()} " \
-                           f"WHERE subjectcode = '{subject_code}'"
+def create_manifest_table():
+    db_engine.execute(f"""CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE_NAME} (
+                          pathology VARCHAR(100),
+                          csv_path VARCHAR(1000),
+                          size BIGINT,
+                          sha256 VARCHAR(64),
+                          datasets VARCHAR(10000),
+                          row_count INT,
+                          first_row_id INT,
+                          last_row_id INT)""")
+
+
+def get_manifest_entries(pathology: str) -> Dict[str, CSVManifestEntry]:
+    """
+    Returns the manifest entries of the pathology, none if the manifest table was never created.
+    """
+    if not db_engine.execute(text("SELECT 1 FROM sys.tables WHERE name = :name AND system = false"),
+                             name=MANIFEST_TABLE_NAME).fetchall():
+        return {}
+    manifest_rows = db_engine.execute(
+        text(f"SELECT csv_path, size, sha256, datasets, row_count, first_row_id, last_row_id "
+             f"FROM {MANIFEST_TABLE_NAME} WHERE pathology = :pathology"),
+        pathology=pathology
+    ).fetchall()
+    return {
+        csv_path: CSVManifestEntry(csv_path=csv_path,
+                                   size=size,
+                                   sha256=sha256,
+                                   datasets=set(json.loads(datasets)),
+                                   row_count=row_count,
+                                   first_row_id=first_row_id,
+                                   last_row_id=last_row_id)
+        for csv_path, size, sha256, datasets, row_count, first_row_id, last_row_id in manifest_rows
+    }
+
+
+def delete_manifest_entries(pathology: str, csv_paths: Optional[List[str]] = None):
+    """
+    Deletes the manifest entries of the given csvs of the pathology, or all of its entries.
+    """
+    if csv_paths is None:
+        db_engine.execute(text(f"DELETE FROM {MANIFEST_TABLE_NAME} WHERE pathology = :pathology"),
+                          pathology=pathology)
+        return
+    for csv_path in csv_paths:
+        db_engine.execute(text(f"DELETE FROM {MANIFEST_TABLE_NAME} "
+                               f"WHERE pathology = :pathology AND csv_path = :csv_path"),
+                          pathology=pathology, csv_path=csv_path)
 
+
+def insert_manifest_entry(connection, pathology: str, manifest_entry: CSVManifestEntry):
+    """
+    Records the manifest entry of a csv, using the connection that imported it.
+    The row range of the entry is the range of the row ids of its datasets.
+    """
+    data_table_name = pathology + "_data"
+    cursor = connection.cursor()
+    try:
+        if manifest_entry.datasets:
+            datasets_parameters = {f"dataset{index}": dataset
+                                   for index, dataset in enumerate(sorted(manifest_entry.datasets))}
+            datasets_placeholders = ", ".join(f"%({name})s" for name in datasets_parameters)
+            cursor.execute(f"SELECT MIN(row_id), MAX(row_id) FROM {data_table_name} "
+                           f"WHERE dataset IN ({datasets_placeholders})",
+                           datasets_parameters)
+            manifest_entry.first_row_id, manifest_entry.last_row_id = cursor.fetchone()
+        cursor.execute(
+            f"INSERT INTO {MANIFEST_TABLE_NAME} VALUES (%(pathology)s, %(csv_path)s, %(size)s, %(sha256)s, "
+            f"%(datasets)s, %(row_count)s, %(first_row_id)s, %(last_row_id)s)",
+            {
+                "pathology": pathology,
+                "csv_path": manifest_entry.csv_path,
+                "size": manifest_entry.size,
+                "sha256": manifest_entry.sha256,
+                "datasets": json.dumps(sorted(manifest_entry.datasets)),
+                "row_count": manifest_entry.row_count,
+                "first_row_id": manifest_entry.first_row_id,
+                "last_row_id": manifest_entry.last_row_id,
+            }
+        )
+    finally:
+        cursor.close()
+
+
+def plan_pathology_import(pathology: str,
+                          csv_entries: Dict[str, CSVManifestEntry],
+                          data_path: Path,
+                          partitioned: bool) -> Optional[IncrementalImportPlan]:
+    """
+    Compares the csvs of the pathology with the manifest of the previous import.
+
+    Returns the plan of the incremental import, or None if the pathology needs
+    a full import: when it was not imported before, with the same layout, or
+    when the rows of a changed csv can not be told apart by their dataset or
+    when the statistics of the pathology were never computed.
+    """
+    requested_layout = "partitioned" if partitioned else "normal"
+    if get_data_table_layout(pathology) != requested_layout:
+        return None
+    if not statistics_table_exists(pathology):
+        return None
+    manifest_entries = get_manifest_entries(pathology)
+    if not manifest_entries:
+        return None
+
+    changed_csvs = get_changed_csvs(csv_entries, manifest_entries)
+    removed_csvs = [csv_path for csv_path in manifest_entries if csv_path not in csv_entries]
+    for csv_path in changed_csvs + removed_csvs:
+        if csv_path in manifest_entries and not manifest_entries[csv_path].datasets:
+            return None
+    for csv_path in changed_csvs:
+        datasets = get_datasets_of_csv(data_path / csv_path)
+        if not datasets:
+            return None
+        csv_entries[csv_path].datasets = datasets
+    return plan_incremental_import(csv_entries, manifest_entries)
+
+
+def replace_datasets_rows(pathology: str,
+                          import_plan: IncrementalImportPlan,
+                          csv_entries: Dict[str, CSVManifestEntry],
+                          partitioned: bool,
+                          force_release_shared_views: bool = False):
+    """
+    Deletes the rows of the replaced datasets, or their partitions, along with the
+    manifest entries and the statistics of the csvs to import and the removed ones. The
+    manifest entries are deleted first, so if the import stops midway the next one imports
+    these csvs again.
+    """
+    delete_manifest_entries(pathology, import_plan.csvs_to_import + import_plan.removed_csvs)
+    delete_statistics(pathology, import_plan.csvs_to_import + import_plan.removed_csvs)
+    if partitioned:
+        columns_definitions = get_partitioned_data_table_columns_definitions(
+            pathology, common_data_elements.pathologies[pathology]
+        )
+        imported_datasets = set()
+        for csv_path in import_plan.csvs_to_import:
+            imported_datasets |= csv_entries[csv_path].datasets
+        for dataset in sorted(import_plan.replaced_datasets):
+            drop_dataset_partition(pathology, dataset, force_release_shared_views)
+            if dataset in imported_datasets:
+                add_dataset_partition(pathology, dataset, columns_definitions)
+    else:
+        for dataset in sorted(import_plan.replaced_datasets):
+            db_engine.execute(text(f"DELETE FROM {pathology}_data WHERE dataset = :dataset"), dataset=dataset)
+
+
+def print_import_plan(pathology: str,
+                      import_plan: Optional[IncrementalImportPlan],
+                      csv_entries: Dict[str, CSVManifestEntry]):
+    if import_plan is None:
+        print(f"Pathology {pathology}: full import of {len(csv_entries)} CSVs.")
+        return
+    if not import_plan.has_changes:
+        print(f"Pathology {pathology}: no changes.")
+        return
+    unchanged_csvs_count = len(csv_entries) - len(import_plan.csvs_to_import)
+    print(f"Pathology {pathology}: incremental import.\n"
+          f"  CSVs to import: {', '.join(import_plan.csvs_to_import) or '-'}\n"
+          f"  Removed CSVs: {', '.join(import_plan.removed_csvs) or '-'}\n"
+          f"  Replaced datasets: {', '.join(sorted(import_plan.replaced_datasets)) or '-'}\n"
+          f"  Unchanged CSVs: {unchanged_csvs_count}")
+
+
+def connect_to_db(db_url: str):
+    """
+    Creates the db engine of the process. Called by main and by every process of
+    the pool, since the connections of the engine can not be shared among processes.
+    """
+    global db_engine
+    db_engine = create_engine(db_url)
+
+
+def validate_pathology_csv(csv_file_path: Path, pathology: str) -> CSVValidationReport:
+    print(f"Validating CSV: {csv_file_path}")
+    return validate_csv(csv_file_path, common_data_elements.pathologies[pathology])
+
+
+def import_pathology_csv(csv_file_path: Path, pathology: str, manifest_entry: CSVManifestEntry) -> Optional[str]:
+    """
+    Imports a csv in a transaction of its own. The csvs of the other pathologies,
+    imported concurrently, write to other tables, except for the manifest table,
+    so the import is retried when it conflicts with them on the manifest entries.
+
+    Returns the error, if the import failed, instead of raising it, so that a
+    failing csv does not stop the import of the rest.
+    """
+    for _ in range(IMPORT_OCC_MAX_ATTEMPTS):
         try:
-            db_engine.execute(update_query)
-        except OperationalError:
-            raise ValueError(
-                f"""Error inserting into the database. 
-                Could not insert value: '{value.strip()}', 
-                into column: '{column}', 
-                at row with subjectcode: {subject_code}, 
-                while inserting csv: {csv_file_path} 
-                """
-            )
-
-
-parser = ArgumentParser()
-parser.add_argument('-folder', '--pathologies_folder_path', required=True,
-                    help='The folder with the pathologies data.')
-parser.add_argument('-spec', '--specific_pathologies', required=False,
-                    help='Specific pathologies to parse.')
-parser.add_argument('-user', '--monetdb_username', required=True,
-                    help='MonetDB username.')
-parser.add_argument('-pass', '--monetdb_password', required=True,
-                    help='MonetDB password.')
-parser.add_argument('-url', '--monetdb_url', required=True,
-                    help='MonetDB url.')
-parser.add_argument('-farm', '--monetdb_farm', required=True,
-                    help='MonetDB farm.')
-
-args = parser.parse_args()
-data_path = args.pathologies_folder_path
-pathologies_to_parse = args.specific_pathologies
-monetdb_username = args.monetdb_username
-monetdb_password = args.monetdb_password
-monetdb_url = args.monetdb_url
-monetdb_farm = args.monetdb_farm
+            print(f"Importing CSV: {csv_file_path}")
+            import_dataset_csv_into_data_table(csv_file_path,
+                                               pathology,
+                                               common_data_elements.pathologies[pathology],
+                                               manifest_entry)
+            return None
+        except pymonetdb.exceptions.IntegrityError as exc:
+            integrity_error = exc
+            continue
+        except Exception as exc:
+            return f"Importing csv: {csv_file_path} failed: {exc}"
+    return f"Importing csv: {csv_file_path} failed, after {IMPORT_OCC_MAX_ATTEMPTS} attempts: {integrity_error}"
+
+
+def import_pathology_csvs(pathology: str,
+                          csv_file_paths: List[Path],
+                          manifest_entries: List[CSVManifestEntry]) -> List[str]:
+    """
+    Imports the csvs of a pathology one after the other. Their COPY INTO write to the
+    same data table, or to the same partitions, so concurrent imports of them would
+    conflict under the optimistic concurrency control of MonetDB and be retried whole.
+
+    Returns the errors of the csvs that failed.
+    """
+    import_errors = [import_pathology_csv(csv_file_path, pathology, manifest_entry)
+                     for csv_file_path, manifest_entry in zip(csv_file_paths, manifest_entries)]
+    return [error for error in import_errors if error is not None]
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('-folder', '--pathologies_folder_path', required=True,
+                        help='The folder with the pathologies data.')
+    parser.add_argument('-spec', '--specific_pathologies', required=False,
+                        help='Specific pathologies to parse.')
+    parser.add_argument('-user', '--monetdb_username', required=True,
+                        help='MonetDB username.')
+    parser.add_argument('-pass', '--monetdb_password', required=True,
+                        help='MonetDB password.')
+    parser.add_argument('-url', '--monetdb_url', required=True,
+                        help='MonetDB url.')
+    parser.add_argument('-farm', '--monetdb_farm', required=True,
+                        help='MonetDB farm.')
+    parser.add_argument('-partitioned', '--partitioned', action='store_true',
+                        help='Partition the data table of each pathology by dataset.')
+    parser.add_argument('-jobs', '--jobs', type=int, default=1,
+                        help='The number of processes that validate the CSVs and import the pathologies.')
+    parser.add_argument('-full', '--full', action='store_true',
+                        help='Import all the CSVs, instead of only the new or changed ones.')
+    parser.add_argument('-dry', '--dry_run', action='store_true',
+                        help='Only report the changes that an import would make.')
+    parser.add_argument('-force_release', '--force_release_shared_views', action='store_true',
+                        help='Drop the shared views that read the replaced data, even if experiments use them.')
+
+    args = parser.parse_args()
+    data_path = args.pathologies_folder_path
+    pathologies_to_parse = args.specific_pathologies
+    monetdb_username = args.monetdb_username
+    monetdb_password = args.monetdb_password
+    monetdb_url = args.monetdb_url
+    monetdb_farm = args.monetdb_farm
+    partitioned = args.partitioned
+    jobs = args.jobs
+    full_import = args.full
+    dry_run = args.dry_run
+    force_release_shared_views = args.force_release_shared_views
+
+    db_url = f'monetdb://{monetdb_username}:{monetdb_password}@{monetdb_url}/{monetdb_farm}:'
+    connect_to_db(db_url)
+
+    data_abs_path = os.path.abspath(data_path)
+    pathology_names = next(os.walk(data_abs_path))[1]
+
+    if pathologies_to_parse is not None:
+        pathologies_to_convert = pathologies_to_parse.split(",")
+        pathology_names = [pathology_name for pathology_name in pathology_names if pathology_name in pathologies_to_convert]
+    print("Importing CSVs for pathologies: " + ",".join(pathology_names))
+
+    pathologies_csv_paths = {
+        pathology_name: sorted(Path(os.path.join(data_abs_path, pathology_name)).glob('*.csv'))
+        for pathology_name in pathology_names
+    }
+    csv_paths = [csv_path for csv_paths in pathologies_csv_paths.values() for csv_path in csv_paths]
+    csv_pathologies = [pathology_name
+                       for pathology_name, csv_paths in pathologies_csv_paths.items()
+                       for _ in csv_paths]
+
+    # With more than one job the csvs are validated and imported by a pool of processes,
+    # each one with its own db connection
+    if jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=connect_to_db, initargs=(db_url,))
+    else:
+        executor = nullcontext()
+    with executor:
+        map_to_csvs = executor.map if jobs > 1 else map
+
+        # Compare the csvs with the manifest of the previous import
+        csv_entries = list(map_to_csvs(create_csv_manifest_entry, csv_paths, [Path(data_abs_path)] * len(csv_paths)))
+        pathologies_csv_entries = {pathology_name: {} for pathology_name in pathology_names}
+        for csv_entry, pathology_name in zip(csv_entries, csv_pathologies):
+            pathologies_csv_entries[pathology_name][csv_entry.csv_path] = csv_entry
+
+        pathologies_import_plans = {}
+        for pathology_name, pathology_csv_entries in pathologies_csv_entries.items():
+            import_plan = None
+            if not full_import:
+                import_plan = plan_pathology_import(pathology_name,
+                                                    pathology_csv_entries,
+                                                    Path(data_abs_path),
+                                                    partitioned)
+            pathologies_import_plans[pathology_name] = import_plan
+            print_import_plan(pathology_name, import_plan, pathology_csv_entries)
+        if dry_run:
+            return
+        create_manifest_table()
+
+        csvs_to_import = [
+            (Path(data_abs_path) / csv_path, pathology_name, csv_entry)
+            for pathology_name, pathology_csv_entries in pathologies_csv_entries.items()
+            for csv_path, csv_entry in pathology_csv_entries.items()
+            if pathologies_import_plans[pathology_name] is None
+            or csv_path in pathologies_import_plans[pathology_name].csvs_to_import
+        ]
+        csvs_to_import_paths = [csv_path for csv_path, _, _ in csvs_to_import]
+        csvs_to_import_pathologies = [pathology_name for _, pathology_name, _ in csvs_to_import]
+
+        # Validate all the csvs to import, before anything is written to the database
+        validation_reports = list(map_to_csvs(validate_pathology_csv, csvs_to_import_paths, csvs_to_import_pathologies))
+        invalid_reports = [str(report) for report in validation_reports if not report.is_valid]
+        if invalid_reports:
+            raise ValueError("\n".join(invalid_reports))
+
+        for pathology_name, import_plan in pathologies_import_plans.items():
+            if import_plan is not None:
+                if import_plan.has_changes:
+                    replace_datasets_rows(pathology_name,
+                                          import_plan,
+                                          pathologies_csv_entries[pathology_name],
+                                          partitioned,
+                                          force_release_shared_views)
+                continue
+
+            create_pathology_metadata_table(pathology_name,
+                                            common_data_elements.pathologies[pathology_name])
+
+            delete_manifest_entries(pathology_name)
+            create_statistics_table(pathology_name)
+            drop_pathology_data_tables(pathology_name, force_release_shared_views)
+            if partitioned:
+                create_pathology_partitioned_data_table(pathology_name,
+                                                        common_data_elements.pathologies[pathology_name],
+                                                        get_datasets_of_csvs(pathologies_csv_paths[pathology_name]))
+            else:
+                create_pathology_data_table(pathology_name,
+                                            common_data_elements.pathologies[pathology_name])
+
+        # Import each csv in its own transaction, a failing csv does not affect the rest.
+        # The pathologies are imported in parallel, the csvs of each one serially.
+        pathologies_to_import = sorted({pathology_name for _, pathology_name, _ in csvs_to_import})
+        pathologies_csvs_to_import_paths = [
+            [csv_path for csv_path, pathology_name, _ in csvs_to_import if pathology_name == pathology]
+            for pathology in pathologies_to_import
+        ]
+        pathologies_csvs_to_import_entries = [
+            [csv_entry for _, pathology_name, csv_entry in csvs_to_import if pathology_name == pathology]
+            for pathology in pathologies_to_import
+        ]
+        import_errors = [error
+                         for pathology_import_errors in map_to_csvs(import_pathology_csvs,
+                                                                    pathologies_to_import,
+                                                                    pathologies_csvs_to_import_paths,
+                                                                    pathologies_csvs_to_import_entries)
+                         for error in pathology_import_errors]
+    if import_errors:
+        raise ValueError("\n".join(import_errors))
+
 
 db_engine_metadata = MetaData()
-db_engine = create_engine(f'monetdb://{monetdb_username}:{monetdb_password}@'
-                          f'{monetdb_url}/{monetdb_farm}:')
-
-data_abs_path = os.path.abspath(data_path)
-pathology_names = next(os.walk(data_abs_path))[1]
-
-if pathologies_to_parse is not None:
-    pathologies_to_convert = pathologies_to_parse.split(",")
-    pathology_names = [pathology_name for pathology_name in pathology_names if pathology_name in pathologies_to_convert]
-print("Importing CSVs for pathologies: " + ",".join(pathology_names))
-
-# Import all pathologies
-for pathology_name in pathology_names:
-    create_pathology_metadata_table(pathology_name,
-                                    common_data_elements.pathologies[pathology_name])
-
-    create_pathology_data_table(pathology_name,
-                                common_data_elements.pathologies[pathology_name])
-
-    # Import each csv of the pathology
-    pathology_folder_path = Path(os.path.join(data_abs_path, pathology_name))
-    for csv_path in pathology_folder_path.glob('*.csv'):
-        print(f"Importing CSV: {csv_path}")
-        import_dataset_csv_into_data_table(csv_path,
-                                           pathology_name,
-                                           common_data_elements.pathologies[pathology_name])
+db_engine = None
+
+if __name__ == '__main__':
+    main()
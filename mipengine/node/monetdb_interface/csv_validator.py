@@ -0,0 +1,183 @@
+"""
+Validation of the dataset csvs against the common data elements of their
+pathology, before they are imported.
+
+The csv is read in chunks of CSV_VALIDATION_CHUNK_SIZE rows, so the memory
+used is bounded, and every check runs on a whole column of a chunk at once.
+The errors are grouped per column and kind, in a report that keeps the
+count of the invalid values and the first rows where they appear. The rows
+are numbered like the lines of the csv, the header being row 1, so they
+match the lines unless a quoted value spans many lines.
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict
+from typing import List
+
+import numpy
+import pandas
+
+from mipengine.common.common_data_elements import CommonDataElement
+
+CSV_VALIDATION_CHUNK_SIZE = 100000
+REPORTED_ROWS_PER_ERROR = 10
+# The columns whose values can not be empty, when they are in the csv
+NOT_NULLABLE_COLUMNS = {"dataset"}
+
+
+class CSVValidationReport:
+    """
+    The errors found in a csv, keyed by column and error description, with
+    the number of invalid values and the first REPORTED_ROWS_PER_ERROR rows
+    where they appear.
+    """
+
+    def __init__(self, csv_file_path: Path):
+        self.csv_file_path = csv_file_path
+        self.errors = OrderedDict()
+
+    def add_error(self, column: str, error: str, row_numbers: numpy.ndarray):
+        if len(row_numbers) == 0:
+            return
+        count, rows = self.errors.get((column, error), (0, []))
+        missing_rows = REPORTED_ROWS_PER_ERROR - len(rows)
+        self.errors[(column, error)] = (
+            count + len(row_numbers),
+            rows + row_numbers[:missing_rows].tolist(),
+        )
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.errors
+
+    def __str__(self):
+        if self.is_valid:
+            return f"The csv: {self.csv_file_path} is valid."
+        report_lines = [f"The csv: {self.csv_file_path} is not valid."]
+        for (column, error), (count, rows) in self.errors.items():
+            rows_str = ", ".join(str(row) for row in rows)
+            if count > len(rows):
+                rows_str += ", ..."
+            report_lines.append(
+                f"Column {column}: {count} values {error}, at rows: {rows_str}"
+            )
+        return "\n".join(report_lines)
+
+
+def validate_csv(
+    csv_file_path: Path,
+    pathology_common_data_elements: Dict[str, CommonDataElement],
+    chunk_size: int = CSV_VALIDATION_CHUNK_SIZE,
+) -> CSVValidationReport:
+    """
+    Validates the columns of a csv against their common data elements.
+
+    Checks that the columns exist in the metadata, and that every value has
+    the type of its cde, a finite number for the numeric cdes, is within the
+    cde's min and max, is one of the cde's enumerations, for categorical
+    cdes, and is not empty, for the NOT_NULLABLE_COLUMNS. Empty values are
+    NULLs.
+
+    Parameters
+    ----------
+    csv_file_path : Path
+        The csv to validate
+    pathology_common_data_elements : Dict[str, CommonDataElement]
+        The cdes of the pathology the csv belongs to
+    chunk_size : int
+        The number of rows validated at once
+
+    Returns
+    ------
+    CSVValidationReport
+        The errors found in the csv.
+    """
+    report = CSVValidationReport(csv_file_path)
+
+    csv_header = pandas.read_csv(csv_file_path, nrows=0).columns.tolist()
+    unknown_columns = [
+        column for column in csv_header if column not in pathology_common_data_elements
+    ]
+    for column in unknown_columns:
+        report.add_error(column, "does not exist in the metadata", numpy.array([1]))
+    if unknown_columns:
+        return report
+
+    chunks = pandas.read_csv(
+        csv_file_path,
+        dtype=str,
+        keep_default_na=False,
+        chunksize=chunk_size,
+    )
+    for chunk in chunks:
+        # The index counts the rows from 0, the data start at row 2
+        row_numbers = chunk.index.to_numpy() + 2
+        for column in csv_header:
+            _validate_column(
+                report,
+                column,
+                chunk[column].str.strip(),
+                pathology_common_data_elements[column],
+                row_numbers,
+            )
+    return report
+
+
+def _validate_column(
+    report: CSVValidationReport,
+    column: str,
+    values: pandas.Series,
+    common_data_element: CommonDataElement,
+    row_numbers: numpy.ndarray,
+):
+    is_null = (values == "").to_numpy()
+    if column in NOT_NULLABLE_COLUMNS:
+        report.add_error(column, "are empty", row_numbers[is_null])
+
+    if common_data_element.sql_type == "text":
+        if common_data_element.categorical and common_data_element.enumerations:
+            is_enumeration = values.isin(common_data_element.enumerations).to_numpy()
+            report.add_error(
+                column,
+                "are not one of the enumerations",
+                row_numbers[~is_null & ~is_enumeration],
+            )
+        return
+
+    numeric_values = pandas.to_numeric(values.mask(is_null), errors="coerce").to_numpy(
+        dtype=float
+    )
+    # to_numeric accepts "inf" and "nan", they are not valid values
+    is_not_numeric = ~is_null & ~numpy.isfinite(numeric_values)
+    if common_data_element.sql_type == "int":
+        with numpy.errstate(invalid="ignore"):
+            is_not_numeric |= ~is_null & (numpy.mod(numeric_values, 1) != 0)
+    report.add_error(
+        column,
+        f"are not of type {common_data_element.sql_type}",
+        row_numbers[is_not_numeric],
+    )
+
+    is_valid_number = ~is_null & ~is_not_numeric
+    if common_data_element.min is not None:
+        report.add_error(
+            column,
+            f"are less than the min {common_data_element.min}",
+            row_numbers[is_valid_number & (numeric_values < common_data_element.min)],
+        )
+    if common_data_element.max is not None:
+        report.add_error(
+            column,
+            f"are greater than the max {common_data_element.max}",
+            row_numbers[is_valid_number & (numeric_values > common_data_element.max)],
+        )
+    if common_data_element.categorical and common_data_element.enumerations:
+        enumerations = pandas.to_numeric(
+            pandas.Series(list(common_data_element.enumerations)), errors="coerce"
+        ).to_numpy(dtype=float)
+        is_enumeration = numpy.isin(numeric_values, enumerations)
+        report.add_error(
+            column,
+            "are not one of the enumerations",
+            row_numbers[is_valid_number & ~is_enumeration],
+        )
@@ -1,5 +1,10 @@
 from contextlib import contextmanager
+from typing import Any
+from typing import Callable
+from typing import Dict
 from typing import List
+from typing import Optional
+from typing import TypeVar
 
 import pymonetdb
 
@@ -8,6 +13,8 @@ from mipengine.common.node_catalog import node_catalog
 
 OCC_MAX_ATTEMPTS = 50
 
+T = TypeVar("T")
+
 
 class Singleton(type):
     """
@@ -48,6 +55,7 @@ class MonetDB(metaclass=Singleton):
             hostname=monetdb_hostname,
             database=config.monetdb.database,
         )
+        self._in_transaction = False
 
     @contextmanager
     def cursor(self):
@@ -59,36 +67,51 @@ class MonetDB(metaclass=Singleton):
         finally:
             cur.close()
 
-    def execute_with_result(self, query: str) -> List:
+    def execute_with_result(
+        self, query: str, parameters: Optional[Dict[str, Any]] = None
+    ) -> List:
         """
         Used to execute select queries that return a result.
+        The parameters, if given, replace the %(name)s placeholders of the query.
 
         Should NOT be used to execute "CREATE, DROP, ALTER, UPDATE, ..." statements.
         """
 
         # We use a single instance of a connection and by committing before a select query we refresh the state of the database.
         # https://stackoverflow.com/questions/9305669/mysql-python-connection-does-not-see-changes-to-database-made-on-another-connect.
-        self._connection.commit()
+        # Inside a transaction the query must see the uncommitted changes instead.
+        if not self._in_transaction:
+            self._connection.commit()
 
         with self.cursor() as cur:
-            cur.execute(query)
+            cur.execute(query, parameters)
             result = cur.fetchall()
             return result
 
-    def execute(self, query: str):
+    def execute(
+        self, query: str, parameters: Optional[Dict[str, Any]] = None
+    ) -> Optional[int]:
         """
         Executes statements that don't have a result. For example "CREATE,DROP,UPDATE".
+        The parameters, if given, replace the %(name)s placeholders of the query
+        and are escaped by pymonetdb.
+        Returns the number of rows the last statement affected, if it reports one.
         And handles the *Optimistic Concurrency Control by giving each call X attempts
         if they fail with pymonetdb.exceptions.IntegrityError .
         *https://www.monetdb.org/blog/optimistic-concurrency-control
         """
 
+        if self._in_transaction:
+            with self.cursor() as cur:
+                cur.execute(query, parameters)
+                return _get_rowcount(cur)
+
         for _ in range(OCC_MAX_ATTEMPTS):
             with self.cursor() as cur:
                 try:
-                    cur.execute(query)
+                    cur.execute(query, parameters)
                     self._connection.commit()
-                    break
+                    return _get_rowcount(cur)
                 except pymonetdb.exceptions.IntegrityError as exc:
                     integrity_error = exc
                     self._connection.rollback()
@@ -98,3 +121,41 @@ class MonetDB(metaclass=Singleton):
                     raise exc
         else:
             raise integrity_error
+
+    def execute_in_transaction(self, func: Callable[[], T]) -> T:
+        """
+        Calls func and groups all the "execute" and "execute_with_result" calls
+        it makes into a single transaction. The transaction is committed when
+        func returns and rolled back if it raises.
+
+        On *Optimistic Concurrency Control conflicts the whole transaction is
+        rolled back and func is called again, up to OCC_MAX_ATTEMPTS times.
+        *https://www.monetdb.org/blog/optimistic-concurrency-control
+        """
+
+        for _ in range(OCC_MAX_ATTEMPTS):
+            self._connection.commit()
+            self._in_transaction = True
+            try:
+                result = func()
+                self._connection.commit()
+                return result
+            except pymonetdb.exceptions.IntegrityError as exc:
+                integrity_error = exc
+                self._connection.rollback()
+                continue
+            except Exception as exc:
+                self._connection.rollback()
+                raise exc
+            finally:
+                self._in_transaction = False
+        else:
+            raise integrity_error
+
+
+def _get_rowcount(cursor) -> Optional[int]:
+    # pymonetdb leaves the rowcount at -1 when no row count is reported
+    rowcount = cursor.rowcount
+    if rowcount is None or rowcount < 0:
+        return None
+    return rowcount
@@ -0,0 +1,285 @@
+"""
+The statistics of the columns of every dataset, computed while the csvs are
+imported and kept in the <pathology>_stats table, one row per csv, dataset
+and column.
+
+The statistics of a dataset split in many csvs are merged when they are
+retrieved, since the counts, the sums, the min/max, the frequencies and the
+histograms of its csvs add up. The means, variances and value counts of a
+dataset are then available without scanning its data.
+"""
+import json
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import numpy
+import pandas
+
+from mipengine.common.common_data_elements import CommonDataElement
+from mipengine.common.node_tasks_DTOs import ColumnStatistics
+from mipengine.common.validate_identifier_names import validate_identifier_names
+from mipengine.node.monetdb_interface.monet_db_connection import MonetDB
+
+HISTOGRAM_BINS = 20
+STATISTICS_TABLE_COLUMNS = [
+    "csv_path VARCHAR(1000)",
+    "dataset VARCHAR(100)",
+    "column_name VARCHAR(100)",
+    "value_count INT",
+    "null_count INT",
+    "value_sum DOUBLE",
+    "value_sum_of_squares DOUBLE",
+    "min_value DOUBLE",
+    "max_value DOUBLE",
+    "frequencies VARCHAR(10000)",
+    "histogram VARCHAR(10000)",
+    "histogram_bin_edges VARCHAR(10000)",
+]
+
+
+def get_statistics_table_name(pathology: str) -> str:
+    return f"{pathology}_stats"
+
+
+class ColumnStatisticsAccumulator:
+    """
+    Computes the statistics of the columns of a csv, per dataset, while the csv
+    is being imported, one batch of rows at a time. Each batch is loaded in a
+    DataFrame and the statistics of its columns are computed with pandas.
+
+    The numeric values are added to the sums and the min/max. The values of
+    categorical cdes are counted per value and the values of numeric cdes with
+    a min and a max are counted in a histogram of HISTOGRAM_BINS bins.
+    """
+
+    def __init__(
+        self,
+        csv_header: List[str],
+        columns_common_data_elements: List[CommonDataElement],
+    ):
+        self._csv_header = csv_header
+        self._columns = [
+            (column, common_data_element)
+            for column, common_data_element in zip(
+                csv_header, columns_common_data_elements
+            )
+            if column != "dataset"
+        ]
+        self._statistics: Dict[Tuple[str, str], ColumnStatistics] = {}
+        self._datasets: Set[str] = set()
+
+    @property
+    def datasets(self) -> Set[str]:
+        return self._datasets
+
+    def add_rows(self, rows: List[List[str]]):
+        if not rows:
+            return
+        batch = pandas.DataFrame(rows, columns=self._csv_header, dtype=object)
+        batch = batch.apply(lambda values: values.str.strip())
+        for dataset, dataset_batch in batch.groupby("dataset", sort=False):
+            self._datasets.add(dataset)
+            for column, common_data_element in self._columns:
+                column_statistics = self._statistics.get((dataset, column))
+                if column_statistics is None:
+                    column_statistics = _create_column_statistics(
+                        dataset, column, common_data_element
+                    )
+                    self._statistics[(dataset, column)] = column_statistics
+                _add_values(
+                    column_statistics, dataset_batch[column], common_data_element
+                )
+
+    def get_statistics(self) -> List[ColumnStatistics]:
+        return list(self._statistics.values())
+
+
+def merge_column_statistics(
+    statistics: ColumnStatistics, other_statistics: ColumnStatistics
+) -> ColumnStatistics:
+    """
+    Merges the statistics of the same column and dataset, computed on
+    different csvs.
+    """
+    merged = ColumnStatistics(
+        dataset=statistics.dataset,
+        column=statistics.column,
+        count=statistics.count + other_statistics.count,
+        nulls=statistics.nulls + other_statistics.nulls,
+        sum=_add_optional(statistics.sum, other_statistics.sum),
+        sum_of_squares=_add_optional(
+            statistics.sum_of_squares, other_statistics.sum_of_squares
+        ),
+        min=_reduce_optional(min, statistics.min, other_statistics.min),
+        max=_reduce_optional(max, statistics.max, other_statistics.max),
+        histogram_bin_edges=statistics.histogram_bin_edges,
+    )
+    if statistics.frequencies is not None:
+        merged.frequencies = dict(statistics.frequencies)
+        for value, frequency in (other_statistics.frequencies or {}).items():
+            merged.frequencies[value] = merged.frequencies.get(value, 0) + frequency
+    if statistics.histogram is not None:
+        merged.histogram = [
+            count + other_count
+            for count, other_count in zip(
+                statistics.histogram, other_statistics.histogram
+            )
+        ]
+    return merged
+
+
+def create_statistics_table_query(pathology: str) -> str:
+    return (
+        f"CREATE TABLE {get_statistics_table_name(pathology)} "
+        f"({', '.join(STATISTICS_TABLE_COLUMNS)})"
+    )
+
+
+def insert_statistics_query(pathology: str) -> str:
+    """
+    The pyformat query that inserts the parameters returned by
+    convert_statistics_to_parameters to the statistics table.
+    """
+    return f"""INSERT INTO {get_statistics_table_name(pathology)} VALUES (
+        %(csv_path)s, %(dataset)s, %(column)s, %(count)s, %(nulls)s, %(sum)s,
+        %(sum_of_squares)s, %(min)s, %(max)s, %(frequencies)s, %(histogram)s,
+        %(histogram_bin_edges)s)"""
+
+
+def convert_statistics_to_parameters(
+    csv_path: str, column_statistics: ColumnStatistics
+) -> Dict:
+    parameters = column_statistics.to_dict()
+    parameters["csv_path"] = csv_path
+    for json_column in ("frequencies", "histogram", "histogram_bin_edges"):
+        if parameters[json_column] is not None:
+            parameters[json_column] = json.dumps(parameters[json_column])
+    return parameters
+
+
+@validate_identifier_names
+def get_datasets_statistics(
+    pathology: str, datasets: List[str]
+) -> List[ColumnStatistics]:
+    """
+    Retrieves the statistics of all the columns of the given datasets,
+    merging the statistics of the csvs of each dataset.
+    """
+    if not datasets:
+        return []
+    datasets_parameters = {
+        f"dataset{index}": dataset for index, dataset in enumerate(datasets)
+    }
+    datasets_placeholders = ", ".join(f"%({name})s" for name in datasets_parameters)
+    statistics_rows = MonetDB().execute_with_result(
+        f"""SELECT dataset, column_name, value_count, null_count, value_sum,
+        value_sum_of_squares, min_value, max_value, frequencies, histogram,
+        histogram_bin_edges
+        FROM {get_statistics_table_name(pathology)}
+        WHERE dataset IN ({datasets_placeholders})""",
+        datasets_parameters,
+    )
+
+    statistics: Dict[Tuple[str, str], ColumnStatistics] = {}
+    for row in statistics_rows:
+        column_statistics = ColumnStatistics(
+            *row[:8], *(_load_optional_json(value) for value in row[8:])
+        )
+        key = (column_statistics.dataset, column_statistics.column)
+        if key in statistics:
+            column_statistics = merge_column_statistics(
+                statistics[key], column_statistics
+            )
+        statistics[key] = column_statistics
+    return list(statistics.values())
+
+
+def _create_column_statistics(
+    dataset: str, column: str, common_data_element: CommonDataElement
+) -> ColumnStatistics:
+    column_statistics = ColumnStatistics(dataset=dataset, column=column)
+    if common_data_element.sql_type != "text":
+        column_statistics.sum = 0.0
+        column_statistics.sum_of_squares = 0.0
+        if (
+            common_data_element.min is not None
+            and common_data_element.max is not None
+            and common_data_element.max > common_data_element.min
+        ):
+            bin_width = (
+                common_data_element.max - common_data_element.min
+            ) / HISTOGRAM_BINS
+            column_statistics.histogram = [0] * HISTOGRAM_BINS
+            column_statistics.histogram_bin_edges = [
+                common_data_element.min + bin_width * index
+                for index in range(HISTOGRAM_BINS)
+            ] + [common_data_element.max]
+    if common_data_element.categorical:
+        column_statistics.frequencies = {}
+    return column_statistics
+
+
+def _add_values(
+    column_statistics: ColumnStatistics,
+    values: pandas.Series,
+    common_data_element: CommonDataElement,
+):
+    nulls = values == ""
+    column_statistics.nulls += int(nulls.sum())
+    values = values[~nulls]
+    column_statistics.count += len(values)
+    if values.empty:
+        return
+
+    if common_data_element.sql_type != "text":
+        numeric_values = values.astype(float).to_numpy()
+        column_statistics.sum += float(numeric_values.sum())
+        column_statistics.sum_of_squares += float(
+            numpy.dot(numeric_values, numeric_values)
+        )
+        column_statistics.min = _reduce_optional(
+            min, column_statistics.min, float(numeric_values.min())
+        )
+        column_statistics.max = _reduce_optional(
+            max, column_statistics.max, float(numeric_values.max())
+        )
+        if column_statistics.histogram is not None:
+            bin_indices = (
+                (numeric_values - common_data_element.min)
+                / (common_data_element.max - common_data_element.min)
+                * HISTOGRAM_BINS
+            ).astype(int)
+            bin_counts = numpy.bincount(
+                numpy.clip(bin_indices, 0, HISTOGRAM_BINS - 1),
+                minlength=HISTOGRAM_BINS,
+            )
+            column_statistics.histogram = [
+                count + int(bin_count)
+                for count, bin_count in zip(column_statistics.histogram, bin_counts)
+            ]
+        if common_data_element.sql_type == "int":
+            values = pandas.Series(numeric_values.astype(int)).astype(str)
+
+    if column_statistics.frequencies is not None:
+        frequencies = column_statistics.frequencies
+        for value, frequency in values.value_counts(sort=False).items():
+            frequencies[str(value)] = frequencies.get(str(value), 0) + int(frequency)
+
+
+def _add_optional(value: Optional[float], other_value: Optional[float]):
+    if value is None or other_value is None:
+        return value if other_value is None else other_value
+    return value + other_value
+
+
+def _reduce_optional(function, value: Optional[float], other_value: Optional[float]):
+    if value is None or other_value is None:
+        return value if other_value is None else other_value
+    return function(value, other_value)
+
+
+def _load_optional_json(value: Optional[str]):
+    return json.loads(value) if value is not None else None
@@ -1,10 +1,51 @@
+from typing import Callable
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
 from mipengine.node.monetdb_interface.monet_db_connection import MonetDB
 
 
 def run_udf(
     udf_creation_stmt: str,
     udf_execution_query: str,
-):
+) -> Optional[int]:
+    """
+    Runs the udf and returns the number of rows of its result table, as
+    reported by its creation.
+    """
+    if udf_creation_stmt:
+        MonetDB().execute(udf_creation_stmt)
+    return MonetDB().execute(udf_execution_query)
+
+
+def run_udf_with_result(
+    udf_creation_stmt: str,
+    udf_select_query: str,
+) -> List[List[Union[str, int, float, bool]]]:
     if udf_creation_stmt:
         MonetDB().execute(udf_creation_stmt)
-    MonetDB().execute(udf_execution_query)
+    return MonetDB().execute_with_result(udf_select_query)
+
+
+def run_udf_pipeline(
+    generate_udfs_statements: Callable[[], Iterable[Tuple[str, str]]],
+) -> List[Optional[int]]:
+    """
+    Runs the udfs of all the pipeline steps in a single transaction and
+    returns the number of rows of each step's result table.
+
+    The statements of each step are generated after the previous steps are
+    executed, so that the generation can look up the tables they created.
+    The generator is recreated if the transaction has to be retried.
+    """
+
+    def run_udfs():
+        return [
+            run_udf(udf_creation_stmt, udf_execution_query)
+            for udf_creation_stmt, udf_execution_query in generate_udfs_statements()
+        ]
+
+    return MonetDB().execute_in_transaction(run_udfs)
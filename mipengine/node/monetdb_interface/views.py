@@ -1,10 +1,24 @@
+import hashlib
+import json
+from typing import Dict
 from typing import List
+from typing import Optional
+from typing import Set
 
+from mipengine import config
+from mipengine.common.filters import build_filter_clause
 from mipengine.common.validate_identifier_names import validate_identifier_names
+from mipengine.node.monetdb_interface.common_actions import SHARED_CONTEXT_ID
+from mipengine.node.monetdb_interface.common_actions import create_table_name
+from mipengine.node.monetdb_interface.common_actions import (
+    get_dataset_partition_names,
+)
 from mipengine.node.monetdb_interface.common_actions import get_table_names
 from mipengine.node.monetdb_interface.monet_db_connection import MonetDB
 
 DATA_TABLE_PRIMARY_KEY = "row_id"
+SHARED_VIEWS_REGISTRY = "shared_views_registry"
+SHARED_VIEW_HASH_LENGTH = 16
 
 
 def get_view_names(context_id: str) -> List[str]:
@@ -13,15 +27,192 @@ def get_view_names(context_id: str) -> List[str]:
 
 @validate_identifier_names
 def create_view(
-    view_name: str, pathology: str, datasets: List[str], columns: List[str]
+    view_name: str,
+    pathology: str,
+    datasets: List[str],
+    columns: List[str],
+    filters: Optional[dict] = None,
 ):
-    # TODO: Add filters argument
-    dataset_names = ",".join(f"'{dataset}'" for dataset in datasets)
+    """
+    Creates a view over the data of the given datasets. The QueryBuilder
+    filters, if given, are compiled into the WHERE clause of the view, so only
+    the rows that satisfy them are ever read from it.
+
+    If the data table of the pathology is partitioned by dataset, the view
+    reads only the partition tables of the given datasets.
+    """
     columns = ", ".join(columns)
+    conditions = []
+    parameters = None
+
+    partition_names = get_dataset_partition_names(pathology, datasets)
+    if partition_names:
+        data_source = " UNION ALL ".join(
+            f"SELECT * FROM {partition_name}" for partition_name in partition_names
+        )
+        data_source = f"({data_source}) AS {pathology}_data"
+    else:
+        data_source = f"{pathology}_data"
+        dataset_names = ",".join(f"'{dataset}'" for dataset in datasets)
+        conditions.append(f"dataset IN ({dataset_names})")
+
+    if filters:
+        filter_expression, parameters = build_filter_clause(filters, pathology)
+        conditions.append(filter_expression)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
 
     MonetDB().execute(
         f"""CREATE VIEW {view_name}
         AS SELECT {DATA_TABLE_PRIMARY_KEY}, {columns}
-        FROM {pathology}_data
-        WHERE dataset IN ({dataset_names})"""
+        FROM {data_source}
+        {where_clause}""",
+        parameters,
+    )
+
+
+def create_views(
+    views_columns: Dict[str, List[str]],
+    pathology: str,
+    datasets: List[str],
+    filters: Optional[dict] = None,
+):
+    """
+    Creates, in a single transaction, one view per view name with the
+    given columns.
+    """
+
+    def create_all_views():
+        for view_name, columns in views_columns.items():
+            create_view(
+                view_name=view_name,
+                pathology=pathology,
+                datasets=datasets,
+                columns=columns,
+                filters=filters,
+            )
+
+    MonetDB().execute_in_transaction(create_all_views)
+
+
+def create_shared_views(
+    context_id: str,
+    views_columns: Dict[str, List[str]],
+    pathology: str,
+    datasets: List[str],
+    filters: Optional[dict] = None,
+) -> Dict[str, str]:
+    """
+    Like create_views, but the views are shared among the experiments.
+
+    Every view is replaced by the shared view of the same pathology,
+    datasets, columns and filters, which is created if no experiment uses
+    it. The shared views are reference counted by context_id, in a registry
+    table, and release_shared_views drops them when no experiment uses them
+    anymore. The views always read the current data, so a shared view never
+    gets stale when the data change.
+
+    A reference expires node.shared_views_expiry seconds after it is
+    acquired, so that the references of an experiment that crashed, before
+    releasing its views, do not keep the views alive forever.
+
+    Returns
+    ------
+    Dict[str, str]
+        The name of the view used for each of the given view names.
+    """
+
+    def acquire_all_views():
+        MonetDB().execute(
+            f"""CREATE TABLE IF NOT EXISTS {SHARED_VIEWS_REGISTRY}(
+            view_name VARCHAR(100), context_id VARCHAR(100), expires_at TIMESTAMP)"""
+        )
+        _drop_unused_views(_delete_expired_references())
+        acquired_views = {}
+        for view_name, columns in views_columns.items():
+            shared_view_name = _create_shared_view_name(
+                pathology, datasets, columns, filters
+            )
+            if not _shared_view_is_used(shared_view_name):
+                MonetDB().execute(f"DROP VIEW IF EXISTS {shared_view_name}")
+                create_view(shared_view_name, pathology, datasets, columns, filters)
+            MonetDB().execute(
+                f"""INSERT INTO {SHARED_VIEWS_REGISTRY}
+                VALUES ('{shared_view_name}', '{context_id}',
+                CURRENT_TIMESTAMP + INTERVAL '{config.node.shared_views_expiry}' SECOND)"""
+            )
+            acquired_views[view_name] = shared_view_name
+        return acquired_views
+
+    return MonetDB().execute_in_transaction(acquire_all_views)
+
+
+@validate_identifier_names
+def release_shared_views(context_id: str):
+    """
+    Releases the shared views used by an experiment, and the expired
+    references of any experiment, and drops the views that are no longer
+    used by any experiment.
+    """
+
+    def release_all_views():
+        registry_exists = MonetDB().execute_with_result(
+            f"SELECT 1 FROM tables WHERE name = '{SHARED_VIEWS_REGISTRY}'"
+        )
+        if not registry_exists:
+            return
+        released_views = MonetDB().execute_with_result(
+            f"""SELECT DISTINCT view_name FROM {SHARED_VIEWS_REGISTRY}
+            WHERE context_id = '{context_id}'"""
+        )
+        MonetDB().execute(
+            f"DELETE FROM {SHARED_VIEWS_REGISTRY} WHERE context_id = '{context_id}'"
+        )
+        released_views = {view_name for (view_name,) in released_views}
+        _drop_unused_views(released_views | _delete_expired_references())
+
+    MonetDB().execute_in_transaction(release_all_views)
+
+
+def _delete_expired_references() -> Set[str]:
+    """
+    Deletes the expired references from the registry and returns the names
+    of the views they referenced.
+    """
+    expired_views = MonetDB().execute_with_result(
+        f"""SELECT DISTINCT view_name FROM {SHARED_VIEWS_REGISTRY}
+        WHERE expires_at < CURRENT_TIMESTAMP"""
+    )
+    if expired_views:
+        MonetDB().execute(
+            f"DELETE FROM {SHARED_VIEWS_REGISTRY} WHERE expires_at < CURRENT_TIMESTAMP"
+        )
+    return {view_name for (view_name,) in expired_views}
+
+
+def _drop_unused_views(view_names: Set[str]):
+    for view_name in sorted(view_names):
+        if not _shared_view_is_used(view_name):
+            MonetDB().execute(f"DROP VIEW IF EXISTS {view_name}")
+
+
+def _shared_view_is_used(view_name: str) -> bool:
+    references = MonetDB().execute_with_result(
+        f"SELECT 1 FROM {SHARED_VIEWS_REGISTRY} WHERE view_name = '{view_name}'"
+    )
+    return bool(references)
+
+
+def _create_shared_view_name(
+    pathology: str, datasets: List[str], columns: List[str], filters: Optional[dict]
+) -> str:
+    """
+    Creates a view name with the format view_<hash>_shared_<nodeId>. The
+    hash is the same on all nodes, so the names match across the nodes.
+    """
+    view_key = json.dumps(
+        [pathology, sorted(datasets), columns, filters], sort_keys=True
     )
+    view_hash = hashlib.sha256(view_key.encode()).hexdigest()[:SHARED_VIEW_HASH_LENGTH]
+    return create_table_name(
+        "view", view_hash, SHARED_CONTEXT_ID, config.node.identifier
+    ).lower()
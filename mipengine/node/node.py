@@ -34,6 +34,7 @@ app = Celery(
         "mipengine.node.tasks.views",
         "mipengine.node.tasks.common",
         "mipengine.node.tasks.udfs",
+        "mipengine.node.tasks.statistics",
     ],
 )
 
@@ -1,7 +1,20 @@
+import json
+import time
+from typing import List
+from typing import Optional
+from typing import Tuple
+
 from celery import shared_task
+from celery.utils.log import get_task_logger
 
+from mipengine.common.columnar_encoding import encode_table_data_b64
 from mipengine.node.monetdb_interface import common_actions
+from mipengine.node.monetdb_interface import views
 from mipengine.common.node_tasks_DTOs import TableData
+from mipengine.common.node_tasks_DTOs import TableDataPage
+from mipengine.common.node_tasks_DTOs import TableSchema
+
+logger = get_task_logger(__name__)
 
 
 @shared_task
@@ -40,11 +53,152 @@ def get_table_data(table_name: str) -> str:
 
 
 @shared_task
-def clean_up(context_id: str):
+def get_table_data_page(
+    table_name: str,
+    page_size: int,
+    cursor: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+) -> str:
+    """
+    Parameters
+    ----------
+    table_name : str
+        The name of the table
+    page_size : int
+        The maximum number of rows of the page
+    cursor : Optional[str]
+        The next_cursor of the previous page, None for the first page
+    columns : Optional[List[str]]
+        The columns to retrieve, all of them if not given
+
+    Returns
+    ------
+    str(TableDataPage)
+        A page of the table's data in a jsonified format
+    """
+    if page_size < 1:
+        raise ValueError(f"The page size should be positive, got: {page_size}")
+    after, offset = _parse_cursor(cursor)
+
+    schema = common_actions.get_table_schema(table_name)
+    schema_columns = {column.name: column for column in schema.columns}
+    if columns is not None:
+        unknown_columns = set(columns) - set(schema_columns)
+        if unknown_columns:
+            raise ValueError(f"Columns {unknown_columns} not found in {table_name}")
+    else:
+        columns = list(schema_columns)
+
+    # The pages follow the key of the table, so each page resumes right after
+    # the last row of the previous one. The tables without a key are ordered
+    # by all their columns and paged by offset.
+    key_columns = common_actions.get_table_key_columns(schema)
+    if key_columns is None:
+        order_by = list(schema_columns)
+        if after is not None:
+            raise ValueError(f"Invalid cursor for {table_name}: {cursor}")
+    else:
+        order_by = key_columns
+        if offset:
+            raise ValueError(f"Invalid cursor for {table_name}: {cursor}")
+    selected_columns = columns + [
+        column for column in key_columns or [] if column not in columns
+    ]
+
+    # one extra row is read to find out if there is a next page
+    data = common_actions.get_table_data(
+        table_name,
+        columns=selected_columns,
+        limit=page_size + 1,
+        offset=offset,
+        order_by=order_by,
+        after=tuple(after) if after is not None else None,
+    )
+    next_cursor = None
+    if len(data) > page_size:
+        if key_columns is None:
+            next_cursor = json.dumps({"offset": offset + page_size})
+        else:
+            last_row = dict(zip(selected_columns, data[page_size - 1]))
+            next_cursor = json.dumps(
+                {"after": [last_row[column] for column in key_columns]}
+            )
+    page_schema = TableSchema([schema_columns[column] for column in columns])
+    page_data = [row[: len(columns)] for row in data[:page_size]]
+    return TableDataPage(page_schema, page_data, next_cursor).to_json()
+
+
+def _parse_cursor(cursor: Optional[str]) -> Tuple[Optional[List], int]:
+    # the cursor is either the key of the previous page's last row, or the
+    # offset of the page's first row for the tables without a key
+    if cursor is None:
+        return None, 0
+    try:
+        position = json.loads(cursor)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if isinstance(position, dict) and isinstance(position.get("after"), list):
+        return position["after"], 0
+    if (
+        isinstance(position, dict)
+        and isinstance(position.get("offset"), int)
+        and position["offset"] >= 0
+    ):
+        return None, position["offset"]
+    raise ValueError(f"Invalid cursor: {cursor}")
+
+
+@shared_task
+def get_table_data_columnar(table_name: str) -> str:
+    """
+    Parameters
+    ----------
+    table_name : str
+        The name of the table
+
+    Returns
+    ------
+    str
+        The table's schema and data, in the compressed columnar encoding of
+        mipengine.common.columnar_encoding, as a base64 string
+    """
+    schema = common_actions.get_table_schema(table_name)
+    data = common_actions.get_table_data(table_name)
+    return encode_table_data_b64(schema, data)
+
+
+@shared_task
+def drop_tables(table_names: List[str]):
+    """
+    Parameters
+    ----------
+    table_names : List[str]
+        The names of the tables to drop, in the order they should be dropped.
+        A merge table must precede the tables it merges.
+    """
+    common_actions.drop_tables(table_names)
+
+
+@shared_task
+def clean_up(context_id: str) -> int:
     """
     Parameters
     ----------
     context_id : str
         The id of the experiment
+
+    Returns
+    ------
+    int
+        The number of dropped tables, views and udfs
     """
-    common_actions.clean_up(context_id)
+    start_time = time.monotonic()
+    # the views are released even if the node no longer shares them, the
+    # experiment may have acquired them before
+    views.release_shared_views(context_id)
+    dropped_objects = common_actions.clean_up(context_id)
+    logger.info(
+        f"Cleaned up context {context_id}: dropped {dropped_objects} objects "
+        f"in {time.monotonic() - start_time:.3f}s"
+    )
+    return dropped_objects
@@ -0,0 +1,26 @@
+from typing import List
+
+from celery import shared_task
+
+from mipengine.common.node_tasks_DTOs import DatasetsStatistics
+from mipengine.node.monetdb_interface import statistics
+
+
+@shared_task
+def get_datasets_statistics(pathology: str, datasets: List[str]) -> str:
+    """
+    Parameters
+    ----------
+    pathology : str
+        The pathology of the datasets
+    datasets : List[str]
+        The datasets whose statistics are retrieved
+
+    Returns
+    ------
+    str(DatasetsStatistics)
+        The statistics of the columns of each dataset, computed when the
+        datasets were imported, in a jsonified format
+    """
+    columns_statistics = statistics.get_datasets_statistics(pathology, datasets)
+    return DatasetsStatistics(columns_statistics).to_json()
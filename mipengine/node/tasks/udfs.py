@@ -1,6 +1,8 @@
 import inspect
+import time
 from typing import Dict
 from typing import List
+from typing import Optional
 from typing import Tuple
 
 from celery import shared_task
@@ -9,14 +11,21 @@ from mipengine import config
 from mipengine.algorithms import UDF_REGISTRY
 
 # from mipengine.algorithms import demo  # TODO Split the actual and testing algorithms
+from mipengine.common.node_tasks_DTOs import ColumnInfo as TableColumnInfo
+from mipengine.common.node_tasks_DTOs import TableSchema
 from mipengine.common.node_tasks_DTOs import UDFArgument
+from mipengine.common.node_tasks_DTOs import UDFExecutionResult
+from mipengine.common.node_tasks_DTOs import UDFPipelineStep
 from mipengine.common.validate_identifier_names import validate_identifier_names
 from mipengine.node.monetdb_interface import udfs
 from mipengine.node.monetdb_interface.common_actions import create_table_name
+from mipengine.node.monetdb_interface.common_actions import get_table_row_count
 from mipengine.node.monetdb_interface.common_actions import get_table_schema
 from mipengine.node.udfgen import ColumnInfo
 from mipengine.node.udfgen import TableInfo
 from mipengine.node.udfgen import generate_udf_application_queries
+from mipengine.node.udfgen import get_udf_output_schema
+from mipengine.node.udfgen import udf_returns_scalar
 
 
 @shared_task
@@ -39,11 +48,16 @@ def run_udf(
     func_name: str,
     positional_args_json: List[str],
     keyword_args_json: Dict[str, str],
+    inline_result: Optional[bool] = None,
 ) -> str:
     """
     Creates the UDF, if provided, and adds it in the database.
     Then it runs the select statement with the input provided.
 
+    An inline result is returned in the task's result instead of being
+    stored in a table. By default only the results of udfs returning a
+    scalar are inlined.
+
     Parameters
     ----------
         command_id: str
@@ -56,11 +70,15 @@ def run_udf(
             Positional arguments of the udf call.
         keyword_args_json: dict[str, str(UDFArgument)]
             Keyword arguments of the udf call.
+        inline_result: Optional[bool]
+            Whether to return the result inline, instead of in a table.
 
     Returns
     -------
-        str
-            The name of the table where the udf execution results are in.
+        str(UDFExecutionResult)
+            The table where the udf execution results are in, its schema,
+            its row count and the execution time of the udf, or the inline
+            result.
     """
 
     result_table_name = create_table_name(
@@ -73,13 +91,103 @@ def run_udf(
         key: UDFArgument.from_json(arg) for key, arg in keyword_args_json.items()
     }
 
-    udf_creation_stmt, udf_execution_stmt = _generate_udf_statements(
-        command_id, context_id, func_name, positional_args, keyword_args
+    if inline_result is None:
+        inline_result = udf_returns_scalar(func_name)
+
+    udf_creation_stmt, udf_execution_stmt, result_schema = _generate_udf_statements(
+        command_id,
+        context_id,
+        func_name,
+        positional_args,
+        keyword_args,
+        inline_result=inline_result,
     )
 
-    udfs.run_udf(udf_creation_stmt, udf_execution_stmt)
+    if inline_result:
+        start_time = time.monotonic()
+        data = udfs.run_udf_with_result(udf_creation_stmt, udf_execution_stmt)
+        return UDFExecutionResult(
+            table_name=None,
+            schema=None,
+            row_count=len(data),
+            execution_time=time.monotonic() - start_time,
+            data=data,
+        ).to_json()
+
+    start_time = time.monotonic()
+    row_count = udfs.run_udf(udf_creation_stmt, udf_execution_stmt)
+    execution_time = time.monotonic() - start_time
+
+    return _get_udf_execution_result(
+        result_table_name, result_schema, row_count, execution_time
+    ).to_json()
+
+
+@shared_task(
+    soft_time_limit=config.node.run_udf_soft_time_limit,
+    time_limit=config.node.run_udf_time_limit,
+)
+def run_udf_pipeline(context_id: str, steps_json: List[str]) -> List[str]:
+    """
+    Runs an ordered list of udfs, in a single transaction, with one task.
+    A later step can use the result table of an earlier one with a
+    "step_result" argument that holds the earlier step's index.
+
+    Parameters
+    ----------
+        context_id: str
+            The experiment identifier, common among all experiment related actions.
+        steps_json: list[str(UDFPipelineStep)]
+            The udf invocations, in execution order.
+
+    Returns
+    -------
+        list[str(UDFExecutionResult)]
+            The execution result of each step.
+    """
+    steps = [UDFPipelineStep.from_json(step_json) for step_json in steps_json]
+
+    result_table_names = [
+        create_table_name("table", step.command_id, context_id, config.node.identifier)
+        for step in steps
+    ]
 
-    return result_table_name
+    execution_times = []
+    result_schemas = []
+
+    def generate_udfs_statements():
+        # the statements of a step are executed until the next one is requested
+        execution_times.clear()
+        result_schemas.clear()
+        for step_index, step in enumerate(steps):
+            positional_args = [
+                _resolve_step_result_arg(arg, result_table_names[:step_index])
+                for arg in step.positional_args
+            ]
+            keyword_args = {
+                key: _resolve_step_result_arg(arg, result_table_names[:step_index])
+                for key, arg in step.keyword_args.items()
+            }
+            *udf_statements, result_schema = _generate_udf_statements(
+                step.command_id,
+                context_id,
+                step.func_name,
+                positional_args,
+                keyword_args,
+            )
+            result_schemas.append(result_schema)
+            start_time = time.monotonic()
+            yield udf_statements
+            execution_times.append(time.monotonic() - start_time)
+
+    row_counts = udfs.run_udf_pipeline(generate_udfs_statements)
+
+    return [
+        _get_udf_execution_result(*step_result).to_json()
+        for step_result in zip(
+            result_table_names, result_schemas, row_counts, execution_times
+        )
+    ]
 
 
 @shared_task
@@ -118,9 +226,10 @@ def get_run_udf_query(
         key: UDFArgument.from_json(arg) for key, arg in keyword_args_json.items()
     }
 
-    return _generate_udf_statements(
+    udf_creation_stmt, udf_execution_stmt, _ = _generate_udf_statements(
         command_id, context_id, func_name, positional_args, keyword_args
     )
+    return udf_creation_stmt, udf_execution_stmt
 
 
 @validate_identifier_names
@@ -131,6 +240,42 @@ def _create_udf_name(func_name: str, command_id: str, context_id: str) -> str:
     return f"{func_name}_{command_id}_{context_id}"
 
 
+def _get_udf_execution_result(
+    result_table_name: str,
+    result_schema: Optional[TableSchema],
+    row_count: Optional[int],
+    execution_time: float,
+) -> UDFExecutionResult:
+    # The schema is the one the udf generator gives and the row count the one
+    # reported by the table's creation. The table is looked up only for the
+    # ones that are not known.
+    if result_schema is None:
+        result_schema = get_table_schema(result_table_name)
+    if row_count is None:
+        row_count = get_table_row_count(result_table_name)
+    return UDFExecutionResult(
+        table_name=result_table_name,
+        schema=result_schema,
+        row_count=row_count,
+        execution_time=execution_time,
+    )
+
+
+def _resolve_step_result_arg(
+    udf_argument: UDFArgument, previous_steps_result_tables: List[str]
+) -> UDFArgument:
+    if udf_argument.type != "step_result":
+        return udf_argument
+    step_index = udf_argument.value
+    if not isinstance(step_index, int) or not (
+        0 <= step_index < len(previous_steps_result_tables)
+    ):
+        raise ValueError(
+            f"A step_result argument should refer to an earlier step, got: {step_index}"
+        )
+    return UDFArgument(type="table", value=previous_steps_result_tables[step_index])
+
+
 def _convert_udf2udfgen_arg(udf_argument: UDFArgument):
     if udf_argument.type == "literal":
         return udf_argument.value
@@ -168,12 +313,27 @@ def _generate_udf_statements(
     func_name: str,
     positional_args: List[UDFArgument],
     keyword_args: Dict[str, UDFArgument],
-):
+    inline_result: bool = False,
+) -> Tuple[str, str, Optional[TableSchema]]:
+    """
+    Returns the udf creation and execution statements and the schema of the
+    udf's result table, None for an inline result or an unknown schema.
+    """
     gen_pos_args, gen_kw_args = _convert_udf2udfgen_args(positional_args, keyword_args)
 
     udf_creation_stmt, udf_execution_stmt = generate_udf_application_queries(
-        func_name, gen_pos_args, gen_kw_args
+        func_name, gen_pos_args, gen_kw_args, inline_result=inline_result
     )
+    result_schema = None
+    if not inline_result:
+        udf_output_schema = get_udf_output_schema(func_name, gen_pos_args, gen_kw_args)
+        if udf_output_schema is not None:
+            result_schema = TableSchema(
+                [
+                    TableColumnInfo(column.name, column.dtype)
+                    for column in udf_output_schema
+                ]
+            )
 
     allowed_func_name = func_name.replace(".", "_")  # A dot is not an allowed character
     udf_name = _create_udf_name(allowed_func_name, command_id, context_id)
@@ -188,4 +348,4 @@ def _generate_udf_statements(
         node_id=config.node.identifier,
     )
 
-    return udf_creation_stmt, udf_execution_stmt
+    return udf_creation_stmt, udf_execution_stmt, result_schema
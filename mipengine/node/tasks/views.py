@@ -1,7 +1,9 @@
+from typing import Dict
 from typing import List
 
 from celery import shared_task
 
+from mipengine.common.filters import load_filters
 from mipengine.node.monetdb_interface import views
 from mipengine.node.monetdb_interface.common_actions import config
 from mipengine.node.monetdb_interface.common_actions import create_table_name
@@ -32,7 +34,6 @@ def create_view(
     columns: List[str],
     filters_json: str,
 ) -> str:
-    # TODO We need to add the filters
     """
     Parameters
     ----------
@@ -47,7 +48,7 @@ def create_view(
     columns : List[str]
         A list of column names
     filters_json : str(dict)
-        A Jquery filters object
+        A Jquery QueryBuilder filters object, or None for no filters
 
     Returns
     ------
@@ -58,6 +59,75 @@ def create_view(
         "view", command_id, context_id, config.node.identifier
     )
     views.create_view(
-        view_name=view_name, pathology=pathology, datasets=datasets, columns=columns
+        view_name=view_name,
+        pathology=pathology,
+        datasets=datasets,
+        columns=columns,
+        filters=load_filters(filters_json),
     )
     return view_name.lower()
+
+
+@shared_task
+def create_initial_views(
+    context_id: str,
+    command_id: str,
+    pathology: str,
+    datasets: List[str],
+    variables: Dict[str, List[str]],
+    filters_json: str,
+) -> Dict[str, str]:
+    """
+    Creates the views of all the variable sets of an experiment at once.
+
+    Parameters
+    ----------
+    context_id : str
+        The id of the experiment
+    command_id : str
+        The id of the command, suffixed with the variable set name for each view
+    pathology : str
+        The pathology data table on which the views will be created
+    datasets : List[str]
+        A list of dataset names
+    variables : Dict[str, List[str]]
+        The column names of each variable set, e.g. {"x": [...], "y": [...]}
+    filters_json : str(dict)
+        A Jquery QueryBuilder filters object, or None for no filters
+
+    Returns
+    ------
+    Dict[str, str]
+        The name of the created view, in lower case, of each variable set.
+        With node.shared_initial_views, a view shared with other experiments
+        may be used instead.
+    """
+    views_names = {
+        variable: create_table_name(
+            "view", command_id + variable, context_id, config.node.identifier
+        )
+        for variable in variables
+    }
+    views_columns = {
+        views_names[variable]: columns for variable, columns in variables.items()
+    }
+    if config.node.shared_initial_views:
+        created_views = views.create_shared_views(
+            context_id=context_id,
+            views_columns=views_columns,
+            pathology=pathology,
+            datasets=datasets,
+            filters=load_filters(filters_json),
+        )
+        views_names = {
+            variable: created_views[view_name]
+            for variable, view_name in views_names.items()
+        }
+    else:
+        views.create_views(
+            views_columns=views_columns,
+            pathology=pathology,
+            datasets=datasets,
+            filters=load_filters(filters_json),
+        )
+    return {variable: view_name.lower() for variable, view_name in views_names.items()}
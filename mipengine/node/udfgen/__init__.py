@@ -1,10 +1,14 @@
 from .udfgenerator import generate_udf_application_queries
+from .udfgenerator import get_udf_output_schema
+from .udfgenerator import udf_returns_scalar
 from .udfgenerator import ColumnInfo, TableInfo
 from .udfgenerator import LiteralValue, UdfArgument
 
 
 __all__ = [
     "generate_udf_application_queries",
+    "get_udf_output_schema",
+    "udf_returns_scalar",
     "ColumnInfo",
     "TableInfo",
     "UdfArgument",
@@ -1,3 +1,5 @@
+import json
+import math
 from string import Template
 
 
@@ -134,6 +136,58 @@ GROUP BY
     return "", tmpl.safe_substitute(matrix=matrix, diag=diag, vec=vec)
 
 
+FUSED_OPERATORS = {"+", "-", "*", "/"}
+
+
+def SQL_fused_tensor1(expression, *tables):
+    """Applies a whole tree of elementwise operations on 1-dimensional tensors
+    with a single statement.
+
+    The expression is a json encoded tree where the leaves are ["table", i],
+    the i-th of the given tables, or ["const", c], a numeric constant, and the
+    inner nodes are [operator, lhs, rhs] with operator one of FUSED_OPERATORS.
+    """
+    if not tables:
+        raise ValueError("A fused expression needs at least one table.")
+    val_expression = _fused_val_expression(json.loads(expression), len(tables))
+    from_tables = ", ".join(f"${{table{i}}} AS t{i}" for i in range(len(tables)))
+    select_lines = [
+        "SELECT",
+        f"    {nodeid_column},",
+        "    t0.dim0 AS dim0,",
+        f"    {val_expression} AS val",
+        f"FROM {from_tables}",
+    ]
+    if len(tables) > 1:
+        join_on = " AND\n    ".join(f"t0.dim0=t{i}.dim0" for i in range(1, len(tables)))
+        select_lines += ["WHERE", f"    {join_on}"]
+    tmpl = Template("\n".join(select_lines))
+    return "", tmpl.safe_substitute(
+        {f"table{i}": table for i, table in enumerate(tables)}
+    )
+
+
+def _fused_val_expression(node, ntables):
+    kind, *operands = node
+    if kind == "table":
+        (index,) = operands
+        if not isinstance(index, int) or not 0 <= index < ntables:
+            raise ValueError(f"Table index {index} is out of range.")
+        return f"t{index}.val"
+    if kind == "const":
+        (const,) = operands
+        const = float(const)
+        if not math.isfinite(const):
+            raise ValueError(f"Constant {const} is not a finite number.")
+        return repr(const)
+    if kind in FUSED_OPERATORS:
+        lhs, rhs = operands
+        lhs = _fused_val_expression(lhs, ntables)
+        rhs = _fused_val_expression(rhs, ntables)
+        return f"({lhs} {kind} {rhs})"
+    raise ValueError(f"Unknown fused expression node {kind}.")
+
+
 SQL_LINALG_QUERIES = {
     "sql.zeros1": SQL_zeros1,
     "sql.matrix_dot_vector": SQL_matrix_dot_vector,
@@ -144,4 +198,19 @@ SQL_LINALG_QUERIES = {
     "sql.const_tensor1_sub": SQL_const_tensor1_sub,
     "sql.mat_transp_dot_diag_dot_mat": SQL_mat_transp_dot_diag_dot_mat,
     "sql.mat_transp_dot_diag_dot_vec": SQL_mat_transp_dot_diag_dot_vec,
+    "sql.fused_tensor1": SQL_fused_tensor1,
+}
+
+# the number of dimensions of the tensor each query returns
+SQL_LINALG_OUTPUT_NDIMS = {
+    "sql.zeros1": 1,
+    "sql.matrix_dot_vector": 1,
+    "sql.tensor1_mult": 1,
+    "sql.tensor1_add": 1,
+    "sql.tensor1_sub": 1,
+    "sql.tensor1_div": 1,
+    "sql.const_tensor1_sub": 1,
+    "sql.mat_transp_dot_diag_dot_mat": 2,
+    "sql.mat_transp_dot_diag_dot_vec": 1,
+    "sql.fused_tensor1": 1,
 }
@@ -9,6 +9,7 @@ from dataclasses import field
 import functools
 import inspect
 import itertools
+import json
 import operator
 import os
 import re
@@ -38,6 +39,7 @@ from mipengine.algorithms import LiteralParameterT
 from mipengine.algorithms import ScalarT
 import mipengine.algorithms
 from mipengine.node.udfgen.reduce import SQL_REDUCE_QUERIES
+from mipengine.node.udfgen.sql_linalg import SQL_LINALG_OUTPUT_NDIMS
 from mipengine.node.udfgen.sql_linalg import SQL_LINALG_QUERIES
 
 CREATE_OR_REPLACE = "CREATE OR REPLACE"
@@ -211,7 +213,13 @@ def generate_udf_application_queries(
     func_name: str,
     positional_args: list[UdfArgument],
     keyword_args: dict[str, UdfArgument],
+    inline_result: bool = False,
 ) -> tuple[string.Template, string.Template]:
+    """
+    Generates the udf definition and the query applying it. The query stores
+    the result in a new table, unless inline_result is set, in which case it
+    is the select statement returning the result.
+    """
     if keyword_args:
         msg = "Calling with keyword arguments is not implemented yet."
         raise NotImplementedError(msg)
@@ -223,20 +231,95 @@ def generate_udf_application_queries(
             t.name if isinstance(t, TableInfo) else t for t in positional_args
         ]
         udf_def, udf_sel = udf_gen_func(*udf_gen_func_args)
-        udf_create_table = generate_udf_create_table(udf_sel)
-        return string.Template(udf_def), string.Template(udf_create_table)
+        udf_query = generate_udf_query(udf_sel, inline_result)
+        return string.Template(udf_def), string.Template(udf_query)
     if func_name.startswith("reduce"):
         udf_gen_func = SQL_REDUCE_QUERIES[func_name]
         merge_table, *_ = positional_args
         ndims = len(merge_table.schema) - 2
         udf_def, udf_sel = udf_gen_func(merge_table.name, ndims)
-        udf_create_table = generate_udf_create_table(udf_sel)
-        return string.Template(udf_def), string.Template(udf_create_table)
+        udf_query = generate_udf_query(udf_sel, inline_result)
+        return string.Template(udf_def), string.Template(udf_query)
     # <--
     udf_def = generate_udf_def(func_name, positional_args, keyword_args)
     udf_sel = generate_udf_select_stmt(func_name, positional_args, keyword_args)
-    udf_create_table = generate_udf_create_table(udf_sel)
-    return string.Template(udf_def), string.Template(udf_create_table)
+    udf_query = generate_udf_query(udf_sel, inline_result)
+    return string.Template(udf_def), string.Template(udf_query)
+
+
+def get_udf_output_schema(
+    func_name: str,
+    positional_args: list[UdfArgument],
+    keyword_args: dict[str, UdfArgument],
+) -> Optional[list[ColumnInfo]]:
+    """
+    Returns the schema of the table where the query of
+    generate_udf_application_queries stores the udf result, as it follows
+    from the udf's return type and its arguments. The column of a scalar
+    result is named by the database, so there is no schema for it.
+    """
+    nodeid_column = ColumnInfo("node_id", "text")
+
+    # --> Hack for calling hard-coded UDFs
+    if func_name.startswith("sql"):
+        ndims = SQL_LINALG_OUTPUT_NDIMS[func_name]
+        dtype = _get_sql_linalg_output_dtype(func_name, positional_args)
+        return [nodeid_column] + TensorV(None, ndims, dtype).schema
+    if func_name.startswith("reduce"):
+        merge_table, *_ = positional_args
+        ndims = len(merge_table.schema) - 2
+        return [nodeid_column] + TensorV(None, ndims, float).schema
+    # <--
+    if keyword_args:
+        msg = "Calling with keyword arguments is not implemented yet."
+        raise NotImplementedError(msg)
+    args = convert_udf_args(func_name, positional_args, keyword_args)
+    return_obj = get_generator(func_name).get_return_obj(*args)
+    if not isinstance(return_obj, TableV):
+        return None
+    return [nodeid_column] + return_obj.schema
+
+
+def _get_sql_linalg_output_dtype(func_name, positional_args) -> type:
+    # The values are real if any of the operands is real, like MonetDB's
+    # arithmetic. The constants of a fused expression are always real.
+    if func_name == "sql.zeros1":
+        return float
+    dtypes = set()
+    for arg in positional_args:
+        if isinstance(arg, TableInfo):
+            dtypes.add(
+                next(SQL2PY_TYPES[dtype] for name, dtype in arg.schema if name == "val")
+            )
+        elif func_name == "sql.fused_tensor1":
+            if _fused_expression_has_consts(json.loads(arg)):
+                dtypes.add(float)
+        else:
+            dtypes.add(int if _is_int_literal(arg) else float)
+    return float if float in dtypes else int
+
+
+def _fused_expression_has_consts(node) -> bool:
+    kind, *operands = node
+    if kind == "const":
+        return True
+    if kind == "table":
+        return False
+    return any(_fused_expression_has_consts(operand) for operand in operands)
+
+
+def _is_int_literal(value) -> bool:
+    try:
+        int(str(value))
+    except ValueError:
+        return False
+    return True
+
+
+def udf_returns_scalar(func_name: str) -> bool:
+    if func_name.startswith("sql") or func_name.startswith("reduce"):
+        return False
+    return get_generator(func_name).funcparts.return_type == ScalarT
 
 
 def generate_udf_def(
@@ -266,6 +349,18 @@ def generate_udf_def(
             Multiline string with MonetDB Python UDF definition.
     """
     generator = get_generator(func_name)
+    args = convert_udf_args(func_name, positional_args, keyword_args)
+    return generator.generate_code(*args, **keyword_args)
+
+
+def convert_udf_args(
+    func_name: str,
+    positional_args: list[UdfArgument],
+    keyword_args: dict[str, UdfArgument],
+) -> list:
+    """Converts the positional arguments of a udf call to the UdfIOValue
+    objects, or literals, of the udf's formal parameters."""
+    generator = get_generator(func_name)
     parameter_types = generator.funcparts.parameter_types
     if (pn := len(parameter_types)) != (an := len(positional_args) + len(keyword_args)):
         raise ValueError(f"{func_name} expected {pn} arguments, {an} where given.")
@@ -283,8 +378,7 @@ def generate_udf_def(
             args.append(arg)
         else:
             raise TypeError("Arguments given do not match UDF formal parameter types")
-
-    return generator.generate_code(*args, **keyword_args)
+    return args
 
 
 def get_generator(func_name):
@@ -435,12 +529,7 @@ class UDFCodeGenerator:
         udf_name = "$udf_name"
         inputs = self._gather_inputs(args, kwargs)
         self._validate_input_types(inputs)
-        if self._return_typevars_are_bound():
-            return_obj = self._build_return_obj()
-        elif self._return_obj_has_known_attrs():
-            return_obj = self._build_return_obj_from_inputs(inputs)
-        else:
-            raise NotImplementedError
+        return_obj = self._get_return_obj(inputs)
         input_params = self._make_parameter_signature(inputs)
         udf_signature = f"{udf_name}({input_params})"
         return_stmt = self._get_return_statement()
@@ -470,6 +559,19 @@ class UDFCodeGenerator:
 
         return LN.join(funcdef)
 
+    def get_return_obj(self, *args, **kwargs):
+        inputs = self._gather_inputs(args, kwargs)
+        self._validate_input_types(inputs)
+        return self._get_return_obj(inputs)
+
+    def _get_return_obj(self, inputs):
+        if self._return_typevars_are_bound():
+            return self._build_return_obj()
+        elif self._return_obj_has_known_attrs():
+            return self._build_return_obj_from_inputs(inputs)
+        else:
+            raise NotImplementedError
+
     def _gather_inputs(self, args, kwargs):
         pnames = self.funcparts.parameter_types.keys()
         argnames = [name for name in pnames if name not in kwargs.keys()]
@@ -705,6 +807,12 @@ def generate_udf_select_stmt(
     return select_stmt
 
 
+def generate_udf_query(udf_select_stmt, inline_result):
+    if inline_result:
+        return udf_select_stmt + SCOLON
+    return generate_udf_create_table(udf_select_stmt)
+
+
 def generate_udf_create_table(udf_select_stmt):
     table_name = "$table_name"
     query = [DROP_IF_EXISTS + table_name + SCOLON]
@@ -0,0 +1,431 @@
+"""
+Generates synthetic cohorts, from the common data elements of the
+pathologies, for testing the engine at scale.
+
+The csvs obey the metadata: every column of a pathology is generated with the
+type of its cde, within its min and max, and the values of the categorical
+columns are among their enumerations. The values of a row are correlated
+through a latent factor shared by all of its columns, so that the numeric
+columns are correlated with each other and with the categorical ones.
+
+The datasets are spread across the local nodes and the csvs of each node are
+written in a folder of its own, <output>/<node id>/<pathology>/<dataset>.csv,
+that can be loaded with the csv_importer. A node_catalog.json describing
+the nodes is written in the output folder. The same arguments and seed always
+generate the same csvs.
+"""
+import json
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy
+import pandas
+from scipy.stats import norm
+
+from mipengine.common.common_data_elements import CommonDataElement
+from mipengine.common.common_data_elements import common_data_elements
+from mipengine.node.monetdb_interface.csv_validator import NOT_NULLABLE_COLUMNS
+
+GENERATION_CHUNK_SIZE = 100000
+GLOBAL_NODE_ID = "globalnode"
+LOCAL_NODE_ID_PREFIX = "localnode"
+MONETDB_BASE_PORT = 50000
+RABBITMQ_BASE_PORT = 5670
+
+
+def get_pathology_datasets(
+    pathology: str, datasets: Optional[List[str]] = None
+) -> List[str]:
+    """
+    Returns the datasets to generate for the pathology, all the enumerations
+    of its dataset cde if none are given. Only these are accepted by the
+    csv_importer.
+    """
+    dataset_common_data_element = common_data_elements.pathologies[pathology]["dataset"]
+    pathology_datasets = sorted(dataset_common_data_element.enumerations)
+    if datasets is None:
+        return pathology_datasets
+    unknown_datasets = set(datasets) - set(pathology_datasets)
+    if unknown_datasets:
+        raise ValueError(
+            f"Datasets {sorted(unknown_datasets)} are not enumerations of the "
+            f"dataset of the pathology '{pathology}': {pathology_datasets}"
+        )
+    return datasets
+
+
+def assign_datasets_to_nodes(datasets_count: int, nodes_count: int) -> List[List[int]]:
+    """
+    Spreads the datasets across the nodes, round robin. With more nodes than
+    datasets, a dataset is split among many nodes, so that every node holds
+    data.
+
+    Returns
+    ------
+    List[List[int]]
+        The indices of the datasets of each node.
+    """
+    return [
+        [
+            dataset_index
+            for dataset_index in range(datasets_count)
+            if dataset_index % nodes_count == node_index
+            or node_index % datasets_count == dataset_index
+        ]
+        for node_index in range(nodes_count)
+    ]
+
+
+def split_rows(rows: int, parts: int) -> List[int]:
+    """
+    Splits the rows in equal parts, the first parts getting the remainder.
+    """
+    return [
+        rows // parts + (1 if index < rows % parts else 0) for index in range(parts)
+    ]
+
+
+def generate_chunk(
+    rng: numpy.random.Generator,
+    pathology_common_data_elements: Dict[str, CommonDataElement],
+    dataset: str,
+    first_row_number: int,
+    rows: int,
+    null_rate: float,
+    correlation: float,
+) -> pandas.DataFrame:
+    """
+    Generates rows of a dataset of a pathology.
+
+    Every column is derived from the latent factor of the row, weighted by
+    the correlation, plus noise of its own. The numeric columns follow a
+    normal distribution, centered within the cde's min and max and clipped
+    to them. The categorical columns map the quantiles of the same
+    distribution to their ordered enumerations. The text columns get a row
+    identifier. The NOT_NULLABLE_COLUMNS are never empty, the rest are empty
+    with probability null_rate.
+    """
+    latent_factor = rng.standard_normal(rows)
+    noise_weight = numpy.sqrt(1 - correlation**2)
+    columns = {}
+    for column, common_data_element in pathology_common_data_elements.items():
+        if column == "dataset":
+            columns[column] = numpy.full(rows, dataset, dtype=object)
+            continue
+        values = correlation * latent_factor + noise_weight * rng.standard_normal(rows)
+
+        if common_data_element.categorical and common_data_element.enumerations:
+            enumerations = _sort_enumerations(common_data_element)
+            # Equally likely enumerations, from the quantiles of the normal distribution
+            bin_edges = _normal_quantiles(len(enumerations))
+            column_values = numpy.array(enumerations, dtype=object)[
+                numpy.searchsorted(bin_edges, values)
+            ]
+            if common_data_element.sql_type != "text":
+                column_values = pandas.to_numeric(column_values)
+        elif common_data_element.sql_type == "text":
+            column_values = numpy.array(
+                [
+                    f"{dataset}_{row_number}"
+                    for row_number in range(first_row_number, first_row_number + rows)
+                ],
+                dtype=object,
+            )
+        else:
+            column_values = _scale_to_common_data_element(values, common_data_element)
+
+        column_values = pandas.Series(column_values)
+        if common_data_element.sql_type == "int":
+            column_values = column_values.astype("Int64")
+        if column not in NOT_NULLABLE_COLUMNS and null_rate > 0:
+            column_values = column_values.mask(rng.random(rows) < null_rate)
+        columns[column] = column_values
+    return pandas.DataFrame(columns)
+
+
+def generate_dataset_csv(
+    csv_file_path: Path,
+    pathology: str,
+    dataset: str,
+    rows: int,
+    null_rate: float,
+    correlation: float,
+    seed: Tuple[int, ...],
+    first_row_number: int = 0,
+    chunk_size: int = GENERATION_CHUNK_SIZE,
+):
+    """
+    Writes the csv of the rows of a dataset held by a node, chunk_size rows
+    at a time, so that the memory used does not depend on the rows. The rows
+    of a dataset split among many nodes are numbered after the rows of the
+    previous nodes, so that their identifiers are unique.
+    """
+    pathology_common_data_elements = common_data_elements.pathologies[pathology]
+    rng = numpy.random.default_rng(seed)
+    csv_file_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(csv_file_path, "w", newline="") as csv_file:
+        pandas.DataFrame(columns=list(pathology_common_data_elements)).to_csv(
+            csv_file, index=False
+        )
+        for chunk_start in range(0, rows, chunk_size):
+            chunk = generate_chunk(
+                rng,
+                pathology_common_data_elements,
+                dataset,
+                first_row_number + chunk_start,
+                min(chunk_size, rows - chunk_start),
+                null_rate,
+                correlation,
+            )
+            chunk.to_csv(csv_file, index=False, header=False)
+
+
+def create_node_catalog(hostname: str, nodes_data: List[Dict[str, List[str]]]) -> dict:
+    """
+    Creates the node catalog of the global node and the local nodes, with
+    the ports of the convention of the default node catalog.
+
+    Parameters
+    ----------
+    hostname : str
+        The hostname of the monetdbs and rabbitmqs of all the nodes
+    nodes_data : List[Dict[str, List[str]]]
+        The datasets of each local node, keyed by pathology
+
+    Returns
+    ------
+    dict
+        The node catalog, in the format of node_catalog.json
+    """
+    return {
+        "globalNode": {
+            "nodeId": GLOBAL_NODE_ID,
+            "rabbitmqURL": f"{hostname}:{RABBITMQ_BASE_PORT}",
+            "monetdbHostname": hostname,
+            "monetdbPort": str(MONETDB_BASE_PORT),
+        },
+        "localNodes": [
+            {
+                "nodeId": f"{LOCAL_NODE_ID_PREFIX}{node_number}",
+                "rabbitmqURL": f"{hostname}:{RABBITMQ_BASE_PORT + node_number}",
+                "monetdbHostname": hostname,
+                "monetdbPort": str(MONETDB_BASE_PORT + node_number),
+                "data": {
+                    "pathologies": [
+                        {"name": pathology, "datasets": datasets}
+                        for pathology, datasets in node_data.items()
+                    ]
+                },
+            }
+            for node_number, node_data in enumerate(nodes_data, start=1)
+        ],
+    }
+
+
+def generate_cohort(
+    output_path: Path,
+    pathologies: List[str],
+    rows: int,
+    nodes: int = 1,
+    datasets: Optional[List[str]] = None,
+    null_rate: float = 0.0,
+    correlation: float = 0.5,
+    seed: int = 0,
+    hostname: str = "127.0.0.1",
+    jobs: int = 1,
+) -> dict:
+    """
+    Generates the csvs of the pathologies, spread across the local nodes,
+    and the node catalog of the nodes.
+
+    Parameters
+    ----------
+    output_path : Path
+        The folder where the csvs of the nodes and the node catalog are written
+    pathologies : List[str]
+        The pathologies to generate
+    rows : int
+        The rows of each pathology, split equally among its datasets
+    nodes : int
+        The number of local nodes
+    datasets : Optional[List[str]]
+        The datasets of each pathology, all the enumerations of its dataset cde if not given
+    null_rate : float
+        The probability of a value being empty
+    correlation : float
+        The correlation of each column with the latent factor of the row, between -1 and 1
+    seed : int
+        The seed of the random generator
+    hostname : str
+        The hostname of the nodes in the node catalog
+    jobs : int
+        The number of processes that write the csvs
+
+    Returns
+    ------
+    dict
+        The node catalog of the nodes.
+    """
+    if nodes < 1:
+        raise ValueError(f"The nodes should be at least one, got: {nodes}")
+    if not 0 <= null_rate < 1:
+        raise ValueError(f"The null rate should be in [0, 1), got: {null_rate}")
+    if not -1 <= correlation <= 1:
+        raise ValueError(f"The correlation should be in [-1, 1], got: {correlation}")
+
+    nodes_data = [{} for _ in range(nodes)]
+    csvs_arguments = []
+    for pathology_index, pathology in enumerate(pathologies):
+        if pathology not in common_data_elements.pathologies:
+            raise ValueError(f"Pathology '{pathology}' does not exist.")
+        pathology_datasets = get_pathology_datasets(pathology, datasets)
+        nodes_datasets = assign_datasets_to_nodes(len(pathology_datasets), nodes)
+
+        for dataset_index, (dataset, dataset_rows) in enumerate(
+            zip(pathology_datasets, split_rows(rows, len(pathology_datasets)))
+        ):
+            dataset_nodes = [
+                node_index
+                for node_index, node_datasets in enumerate(nodes_datasets)
+                if dataset_index in node_datasets
+            ]
+            first_row_number = 0
+            for node_index, node_rows in zip(
+                dataset_nodes, split_rows(dataset_rows, len(dataset_nodes))
+            ):
+                node_id = f"{LOCAL_NODE_ID_PREFIX}{node_index + 1}"
+                csvs_arguments.append(
+                    (
+                        output_path / node_id / pathology / f"{dataset}.csv",
+                        pathology,
+                        dataset,
+                        node_rows,
+                        null_rate,
+                        correlation,
+                        (seed, pathology_index, dataset_index, node_index),
+                        first_row_number,
+                    )
+                )
+                nodes_data[node_index].setdefault(pathology, []).append(dataset)
+                first_row_number += node_rows
+
+    # Each csv has a generator of its own, so the csvs do not depend on the jobs
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else nullcontext()
+    with executor:
+        map_to_csvs = executor.map if jobs > 1 else map
+        list(map_to_csvs(generate_dataset_csv, *zip(*csvs_arguments)))
+
+    node_catalog = create_node_catalog(hostname, nodes_data)
+    output_path.mkdir(parents=True, exist_ok=True)
+    with open(output_path / "node_catalog.json", "w") as node_catalog_file:
+        json.dump(node_catalog, node_catalog_file, indent=2)
+    return node_catalog
+
+
+def _sort_enumerations(common_data_element: CommonDataElement) -> List[str]:
+    if common_data_element.sql_type == "text":
+        return sorted(common_data_element.enumerations)
+    return sorted(common_data_element.enumerations, key=float)
+
+
+def _normal_quantiles(parts: int) -> numpy.ndarray:
+    # The inner edges of the equally likely parts of the standard normal distribution
+    return norm.ppf(numpy.arange(1, parts) / parts)
+
+
+def _scale_to_common_data_element(
+    values: numpy.ndarray, common_data_element: CommonDataElement
+) -> numpy.ndarray:
+    minimum, maximum = common_data_element.min, common_data_element.max
+    if minimum is not None and maximum is not None:
+        values = (minimum + maximum) / 2 + values * (maximum - minimum) / 6
+    elif minimum is not None:
+        values = minimum + 3 + values
+    elif maximum is not None:
+        values = maximum - 3 + values
+    if minimum is not None or maximum is not None:
+        values = numpy.clip(values, minimum, maximum)
+    # Rounded, the reals are written to the csv with less digits
+    return numpy.round(values, 0 if common_data_element.sql_type == "int" else 4)
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "-out",
+        "--output_path",
+        required=True,
+        help="The folder where the csvs and the node catalog are written.",
+    )
+    parser.add_argument(
+        "-pathologies",
+        "--pathologies",
+        default="dementia",
+        help="The pathologies to generate, comma separated.",
+    )
+    parser.add_argument(
+        "-rows", "--rows", type=int, required=True, help="The rows of each pathology."
+    )
+    parser.add_argument(
+        "-nodes", "--nodes", type=int, default=1, help="The number of local nodes."
+    )
+    parser.add_argument(
+        "-datasets",
+        "--datasets",
+        help="The datasets of each pathology, comma separated, all of them if not given.",
+    )
+    parser.add_argument(
+        "-null_rate",
+        "--null_rate",
+        type=float,
+        default=0.0,
+        help="The probability of a value being empty.",
+    )
+    parser.add_argument(
+        "-correlation",
+        "--correlation",
+        type=float,
+        default=0.5,
+        help="The correlation of the columns with the latent factor of each row.",
+    )
+    parser.add_argument(
+        "-seed", "--seed", type=int, default=0, help="The seed of the generator."
+    )
+    parser.add_argument(
+        "-host",
+        "--hostname",
+        default="127.0.0.1",
+        help="The hostname of the nodes in the node catalog.",
+    )
+    parser.add_argument(
+        "-jobs",
+        "--jobs",
+        type=int,
+        default=1,
+        help="The number of processes that write the csvs.",
+    )
+    args = parser.parse_args()
+
+    generate_cohort(
+        output_path=Path(args.output_path),
+        pathologies=args.pathologies.split(","),
+        rows=args.rows,
+        nodes=args.nodes,
+        datasets=args.datasets.split(",") if args.datasets else None,
+        null_rate=args.null_rate,
+        correlation=args.correlation,
+        seed=args.seed,
+        hostname=args.hostname,
+        jobs=args.jobs,
+    )
+    print(f"Generated the cohort in: {args.output_path}")
+
+
+if __name__ == "__main__":
+    main()
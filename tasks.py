@@ -112,17 +112,46 @@ def start_monetdb(c, port):
 
 
 @task(iterable=["port"])
-def load_data_into_db(c, port):
+def load_data_into_db(
+    c, port, folder="./tests/integration_tests/data/", partitioned=False, jobs=1
+):
     # TODO Refactor method, should use deployment.toml
-    """Load data into DB from csv"""
+    """Load data into DB from csv, optionally partitioned by dataset"""
     ports = port
     for port in ports:
         message(f"Loading data on MonetDB at port {port}...", Level.HEADER)
-        # TODO Path should not be hardcoded
-        cmd = f"poetry run python -m mipengine.node.monetdb_interface.csv_importer -folder ./tests/integration_tests/data/ -user monetdb -pass monetdb -url localhost:{port} -farm db"
+        cmd = f"poetry run python -m mipengine.node.monetdb_interface.csv_importer -folder {folder} -user monetdb -pass monetdb -url localhost:{port} -farm db"
+        if partitioned:
+            cmd += " --partitioned"
+        cmd += f" --jobs {jobs}"
         run(c, cmd)
 
 
+@task
+def generate_data(
+    c,
+    output,
+    rows,
+    nodes=1,
+    pathologies="dementia",
+    null_rate=0.0,
+    correlation=0.5,
+    seed=0,
+    jobs=1,
+):
+    """Generate synthetic csvs from the pathologies metadata, spread across nodes
+
+    The csvs of each local node are written in <output>/<node id>, along with
+    a node catalog of the nodes in <output>/node_catalog.json."""
+    message(f"Generating {rows} rows per pathology in {output}...", Level.HEADER)
+    cmd = (
+        f"poetry run python -m mipengine.utils.cohort_generator -out {output} "
+        f"-rows {rows} -nodes {nodes} -pathologies {pathologies} "
+        f"-null_rate {null_rate} -correlation {correlation} -seed {seed} -jobs {jobs}"
+    )
+    run(c, cmd)
+
+
 @task
 def config_rabbitmq(c, ports):
     """Configure users and permissions for RabbitMQ containers"""
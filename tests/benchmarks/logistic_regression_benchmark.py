@@ -0,0 +1,303 @@
+"""
+End-to-end benchmark of the federated logistic regression.
+
+For every node count and row count of the matrix, a synthetic cohort of the
+dementia pathology is generated with the cohort_generator and the global
+node and the local nodes are deployed with the invoke tasks, each local node
+loaded with its own datasets. logistic_regression then runs, with the
+controller in this process, for every column count of the matrix, on that
+many covariates. The results of all the runs are written as json, to be
+compared among changes of the engine.
+
+Usage:
+    python -m tests.benchmarks.logistic_regression_benchmark -out results.json \
+        -rows 10000,100000 -columns 2,10 -nodes 1,2,4 -ip <ip>
+
+The deployment needs docker and rabbitmq, like invoke deploy. The node
+catalog of each deployment is written to a file of its own, which the nodes
+and the controller read through the MIPENGINE_NODE_CATALOG_PATH environment
+variable, so the node catalog of the package is left untouched.
+"""
+import datetime
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import traceback
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import List
+
+import pymonetdb
+
+from mipengine import config
+from mipengine.common.common_data_elements import common_data_elements
+from mipengine.common.node_catalog import NODE_CATALOG_PATH_ENV_VAR
+from mipengine.controller.algorithm_executor.AlgorithmExecutor import (
+    AlgorithmExecutor,
+)
+from mipengine.controller.api.DTOs.AlgorithmRequestDTO import AlgorithmInputDataDTO
+from mipengine.controller.api.DTOs.AlgorithmRequestDTO import AlgorithmRequestDTO
+from mipengine.utils.cohort_generator import generate_cohort
+from tests.benchmarks.metrics import BenchmarkResult
+from tests.benchmarks.metrics import ControllerRecorder
+from tests.benchmarks.metrics import TablesSampler
+from tests.benchmarks.metrics import get_iteration_times
+
+PROJECT_ROOT = Path(__file__).parents[2]
+ALGORITHM_NAME = "logistic_regression"
+ITERATION_MARKER = "logistic_regression.tensor_expit"
+PATHOLOGY = "dementia"
+TARGET_VARIABLE = "alzheimerbroadcategory_bin"
+
+
+def get_covariates(columns: int) -> List[str]:
+    """
+    Returns the first numeric, non categorical, cdes of the pathology.
+    """
+    covariates = [
+        code
+        for code, common_data_element in common_data_elements.pathologies[
+            PATHOLOGY
+        ].items()
+        if common_data_element.sql_type == "real"
+        and not common_data_element.categorical
+    ]
+    if columns > len(covariates):
+        raise ValueError(
+            f"The pathology '{PATHOLOGY}' has {len(covariates)} numeric columns, "
+            f"asked for: {columns}"
+        )
+    return covariates[:columns]
+
+
+def invoke(*args: str):
+    subprocess.run(["invoke", *args], cwd=PROJECT_ROOT, check=True)
+
+
+def deploy_nodes(
+    node_catalog: dict, cohort_path: Path, node_catalog_path: Path, ip: str, jobs: int
+):
+    """
+    Deploys the nodes of the node catalog with the invoke tasks and loads the
+    csvs of each local node in its database. The node catalog is copied to
+    node_catalog_path, the one the nodes and the controller read.
+    """
+    shutil.copyfile(cohort_path / "node_catalog.json", node_catalog_path)
+    nodes = [node_catalog["globalNode"]] + node_catalog["localNodes"]
+    config_args = ["config", "--ip", ip]
+    for node in nodes:
+        config_args += [
+            "--node-name",
+            node["nodeId"],
+            "--monetdb-port",
+            node["monetdbPort"],
+            "--rabbitmq-port",
+            node["rabbitmqURL"].rsplit(":", 1)[1],
+        ]
+    invoke(*config_args)
+    invoke("deploy", "--start-nodes", "--no-install")
+    for local_node in node_catalog["localNodes"]:
+        invoke(
+            "load-data-into-db",
+            "--port",
+            local_node["monetdbPort"],
+            "--folder",
+            str(cohort_path / local_node["nodeId"]),
+            "--jobs",
+            str(jobs),
+        )
+
+
+def connect_to_node_db(node: dict):
+    return lambda: pymonetdb.connect(
+        username=config.monetdb.username,
+        password=config.monetdb.password,
+        hostname=node["monetdbHostname"],
+        port=node["monetdbPort"],
+        database=config.monetdb.database,
+    )
+
+
+def run_logistic_regression(
+    node_catalog: dict, datasets: List[str], rows: int, columns: int
+) -> BenchmarkResult:
+    algorithm_request = AlgorithmRequestDTO(
+        inputdata=AlgorithmInputDataDTO(
+            pathology=PATHOLOGY,
+            datasets=datasets,
+            x=get_covariates(columns),
+            y=[TARGET_VARIABLE],
+        )
+    )
+    nodes = [node_catalog["globalNode"]] + node_catalog["localNodes"]
+    recorder = ControllerRecorder(iteration_marker=ITERATION_MARKER)
+    tables_sampler = TablesSampler(
+        {node["nodeId"]: connect_to_node_db(node) for node in nodes}
+    )
+    error = None
+    with recorder, tables_sampler:
+        start_time = time.monotonic()
+        try:
+            AlgorithmExecutor(ALGORITHM_NAME, algorithm_request).run()
+        except Exception:
+            error = traceback.format_exc()
+        end_time = time.monotonic()
+
+    return BenchmarkResult(
+        rows=rows,
+        columns=columns,
+        nodes=len(node_catalog["localNodes"]),
+        wall_time=end_time - start_time,
+        iterations=len(recorder.iteration_starts),
+        iteration_times=get_iteration_times(recorder.iteration_starts, end_time),
+        round_trips=dict(recorder.round_trips),
+        bytes_sent=recorder.bytes_sent,
+        bytes_received=recorder.bytes_received,
+        shared_tables_bytes=recorder.shared_tables_bytes,
+        peak_tables=tables_sampler.peak_tables,
+        error=error,
+    )
+
+
+def get_commit() -> str:
+    return subprocess.run(
+        ["git", "rev-parse", "HEAD"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+def run_benchmarks(
+    output_path: Path,
+    rows_matrix: List[int],
+    columns_matrix: List[int],
+    nodes_matrix: List[int],
+    ip: str,
+    jobs: int,
+    seed: int,
+):
+    results = []
+    benchmark_folder = tempfile.TemporaryDirectory()
+    node_catalog_path = Path(benchmark_folder.name) / "node_catalog.json"
+    original_node_catalog_path = os.environ.get(NODE_CATALOG_PATH_ENV_VAR)
+    # The environment is inherited by the nodes that invoke starts
+    os.environ[NODE_CATALOG_PATH_ENV_VAR] = str(node_catalog_path)
+    try:
+        for nodes in nodes_matrix:
+            for rows in rows_matrix:
+                with tempfile.TemporaryDirectory() as cohort_folder:
+                    cohort_path = Path(cohort_folder)
+                    node_catalog = generate_cohort(
+                        cohort_path,
+                        pathologies=[PATHOLOGY],
+                        rows=rows,
+                        nodes=nodes,
+                        seed=seed,
+                        hostname=ip,
+                        jobs=jobs,
+                    )
+                    deploy_nodes(node_catalog, cohort_path, node_catalog_path, ip, jobs)
+                datasets = sorted(
+                    common_data_elements.pathologies[PATHOLOGY]["dataset"].enumerations
+                )
+                for columns in columns_matrix:
+                    result = run_logistic_regression(
+                        node_catalog, datasets, rows, columns
+                    )
+                    print(
+                        f"nodes: {nodes}, rows: {rows}, columns: {columns}, "
+                        f"wall time: {result.wall_time:.2f}s, "
+                        f"iterations: {result.iterations}"
+                        + (", failed" if result.error else "")
+                    )
+                    results.append(result)
+                    # The results are written after every run, so a failing
+                    # deployment does not lose the previous runs
+                    write_results(output_path, results)
+    finally:
+        invoke("cleanup")
+        if original_node_catalog_path is None:
+            del os.environ[NODE_CATALOG_PATH_ENV_VAR]
+        else:
+            os.environ[NODE_CATALOG_PATH_ENV_VAR] = original_node_catalog_path
+        benchmark_folder.cleanup()
+
+
+def write_results(output_path: Path, results: List[BenchmarkResult]):
+    benchmark = {
+        "algorithm": ALGORITHM_NAME,
+        "commit": get_commit(),
+        "date": datetime.datetime.now().isoformat(),
+        "controller": {
+            "deferred_execution": config.controller.deferred_execution,
+            "drop_unreachable_tables": config.controller.drop_unreachable_tables,
+            "table_data_encoding": config.controller.table_data_encoding,
+        },
+        "results": [result.to_dict() for result in results],
+    }
+    with open(output_path, "w") as output_file:
+        json.dump(benchmark, output_file, indent=2)
+
+
+def parse_matrix(values: str) -> List[int]:
+    return [int(value) for value in values.split(",")]
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "-out", "--output_path", required=True, help="The json of the results."
+    )
+    parser.add_argument(
+        "-rows",
+        "--rows",
+        type=parse_matrix,
+        default=[10000],
+        help="The row counts, comma separated.",
+    )
+    parser.add_argument(
+        "-columns",
+        "--columns",
+        type=parse_matrix,
+        default=[2],
+        help="The covariate counts, comma separated.",
+    )
+    parser.add_argument(
+        "-nodes",
+        "--nodes",
+        type=parse_matrix,
+        default=[2],
+        help="The local node counts, comma separated.",
+    )
+    parser.add_argument(
+        "-ip", "--ip", required=True, help="The ip of the machine, for the nodes."
+    )
+    parser.add_argument(
+        "-jobs",
+        "--jobs",
+        type=int,
+        default=1,
+        help="The processes that generate and load the csvs.",
+    )
+    parser.add_argument(
+        "-seed", "--seed", type=int, default=0, help="The seed of the cohorts."
+    )
+    args = parser.parse_args()
+
+    run_benchmarks(
+        output_path=Path(args.output_path),
+        rows_matrix=args.rows,
+        columns_matrix=args.columns,
+        nodes_matrix=args.nodes,
+        ip=args.ip,
+        jobs=args.jobs,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
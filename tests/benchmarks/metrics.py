@@ -0,0 +1,209 @@
+"""
+The metrics of a benchmark run, recorded on the controller and on the
+databases of the nodes.
+
+The ControllerRecorder hooks into the controller while an algorithm runs and
+counts the celery tasks sent to the nodes, the bytes of the task messages and
+results, the bytes of the tables shared among the nodes and the start of each
+iteration of the algorithm. The TablesSampler polls the databases of the nodes
+for the number of their tables, to find the peak tables of each node.
+"""
+import json
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from celery.result import AsyncResult
+from celery.signals import after_task_publish
+from dataclasses_json import dataclass_json
+
+from mipengine.controller.algorithm_executor.AlgorithmExecutor import (
+    AlgorithmExecutor,
+)
+
+TABLES_SAMPLING_INTERVAL = 0.1
+# The shared tables are tensors of doubles
+SHARED_VALUE_BYTES = 8
+
+
+@dataclass_json
+@dataclass
+class BenchmarkResult:
+    rows: int
+    columns: int
+    nodes: int
+    wall_time: float
+    iterations: int
+    iteration_times: List[float]
+    round_trips: Dict[str, int]
+    bytes_sent: int
+    bytes_received: int
+    shared_tables_bytes: int
+    peak_tables: Dict[str, int]
+    error: Optional[str] = None
+
+
+def get_iteration_times(iteration_starts: List[float], end_time: float) -> List[float]:
+    """
+    Returns the duration of each iteration, from its start to the start of the
+    next one, the last one ending at the end time.
+    """
+    return [
+        next_start - start
+        for start, next_start in zip(
+            iteration_starts, iteration_starts[1:] + [end_time]
+        )
+    ]
+
+
+def get_message_size(message) -> int:
+    if isinstance(message, bytes):
+        return len(message)
+    if not isinstance(message, str):
+        message = json.dumps(message, default=str)
+    return len(message.encode())
+
+
+class ControllerRecorder:
+    """
+    Records the communication of the controller with the nodes, while in its
+    context.
+
+    Every task sent to a node is a round trip, counted per task name. The
+    sizes of the messages are the sizes of the task arguments and results
+    serialized to json, like the celery json serializer does. The shared
+    tables are read by the nodes from each other's databases, so their bytes
+    are estimated from their rows and columns. The calls of the iteration
+    marker udf, a udf run once per iteration, mark the starts of the
+    iterations.
+    """
+
+    def __init__(self, iteration_marker: str):
+        self.iteration_marker = iteration_marker
+        self.round_trips = Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.shared_tables_bytes = 0
+        self.iteration_starts = []
+        self._lock = threading.Lock()
+        self._originals = {}
+
+    def __enter__(self):
+        after_task_publish.connect(self._on_task_published, weak=False)
+        self._wrap(AsyncResult, "get", self._record_result)
+        self._wrap(
+            AlgorithmExecutor.Node,
+            "queue_create_remote_table",
+            self._record_shared_table,
+        )
+        self._wrap(
+            AlgorithmExecutor.AlgorithmExecutionInterface,
+            "run_udf_on_local_nodes",
+            self._record_local_udf,
+        )
+        return self
+
+    def __exit__(self, *exc_info):
+        after_task_publish.disconnect(self._on_task_published)
+        for (cls, method_name), method in self._originals.items():
+            setattr(cls, method_name, method)
+        self._originals = {}
+
+    def _wrap(self, cls, method_name: str, record: Callable):
+        method = getattr(cls, method_name)
+        self._originals[(cls, method_name)] = method
+
+        def wrapper(instance, *args, **kwargs):
+            return record(method, instance, *args, **kwargs)
+
+        setattr(cls, method_name, wrapper)
+
+    def _on_task_published(self, sender=None, body=None, **kwargs):
+        task_name = sender.rsplit(".", 1)[-1] if sender else "unknown"
+        with self._lock:
+            self.round_trips[task_name] += 1
+            self.bytes_sent += get_message_size(body)
+
+    def _record_result(self, method, async_result, *args, **kwargs):
+        result = method(async_result, *args, **kwargs)
+        with self._lock:
+            self.bytes_received += get_message_size(result)
+        return result
+
+    def _record_shared_table(self, method, node, table_info, native_node):
+        row_count = native_node.table_row_counts.get(table_info.name, 0)
+        with self._lock:
+            self.shared_tables_bytes += (
+                row_count * len(table_info.schema.columns) * SHARED_VALUE_BYTES
+            )
+        return method(node, table_info, native_node)
+
+    def _record_local_udf(self, method, interface, func_name, *args, **kwargs):
+        if func_name == self.iteration_marker:
+            self.iteration_starts.append(time.monotonic())
+        return method(interface, func_name, *args, **kwargs)
+
+
+class TablesSampler(threading.Thread):
+    """
+    Polls the number of tables in the databases of the nodes, while in its
+    context. The peak tables of a node are counted above the tables it had
+    when the sampling started, so its data tables are not counted.
+    """
+
+    def __init__(
+        self,
+        connection_factories: Dict[str, Callable],
+        interval: float = TABLES_SAMPLING_INTERVAL,
+    ):
+        super().__init__(daemon=True)
+        self._connection_factories = connection_factories
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._connections = {}
+        self._baseline_tables = {}
+        self.peak_tables = {}
+
+    def __enter__(self):
+        for node_id, connection_factory in self._connection_factories.items():
+            self._connections[node_id] = connection_factory()
+        self._baseline_tables = self._count_tables()
+        self.peak_tables = {node_id: 0 for node_id in self._connections}
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self.join()
+        self._sample()
+        for connection in self._connections.values():
+            connection.close()
+
+    def run(self):
+        while not self._stopped.wait(self._interval):
+            self._sample()
+
+    def _sample(self):
+        for node_id, tables in self._count_tables().items():
+            self.peak_tables[node_id] = max(
+                self.peak_tables[node_id], tables - self._baseline_tables[node_id]
+            )
+
+    def _count_tables(self) -> Dict[str, int]:
+        tables = {}
+        for node_id, connection in self._connections.items():
+            cursor = connection.cursor()
+            try:
+                # The state of the database is refreshed by the commit
+                connection.commit()
+                cursor.execute("SELECT COUNT(*) FROM sys.tables WHERE system = FALSE")
+                (tables[node_id],) = cursor.fetchone()
+            finally:
+                cursor.close()
+        return tables
@@ -40,6 +40,10 @@ def get_celery_create_view_signature(celery_app):
     return celery_app.signature("mipengine.node.tasks.views.create_view")
 
 
+def get_celery_create_initial_views_signature(celery_app):
+    return celery_app.signature("mipengine.node.tasks.views.create_initial_views")
+
+
 def get_celery_get_views_signature(celery_app):
     return celery_app.signature("mipengine.node.tasks.views.get_views")
 
@@ -70,6 +74,14 @@ def get_celery_get_table_data_signature(celery_app):
     return celery_app.signature("mipengine.node.tasks.common.get_table_data")
 
 
+def get_celery_get_table_data_page_signature(celery_app):
+    return celery_app.signature("mipengine.node.tasks.common.get_table_data_page")
+
+
+def get_celery_get_table_data_columnar_signature(celery_app):
+    return celery_app.signature("mipengine.node.tasks.common.get_table_data_columnar")
+
+
 def get_celery_get_udfs_signature(celery_app):
     return celery_app.signature("mipengine.node.tasks.udfs.get_udfs")
 
@@ -78,9 +90,17 @@ def get_celery_run_udf_signature(celery_app):
     return celery_app.signature("mipengine.node.tasks.udfs.run_udf")
 
 
+def get_celery_run_udf_pipeline_signature(celery_app):
+    return celery_app.signature("mipengine.node.tasks.udfs.run_udf_pipeline")
+
+
 def get_celery_get_run_udf_query_signature(celery_app):
     return celery_app.signature("mipengine.node.tasks.udfs.get_run_udf_query")
 
 
+def get_celery_drop_tables_signature(celery_app):
+    return celery_app.signature("mipengine.node.tasks.common.drop_tables")
+
+
 def get_celery_cleanup_signature(celery_app):
     return celery_app.signature("mipengine.node.tasks.common.clean_up")
@@ -0,0 +1,115 @@
+import uuid
+
+import pymonetdb
+import pytest
+
+from mipengine.common.node_catalog import node_catalog
+from mipengine.common.node_tasks_DTOs import ColumnInfo
+from mipengine.common.node_tasks_DTOs import TableInfo
+from mipengine.common.node_tasks_DTOs import TableSchema
+from tests.integration_tests import nodes_communication
+from tests.integration_tests.node_db_connections import get_node_db_connection
+
+local_node_1_id = "localnode1"
+local_node_2_id = "localnode2"
+local_node_1 = nodes_communication.get_celery_app(local_node_1_id)
+local_node_2 = nodes_communication.get_celery_app(local_node_2_id)
+local_node_1_create_table = nodes_communication.get_celery_create_table_signature(
+    local_node_1
+)
+local_node_2_create_table = nodes_communication.get_celery_create_table_signature(
+    local_node_2
+)
+local_node_1_create_remote_table = (
+    nodes_communication.get_celery_create_remote_table_signature(local_node_1)
+)
+local_node_1_create_merge_table = (
+    nodes_communication.get_celery_create_merge_table_signature(local_node_1)
+)
+local_node_1_create_view = nodes_communication.get_celery_create_view_signature(
+    local_node_1
+)
+local_node_1_cleanup = nodes_communication.get_celery_cleanup_signature(local_node_1)
+local_node_2_cleanup = nodes_communication.get_celery_cleanup_signature(local_node_2)
+
+TABLE_SCHEMA = TableSchema([ColumnInfo("col1", "int"), ColumnInfo("col2", "real")])
+
+
+@pytest.fixture(autouse=True)
+def context_id():
+    context_id = "test_clean_up_" + str(uuid.uuid4()).replace("-", "")
+
+    yield context_id
+
+    local_node_1_cleanup.delay(context_id=context_id).get()
+    local_node_2_cleanup.delay(context_id=context_id).get()
+
+
+def get_context_objects(node_id, context_id):
+    connection = get_node_db_connection(node_id)
+    cursor = connection.cursor()
+    cursor.execute(
+        f"""
+        SELECT name FROM tables
+        WHERE name LIKE '%{context_id.lower()}%' AND system = false
+        UNION ALL
+        SELECT name FROM functions
+        WHERE name LIKE '%{context_id.lower()}%' AND system = false
+        """
+    )
+    objects = [name for (name,) in cursor.fetchall()]
+    connection.close()
+    return objects
+
+
+def test_clean_up_drops_all_the_context_objects(context_id):
+    table_names = [
+        local_node_1_create_table.delay(
+            context_id=context_id,
+            command_id=str(pymonetdb.uuid.uuid1()).replace("-", ""),
+            schema_json=TABLE_SCHEMA.to_json(),
+        ).get()
+        for _ in range(2)
+    ]
+    local_node_1_create_merge_table.delay(
+        context_id=context_id,
+        command_id=str(pymonetdb.uuid.uuid1()).replace("-", ""),
+        table_names=table_names,
+    ).get()
+
+    local_node_2_table_name = local_node_2_create_table.delay(
+        context_id=context_id,
+        command_id=str(pymonetdb.uuid.uuid1()).replace("-", ""),
+        schema_json=TABLE_SCHEMA.to_json(),
+    ).get()
+    local_node_2_data = node_catalog.get_local_node(local_node_2_id)
+    local_node_1_create_remote_table.delay(
+        table_info_json=TableInfo(local_node_2_table_name, TABLE_SCHEMA).to_json(),
+        monetdb_socket_address=(
+            f"{local_node_2_data.monetdbHostname}:{local_node_2_data.monetdbPort}"
+        ),
+    ).get()
+
+    local_node_1_create_view.delay(
+        context_id=context_id,
+        command_id=str(pymonetdb.uuid.uuid1()).replace("-", ""),
+        pathology="tbi",
+        datasets=["edsd"],
+        columns=["dataset", "age_value"],
+        filters_json=None,
+    ).get()
+
+    connection = get_node_db_connection(local_node_1_id)
+    connection.cursor().execute(
+        f"CREATE FUNCTION udf_{context_id.lower()}() RETURNS INT BEGIN RETURN 1; END;"
+    )
+    connection.commit()
+    connection.close()
+
+    # 2 normal tables, a merge table, a remote table, a view and a udf
+    assert len(get_context_objects(local_node_1_id, context_id)) == 6
+
+    dropped_objects = local_node_1_cleanup.delay(context_id=context_id).get()
+
+    assert dropped_objects == 6
+    assert get_context_objects(local_node_1_id, context_id) == []
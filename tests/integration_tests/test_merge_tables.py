@@ -6,6 +6,8 @@ import pytest
 from mipengine.common.node_exceptions import IncompatibleSchemasMergeException
 from mipengine.common.node_exceptions import TablesNotFound
 from mipengine.common.node_tasks_DTOs import ColumnInfo
+from mipengine.common.node_tasks_DTOs import TableData
+from mipengine.common.node_tasks_DTOs import TableDataPage
 from mipengine.common.node_tasks_DTOs import TableSchema
 from tests.integration_tests import nodes_communication
 from tests.integration_tests.node_db_connections import get_node_db_connection
@@ -21,6 +23,12 @@ local_node_create_merge_table = (
 local_node_get_merge_tables = nodes_communication.get_celery_get_merge_tables_signature(
     local_node
 )
+local_node_get_table_data = nodes_communication.get_celery_get_table_data_signature(
+    local_node
+)
+local_node_get_table_data_page = (
+    nodes_communication.get_celery_get_table_data_page_signature(local_node)
+)
 local_node_cleanup = nodes_communication.get_celery_cleanup_signature(local_node)
 
 
@@ -64,6 +72,33 @@ def create_three_column_table_with_data(context_id, table_id: int):
     return table_name
 
 
+def create_keyed_table_with_data(context_id, table_id: int):
+    table_schema = TableSchema(
+        [
+            ColumnInfo("node_id", "text"),
+            ColumnInfo("row_id", "int"),
+            ColumnInfo("val", "real"),
+        ]
+    )
+    table_name = local_node_create_table.delay(
+        context_id=f"{context_id}_table_{table_id}",
+        command_id=str(pymonetdb.uuid.uuid1()).replace("-", ""),
+        schema_json=table_schema.to_json(),
+    ).get()
+
+    connection = get_node_db_connection(local_node_id)
+    cursor = connection.cursor()
+    # every table has the same row_ids, told apart by the node_id
+    for row_id in range(5):
+        cursor.execute(
+            f"INSERT INTO {table_name} VALUES "
+            f"('node{table_id}', {row_id}, {table_id}.{row_id})"
+        )
+    connection.commit()
+    connection.close()
+    return table_name
+
+
 def test_create_and_get_merge_table(context_id):
     tables_to_be_merged = [
         create_three_column_table_with_data(context_id, 1),
@@ -108,3 +143,35 @@ def test_table_cannot_be_found(context_id):
             command_id=str(pymonetdb.uuid.uuid1()).replace("-", ""),
             table_names=not_found_tables,
         ).get()
+
+
+def test_merge_table_pages_match_full_read(context_id):
+    merge_table_name = local_node_create_merge_table.delay(
+        context_id=context_id,
+        command_id=str(pymonetdb.uuid.uuid1()).replace("-", ""),
+        table_names=[
+            create_keyed_table_with_data(context_id, table_id)
+            for table_id in range(1, 5)
+        ],
+    ).get()
+
+    pages_data = []
+    cursor = None
+    while True:
+        page = TableDataPage.from_json(
+            local_node_get_table_data_page.delay(
+                table_name=merge_table_name, page_size=3, cursor=cursor
+            ).get()
+        )
+        pages_data += page.data
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    full_data = TableData.from_json(
+        local_node_get_table_data.delay(table_name=merge_table_name).get()
+    ).data
+    assert len(pages_data) == 20
+    assert sorted(pages_data) == sorted(full_data)
+    # the pages follow the key of the table, so they never overlap
+    assert pages_data == sorted(pages_data, key=lambda row: (row[0], row[1]))
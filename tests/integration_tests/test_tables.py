@@ -2,10 +2,14 @@ import uuid
 
 import pytest
 
+from mipengine.common.columnar_encoding import columns_to_rows
+from mipengine.common.columnar_encoding import decode_table_data_b64
 from mipengine.common.node_tasks_DTOs import ColumnInfo
 from mipengine.common.node_tasks_DTOs import TableData
+from mipengine.common.node_tasks_DTOs import TableDataPage
 from mipengine.common.node_tasks_DTOs import TableSchema
 from tests.integration_tests import nodes_communication
+from tests.integration_tests.node_db_connections import get_node_db_connection
 
 local_node = nodes_communication.get_celery_app("localnode1")
 local_node_create_table = nodes_communication.get_celery_create_table_signature(
@@ -18,6 +22,15 @@ local_node_get_table_schema = nodes_communication.get_celery_get_table_schema_si
 local_node_get_table_data = nodes_communication.get_celery_get_table_data_signature(
     local_node
 )
+local_node_get_table_data_page = (
+    nodes_communication.get_celery_get_table_data_page_signature(local_node)
+)
+local_node_get_table_data_columnar = (
+    nodes_communication.get_celery_get_table_data_columnar_signature(local_node)
+)
+local_node_drop_tables = nodes_communication.get_celery_drop_tables_signature(
+    local_node
+)
 local_node_cleanup = nodes_communication.get_celery_cleanup_signature(local_node)
 
 
@@ -63,3 +76,91 @@ def test_create_and_find_tables(context_id):
     table_schema_json = local_node_get_table_schema.delay(table_name=table_2_name).get()
     table_schema_1 = TableSchema.from_json(table_schema_json)
     assert table_schema_1 == table_schema
+
+
+def test_drop_tables(context_id):
+    table_schema = TableSchema([ColumnInfo("col1", "int")])
+
+    table_names = [
+        local_node_create_table.delay(
+            context_id=context_id,
+            command_id=str(uuid.uuid4()).replace("-", ""),
+            schema_json=table_schema.to_json(),
+        ).get()
+        for _ in range(2)
+    ]
+
+    local_node_drop_tables.delay(table_names=table_names[:1]).get()
+    tables = local_node_get_tables.delay(context_id=context_id).get()
+    assert table_names[0] not in tables
+    assert table_names[1] in tables
+
+    # dropping tables that do not exist is a no-op
+    local_node_drop_tables.delay(table_names=table_names).get()
+    tables = local_node_get_tables.delay(context_id=context_id).get()
+    assert table_names[1] not in tables
+
+
+def test_get_table_data_pages(context_id):
+    table_schema = TableSchema([ColumnInfo("col1", "int"), ColumnInfo("col2", "real")])
+    table_name = local_node_create_table.delay(
+        context_id=context_id,
+        command_id=str(uuid.uuid4()).replace("-", ""),
+        schema_json=table_schema.to_json(),
+    ).get()
+
+    connection = get_node_db_connection("localnode1")
+    cursor = connection.cursor()
+    for value in range(5):
+        cursor.execute(f"INSERT INTO {table_name} VALUES ({value}, {value}.5)")
+    connection.commit()
+    connection.close()
+
+    pages = []
+    cursor = None
+    while True:
+        page = TableDataPage.from_json(
+            local_node_get_table_data_page.delay(
+                table_name=table_name, page_size=2, cursor=cursor, columns=["col1"]
+            ).get()
+        )
+        pages.append(page)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert len(pages) == 3
+    assert pages[0].schema == TableSchema([ColumnInfo("col1", "int")])
+    assert sorted(row[0] for page in pages for row in page.data) == list(range(5))
+
+
+def test_get_table_data_columnar(context_id):
+    table_schema = TableSchema(
+        [
+            ColumnInfo("col1", "int"),
+            ColumnInfo("col2", "real"),
+            ColumnInfo("col3", "text"),
+        ]
+    )
+    table_name = local_node_create_table.delay(
+        context_id=context_id,
+        command_id=str(uuid.uuid4()).replace("-", ""),
+        schema_json=table_schema.to_json(),
+    ).get()
+
+    connection = get_node_db_connection("localnode1")
+    cursor = connection.cursor()
+    cursor.execute(f"INSERT INTO {table_name} VALUES (1, 0.5, 'a')")
+    cursor.execute(f"INSERT INTO {table_name} VALUES (NULL, 1.5, NULL)")
+    cursor.execute(f"INSERT INTO {table_name} VALUES (3, NULL, 'βγ')")
+    connection.commit()
+    connection.close()
+
+    schema, columns = decode_table_data_b64(
+        local_node_get_table_data_columnar.delay(table_name=table_name).get()
+    )
+    table_data = TableData.from_json(
+        local_node_get_table_data.delay(table_name=table_name).get()
+    )
+    assert schema == table_data.schema == table_schema
+    assert columns_to_rows(schema, columns) == table_data.data
@@ -0,0 +1,194 @@
+import json
+import uuid
+
+import pytest
+
+from mipengine.common.node_tasks_DTOs import ColumnInfo
+from mipengine.common.node_tasks_DTOs import TableData
+from mipengine.common.node_tasks_DTOs import TableSchema
+from mipengine.common.node_tasks_DTOs import UDFArgument
+from mipengine.common.node_tasks_DTOs import UDFExecutionResult
+from mipengine.common.node_tasks_DTOs import UDFPipelineStep
+from tests.integration_tests import nodes_communication
+from tests.integration_tests.node_db_connections import get_node_db_connection
+
+local_node_id = "localnode1"
+local_node = nodes_communication.get_celery_app(local_node_id)
+local_node_create_table = nodes_communication.get_celery_create_table_signature(
+    local_node
+)
+local_node_get_tables = nodes_communication.get_celery_get_tables_signature(local_node)
+local_node_get_table_schema = nodes_communication.get_celery_get_table_schema_signature(
+    local_node
+)
+local_node_get_table_data = nodes_communication.get_celery_get_table_data_signature(
+    local_node
+)
+local_node_run_udf = nodes_communication.get_celery_run_udf_signature(local_node)
+local_node_run_udf_pipeline = nodes_communication.get_celery_run_udf_pipeline_signature(
+    local_node
+)
+local_node_cleanup = nodes_communication.get_celery_cleanup_signature(local_node)
+
+
+@pytest.fixture(autouse=True)
+def context_id():
+    context_id = "test_udf_pipeline_" + str(uuid.uuid4()).replace("-", "")
+
+    yield context_id
+
+    local_node_cleanup.delay(context_id=context_id).get()
+
+
+def create_tensor_table_with_data(context_id):
+    table_schema = TableSchema([ColumnInfo("dim0", "int"), ColumnInfo("val", "real")])
+    table_name = local_node_create_table.delay(
+        context_id=context_id,
+        command_id=str(uuid.uuid4()).replace("-", ""),
+        schema_json=table_schema.to_json(),
+    ).get()
+
+    connection = get_node_db_connection(local_node_id)
+    cursor = connection.cursor()
+    for dim0 in range(3):
+        cursor.execute(f"INSERT INTO {table_name} VALUES ({dim0}, {dim0 + 1}.0)")
+    connection.commit()
+    connection.close()
+    return table_name
+
+
+def create_step(func_name, *positional_args):
+    return UDFPipelineStep(
+        command_id=str(uuid.uuid4()).replace("-", ""),
+        func_name=func_name,
+        positional_args=list(positional_args),
+    ).to_json()
+
+
+def test_run_udf_pipeline(context_id):
+    table_name = create_tensor_table_with_data(context_id)
+
+    # (10 - (t + t)) in two steps, the second one reading the first one's result
+    steps = [
+        create_step(
+            "sql.tensor1_add",
+            UDFArgument(type="table", value=table_name),
+            UDFArgument(type="table", value=table_name),
+        ),
+        create_step(
+            "sql.const_tensor1_sub",
+            UDFArgument(type="literal", value="10"),
+            UDFArgument(type="step_result", value=0),
+        ),
+    ]
+    results = [
+        UDFExecutionResult.from_json(result)
+        for result in local_node_run_udf_pipeline.delay(
+            context_id=context_id, steps_json=steps
+        ).get()
+    ]
+
+    assert len(results) == 2
+    assert all(result.row_count == 3 for result in results)
+    # the schemas of the results are the ones of the generated queries
+    for result in results:
+        assert result.schema == TableSchema.from_json(
+            local_node_get_table_schema.delay(table_name=result.table_name).get()
+        )
+    final_table_data = TableData.from_json(
+        local_node_get_table_data.delay(table_name=results[1].table_name).get()
+    )
+    assert [column.name for column in final_table_data.schema.columns] == [
+        "node_id",
+        "dim0",
+        "val",
+    ]
+    assert sorted(row[1:] for row in final_table_data.data) == [
+        [0, 8.0],
+        [1, 6.0],
+        [2, 4.0],
+    ]
+
+
+def test_failed_udf_pipeline_leaves_no_tables(context_id):
+    table_name = create_tensor_table_with_data(context_id)
+
+    # the second step refers to a step that does not exist, so it fails after
+    # the first step has created its table
+    steps = [
+        create_step(
+            "sql.tensor1_add",
+            UDFArgument(type="table", value=table_name),
+            UDFArgument(type="table", value=table_name),
+        ),
+        create_step(
+            "sql.const_tensor1_sub",
+            UDFArgument(type="literal", value="10"),
+            UDFArgument(type="step_result", value=5),
+        ),
+    ]
+    with pytest.raises(ValueError):
+        local_node_run_udf_pipeline.delay(context_id=context_id, steps_json=steps).get()
+
+    tables = local_node_get_tables.delay(context_id=context_id).get()
+    assert tables == [table_name]
+
+
+def test_fused_udf_matches_the_unfused_udfs(context_id):
+    table_name = create_tensor_table_with_data(context_id)
+    table_argument = UDFArgument(type="table", value=table_name)
+
+    # (10 - (t + t)) * t, one udf per operation
+    steps = [
+        create_step("sql.tensor1_add", table_argument, table_argument),
+        create_step(
+            "sql.const_tensor1_sub",
+            UDFArgument(type="literal", value="10"),
+            UDFArgument(type="step_result", value=0),
+        ),
+        create_step(
+            "sql.tensor1_mult",
+            UDFArgument(type="step_result", value=1),
+            table_argument,
+        ),
+    ]
+    unfused_result = UDFExecutionResult.from_json(
+        local_node_run_udf_pipeline.delay(
+            context_id=context_id, steps_json=steps
+        ).get()[-1]
+    )
+
+    # the same operations with the expression the controller compiles them to
+    expression = [
+        "*",
+        ["-", ["const", 10], ["+", ["table", 0], ["table", 0]]],
+        ["table", 0],
+    ]
+    fused_result = UDFExecutionResult.from_json(
+        local_node_run_udf.delay(
+            command_id=str(uuid.uuid4()).replace("-", ""),
+            context_id=context_id,
+            func_name="sql.fused_tensor1",
+            positional_args_json=[
+                UDFArgument(type="literal", value=json.dumps(expression)).to_json(),
+                table_argument.to_json(),
+            ],
+            keyword_args_json={},
+        ).get()
+    )
+
+    unfused_table_data, fused_table_data = [
+        TableData.from_json(
+            local_node_get_table_data.delay(table_name=result.table_name).get()
+        )
+        for result in (unfused_result, fused_result)
+    ]
+    assert [column.name for column in fused_table_data.schema.columns] == [
+        column.name for column in unfused_table_data.schema.columns
+    ]
+    assert sorted(fused_table_data.data) == sorted(unfused_table_data.data)
+    assert sorted(row[1:] for row in fused_table_data.data) == [
+        [0, 8.0],
+        [1, 12.0],
+        [2, 12.0],
+    ]
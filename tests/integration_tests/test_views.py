@@ -13,6 +13,9 @@ local_node = nodes_communication.get_celery_app(local_node_id)
 local_node_create_view = nodes_communication.get_celery_create_view_signature(
     local_node
 )
+local_node_create_initial_views = (
+    nodes_communication.get_celery_create_initial_views_signature(local_node)
+)
 local_node_get_views = nodes_communication.get_celery_get_views_signature(local_node)
 local_node_get_view_data = nodes_communication.get_celery_get_table_data_signature(
     local_node
@@ -47,7 +50,7 @@ def test_create_and_get_view(context_id):
         pathology=pathology,
         datasets=datasets,
         columns=columns,
-        filters_json="filters",
+        filters_json=None,
     ).get()
     views = local_node_get_views.delay(context_id=context_id).get()
     assert view_name in views
@@ -72,3 +75,61 @@ def test_create_and_get_view(context_id):
     view_schema_json = local_node_get_view_schema.delay(table_name=view_name).get()
     view_schema = TableSchema.from_json(view_schema_json)
     assert view_schema == schema
+
+
+def test_create_initial_views(context_id):
+    variables = {"x": ["age_value"], "y": ["gcs_motor_response_scale"]}
+    views_names = local_node_create_initial_views.delay(
+        context_id=context_id,
+        command_id=str(pymonetdb.uuid.uuid1()).replace("-", ""),
+        pathology="tbi",
+        datasets=["edsd"],
+        variables=variables,
+        filters_json=None,
+    ).get()
+    assert set(views_names) == {"x", "y"}
+
+    views = local_node_get_views.delay(context_id=context_id).get()
+    for variable, view_name in views_names.items():
+        assert view_name in views
+        schema_json = local_node_get_view_schema.delay(table_name=view_name).get()
+        columns = [column.name for column in TableSchema.from_json(schema_json).columns]
+        assert columns == ["row_id"] + variables[variable]
+
+
+def test_create_view_with_filters(context_id):
+    filters = {
+        "condition": "AND",
+        "rules": [
+            {"id": "age_value", "operator": "greater", "value": 20},
+            {"id": "gender_type", "operator": "in", "value": ["M", "F"]},
+        ],
+    }
+    view_name = local_node_create_view.delay(
+        context_id=context_id,
+        command_id=str(pymonetdb.uuid.uuid1()).replace("-", ""),
+        pathology="tbi",
+        datasets=["dummy_tbi"],
+        columns=["age_value"],
+        filters_json=filters,
+    ).get()
+    view_data = TableData.from_json(
+        local_node_get_view_data.delay(table_name=view_name).get()
+    )
+    assert all(age_value > 20 for _, age_value in view_data.data)
+
+
+def test_create_view_with_invalid_filters(context_id):
+    filters = {
+        "condition": "AND",
+        "rules": [{"id": "not_a_cde", "operator": "equal", "value": 1}],
+    }
+    with pytest.raises(ValueError):
+        local_node_create_view.delay(
+            context_id=context_id,
+            command_id=str(pymonetdb.uuid.uuid1()).replace("-", ""),
+            pathology="tbi",
+            datasets=["dummy_tbi"],
+            columns=["age_value"],
+            filters_json=filters,
+        ).get()
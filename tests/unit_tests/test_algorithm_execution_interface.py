@@ -0,0 +1,393 @@
+import gc
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from mipengine import config
+
+from mipengine.common.node_tasks_DTOs import ColumnInfo
+from mipengine.common.node_tasks_DTOs import TableSchema
+from mipengine.common.node_tasks_DTOs import UDFArgument
+from mipengine.common.node_tasks_DTOs import UDFExecutionResult
+from mipengine.controller.algorithm_executor.AlgorithmExecutor import (
+    AlgorithmExecutor,
+)
+from mipengine.controller.algorithm_executor.AlgorithmExecutor import (
+    NodeDownAlgorithmExecutionException,
+)
+from mipengine.controller.algorithm_executor.AlgorithmExecutor import (
+    NodeTasksFailedException,
+)
+from mipengine.controller.algorithm_executor.AlgorithmExecutor import TableName
+
+AlgorithmExecutionInterface = AlgorithmExecutor.AlgorithmExecutionInterface
+
+SCHEMA = TableSchema([ColumnInfo("dim0", "int"), ColumnInfo("val", "real")])
+
+
+class FakeAsyncResult:
+    def __init__(self, result):
+        self.result = result
+
+    def ready(self):
+        return True
+
+    def failed(self):
+        return False
+
+    def get(self, timeout=None):
+        return self.result
+
+
+class FailedAsyncResult(FakeAsyncResult):
+    def failed(self):
+        return True
+
+
+class PendingAsyncResult(FakeAsyncResult):
+    def ready(self):
+        return False
+
+
+class FakeNode:
+    """
+    A node that records the udfs it is asked to run and returns a new table,
+    or the inline result, for each one. The tables it is asked to drop and its
+    clean up are recorded in the events.
+    """
+
+    def __init__(self, node_id, events=None):
+        self.node_id = node_id
+        self.initial_view_tables = {
+            "x": TableName(f"view_1_context_{node_id}"),
+        }
+        self.udf_calls = []
+        self.udf_args = []
+        self.events = events if events is not None else []
+        self.monetdb_socket_addr = None
+
+    def queue_run_udf(
+        self, command_id, func_name, positional_args, keyword_args, inline_result
+    ):
+        self.udf_calls.append((func_name, inline_result))
+        self.udf_args.append(
+            [UDFArgument.from_json(arg).value for arg in positional_args]
+        )
+        if inline_result:
+            udf_result = UDFExecutionResult(None, None, 1, 0.0, data=[[1.5]])
+        else:
+            udf_result = UDFExecutionResult(
+                f"table_{command_id}_context_{self.node_id}", SCHEMA, 1, 0.0
+            )
+        return FakeAsyncResult(udf_result)
+
+    def get_run_udf_result(self, async_result):
+        return async_result.get()
+
+    def queue_create_remote_table(self, table_info, native_node):
+        return FakeAsyncResult(None)
+
+    def create_merge_table(self, command_id, table_names):
+        return TableName(f"merge_{command_id}_context_{self.node_id}")
+
+    def queue_drop_tables(self, table_names):
+        self.events.append(
+            (
+                self.node_id,
+                "drop_tables",
+                [table_name.full_table_name for table_name in table_names],
+            )
+        )
+        return FakeAsyncResult(None)
+
+    def clean_up(self):
+        self.events.append((self.node_id, "clean_up"))
+
+    def dropped_tables(self):
+        return [
+            table_name
+            for node_id, event, *args in self.events
+            if node_id == self.node_id and event == "drop_tables"
+            for table_name in args[0]
+        ]
+
+
+def create_interface(nodes, **kwargs):
+    return AlgorithmExecutionInterface(
+        global_node=None, local_nodes=nodes, algorithm_name="test", **kwargs
+    )
+
+
+def test_deferred_elementwise_udf_is_not_run():
+    nodes = [FakeNode("localnode1"), FakeNode("localnode2")]
+    interface = create_interface(nodes, deferred=True)
+    x = interface.initial_view_tables["x"]
+
+    result = interface.run_udf_on_local_nodes(
+        func_name="sql.tensor1_add", positional_args={"t1": x, "t2": x}
+    )
+
+    assert isinstance(result, AlgorithmExecutionInterface.DeferredLocalNodeTable)
+    assert all(node.udf_calls == [] for node in nodes)
+
+
+def test_deferred_chain_is_fused_in_the_order_of_the_unfused_udfs():
+    nodes = [FakeNode("localnode1")]
+    interface = create_interface(nodes, deferred=True)
+    x = interface.initial_view_tables["x"]
+
+    # (10 - (x + x)) * x
+    doubled = interface.run_udf_on_local_nodes(
+        func_name="sql.tensor1_add", positional_args={"t1": x, "t2": x}
+    )
+    subtracted = interface.run_udf_on_local_nodes(
+        func_name="sql.const_tensor1_sub", positional_args={"c": 10, "t": doubled}
+    )
+    result = interface.run_udf_on_local_nodes(
+        func_name="sql.tensor1_mult", positional_args={"t1": subtracted, "t2": x}
+    )
+    result.nodes_tables
+
+    assert nodes[0].udf_calls == [("sql.fused_tensor1", None)]
+    expression, *tables = nodes[0].udf_args[0]
+    assert json.loads(expression) == [
+        "*",
+        ["-", ["const", 10], ["+", ["table", 0], ["table", 0]]],
+        ["table", 0],
+    ]
+    assert tables == [x.nodes_tables[nodes[0]].full_table_name]
+
+
+def test_deferred_table_has_the_attributes_of_the_materialized_table():
+    nodes = [FakeNode("localnode1")]
+    interface = create_interface(nodes, deferred=True)
+    x = interface.initial_view_tables["x"]
+
+    deferred_table = interface.run_udf_on_local_nodes(
+        func_name="sql.tensor1_add", positional_args={"t1": x, "t2": x}
+    )
+    assert not deferred_table.is_materialized
+
+    # set by LocalNodeTable.__init__, on the materialized table
+    nodes_tables = deferred_table._LocalNodeTable__nodes_tables
+
+    assert deferred_table.is_materialized
+    assert nodes_tables == deferred_table.local_node_table.nodes_tables
+
+
+def test_deferred_elementwise_udf_with_inline_result_is_run():
+    nodes = [FakeNode("localnode1"), FakeNode("localnode2")]
+    interface = create_interface(nodes, deferred=True)
+    x = interface.initial_view_tables["x"]
+
+    result = interface.run_udf_on_local_nodes(
+        func_name="sql.tensor1_add",
+        positional_args={"t1": x, "t2": x},
+        inline_result=True,
+    )
+
+    assert isinstance(result, AlgorithmExecutionInterface.LocalNodeData)
+    (column,) = result.get_table_data()
+    assert column.tolist() == [1.5, 1.5]
+    assert all(node.udf_calls == [("sql.tensor1_add", True)] for node in nodes)
+
+
+def test_unreachable_table_is_dropped():
+    nodes = [FakeNode("localnode1"), FakeNode("localnode2")]
+    interface = create_interface(nodes, drop_unreachable_tables=True)
+    x = interface.initial_view_tables["x"]
+
+    result = interface.run_udf_on_local_nodes(
+        func_name="test.func", positional_args={"t": x}
+    )
+    table_names = {
+        node: table_name.full_table_name
+        for node, table_name in result.nodes_tables.items()
+    }
+    gc.collect()
+    assert all(node.dropped_tables() == [] for node in nodes)
+
+    del result
+    gc.collect()
+    assert all(node.dropped_tables() == [table_names[node]] for node in nodes)
+
+
+def test_unreachable_tables_are_kept_when_disabled():
+    nodes = [FakeNode("localnode1")]
+    interface = create_interface(nodes)
+    x = interface.initial_view_tables["x"]
+
+    interface.run_udf_on_local_nodes(func_name="test.func", positional_args={"t": x})
+    gc.collect()
+
+    assert nodes[0].dropped_tables() == []
+
+
+def test_detached_tables_are_not_dropped():
+    nodes = [FakeNode("localnode1")]
+    interface = create_interface(nodes, drop_unreachable_tables=True)
+    x = interface.initial_view_tables["x"]
+
+    result = interface.run_udf_on_local_nodes(
+        func_name="test.func", positional_args={"t": x}
+    )
+    interface.detach_table_finalizers()
+    del result
+    gc.collect()
+
+    assert nodes[0].dropped_tables() == []
+
+
+def test_table_of_pending_deferred_table_is_kept():
+    nodes = [FakeNode("localnode1")]
+    interface = create_interface(nodes, deferred=True, drop_unreachable_tables=True)
+    x = interface.initial_view_tables["x"]
+
+    table = interface.run_udf_on_local_nodes(
+        func_name="test.func", positional_args={"t": x}
+    )
+    table_name = table.nodes_tables[nodes[0]].full_table_name
+    deferred_table = interface.run_udf_on_local_nodes(
+        func_name="sql.tensor1_add", positional_args={"t1": table, "t2": x}
+    )
+    del table
+    gc.collect()
+    assert nodes[0].dropped_tables() == []
+
+    # the fused udf reads the table when the deferred table is materialized
+    fused_table_name = deferred_table.nodes_tables[nodes[0]].full_table_name
+    assert nodes[0].udf_calls[-1] == ("sql.fused_tensor1", None)
+    del deferred_table
+    gc.collect()
+    assert sorted(nodes[0].dropped_tables()) == sorted([table_name, fused_table_name])
+
+
+def test_table_shared_to_global_is_kept_until_the_global_table_is_dropped():
+    events = []
+    global_node = FakeNode("globalnode", events)
+    nodes = [FakeNode("localnode1", events), FakeNode("localnode2", events)]
+    interface = AlgorithmExecutionInterface(
+        global_node=global_node,
+        local_nodes=nodes,
+        algorithm_name="test",
+        drop_unreachable_tables=True,
+    )
+    x = interface.initial_view_tables["x"]
+
+    global_table = interface.run_udf_on_local_nodes(
+        func_name="test.func", positional_args={"t": x}, share_to_global=True
+    )
+    (merge_table_name,) = global_table.node_table.values()
+    gc.collect()
+    assert events == []
+
+    del global_table
+    gc.collect()
+    local_table_names = [
+        table_name for node in nodes for table_name in node.dropped_tables()
+    ]
+    assert len(local_table_names) == 2
+    # the merge table is dropped before the remote tables it merges, and
+    # those before the local tables they point to
+    assert events[0] == (
+        "globalnode",
+        "drop_tables",
+        [merge_table_name.full_table_name, *local_table_names],
+    )
+    assert [event[0] for event in events[1:]] == ["localnode1", "localnode2"]
+
+
+def test_clean_up_detaches_the_finalizers_before_the_nodes_clean_up():
+    events = []
+    global_node = FakeNode("globalnode", events)
+    nodes = [FakeNode("localnode1", events)]
+    interface = AlgorithmExecutionInterface(
+        global_node=global_node,
+        local_nodes=nodes,
+        algorithm_name="test",
+        drop_unreachable_tables=True,
+    )
+    x = interface.initial_view_tables["x"]
+    result = interface.run_udf_on_local_nodes(
+        func_name="test.func", positional_args={"t": x}
+    )
+    executor = SimpleNamespace(
+        execution_interface=interface, global_node=global_node, local_nodes=nodes
+    )
+
+    AlgorithmExecutor.clean_up(executor)
+    del result
+    gc.collect()
+
+    assert events == [("globalnode", "clean_up"), ("localnode1", "clean_up")]
+
+
+def test_failed_udf_is_raised_with_its_node():
+    nodes = [FakeNode("localnode1"), FakeNode("localnode2")]
+    error = RuntimeError("udf failed")
+    nodes[1].queue_run_udf = lambda **kwargs: FailedAsyncResult(error)
+    interface = create_interface(nodes)
+    x = interface.initial_view_tables["x"]
+
+    with pytest.raises(NodeTasksFailedException) as exc_info:
+        interface.run_udf_on_local_nodes(
+            func_name="test.func", positional_args={"t": x}
+        )
+
+    assert exc_info.value.failed_nodes == {(nodes[1], "run_udf"): error}
+
+
+def test_udf_not_completed_in_time_is_raised_with_its_node(monkeypatch):
+    monkeypatch.setitem(config.controller, "celery_tasks_timeout", 0.05)
+    nodes = [FakeNode("localnode1"), FakeNode("localnode2")]
+    nodes[0].queue_run_udf = lambda **kwargs: PendingAsyncResult(None)
+    interface = create_interface(nodes)
+    x = interface.initial_view_tables["x"]
+
+    with pytest.raises(NodeTasksFailedException) as exc_info:
+        interface.run_udf_on_local_nodes(
+            func_name="test.func", positional_args={"t": x}
+        )
+
+    (((failed_node, _), timeout_error),) = exc_info.value.failed_nodes.items()
+    assert failed_node is nodes[0]
+    assert isinstance(timeout_error, TimeoutError)
+
+
+def create_initial_views(nodes):
+    executor = SimpleNamespace(local_nodes=nodes)
+    algorithm_request_dto = SimpleNamespace(
+        inputdata=SimpleNamespace(
+            pathology="dementia", datasets=["edsd"], x=["a"], y=["b"], filters=None
+        )
+    )
+    AlgorithmExecutor._create_initial_views(executor, algorithm_request_dto)
+
+
+def test_initial_views_are_set_on_all_the_nodes():
+    nodes = [FakeNode("localnode1"), FakeNode("localnode2")]
+    for node in nodes:
+        node.queue_create_initial_views = lambda **kwargs: FakeAsyncResult(
+            {"x": "view_2_context_localnode", "y": "view_3_context_localnode"}
+        )
+
+    create_initial_views(nodes)
+
+    assert all(set(node.initial_view_tables) == {"x", "y"} for node in nodes)
+
+
+def test_node_down_on_initial_views_cleans_up_the_rest():
+    events = []
+    nodes = [FakeNode("localnode1", events), FakeNode("localnode2", events)]
+    error = ConnectionError("node down")
+    nodes[0].queue_create_initial_views = lambda **kwargs: FailedAsyncResult(error)
+    nodes[1].queue_create_initial_views = lambda **kwargs: FakeAsyncResult(
+        {"x": "view_2_context_localnode2"}
+    )
+
+    with pytest.raises(NodeDownAlgorithmExecutionException) as exc_info:
+        create_initial_views(nodes)
+
+    assert exc_info.value.failed_nodes == {nodes[0]: error}
+    assert events == [("localnode2", "clean_up")]
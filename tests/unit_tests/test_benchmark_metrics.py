@@ -0,0 +1,81 @@
+from celery.result import AsyncResult
+from celery.signals import after_task_publish
+
+from mipengine.common.node_tasks_DTOs import ColumnInfo
+from mipengine.common.node_tasks_DTOs import TableInfo
+from mipengine.common.node_tasks_DTOs import TableSchema
+from mipengine.controller.algorithm_executor.AlgorithmExecutor import (
+    AlgorithmExecutor,
+)
+from tests.benchmarks.metrics import ControllerRecorder
+from tests.benchmarks.metrics import get_iteration_times
+from tests.benchmarks.metrics import get_message_size
+
+
+def test_get_iteration_times():
+    assert get_iteration_times([1.0, 3.0, 4.5], 5.0) == [2.0, 1.5, 0.5]
+    assert get_iteration_times([], 5.0) == []
+
+
+def test_get_message_size():
+    assert get_message_size("abc") == 3
+    assert get_message_size(b"abcd") == 4
+    assert get_message_size(["a", 1]) == len('["a", 1]')
+
+
+def test_recorder_counts_the_published_tasks():
+    with ControllerRecorder(iteration_marker="marker") as recorder:
+        after_task_publish.send(
+            sender="mipengine.node.tasks.udfs.run_udf", body=[[], {"a": 1}, {}]
+        )
+        after_task_publish.send(
+            sender="mipengine.node.tasks.udfs.run_udf", body=[[], {}, {}]
+        )
+    after_task_publish.send(sender="mipengine.node.tasks.udfs.run_udf", body=[])
+
+    assert recorder.round_trips == {"run_udf": 2}
+    assert recorder.bytes_sent == len('[[], {"a": 1}, {}]') + len("[[], {}, {}]")
+
+
+def test_recorder_estimates_the_shared_tables_bytes():
+    class NativeNode:
+        table_row_counts = {"table": 10}
+
+    queued_tables = []
+    original_method = AlgorithmExecutor.Node.queue_create_remote_table
+    try:
+        AlgorithmExecutor.Node.queue_create_remote_table = (
+            lambda node, table_info, native_node: queued_tables.append(table_info)
+        )
+        table_info = TableInfo(
+            name="table",
+            schema=TableSchema(
+                [
+                    ColumnInfo(name="a", data_type="REAL"),
+                    ColumnInfo(name="b", data_type="REAL"),
+                ]
+            ),
+        )
+        with ControllerRecorder(iteration_marker="marker") as recorder:
+            AlgorithmExecutor.Node.queue_create_remote_table(
+                None, table_info=table_info, native_node=NativeNode()
+            )
+    finally:
+        AlgorithmExecutor.Node.queue_create_remote_table = original_method
+
+    assert queued_tables == [table_info]
+    assert recorder.shared_tables_bytes == 10 * 2 * 8
+
+
+def test_recorder_restores_the_controller():
+    original_get = AsyncResult.get
+    original_run_udf = (
+        AlgorithmExecutor.AlgorithmExecutionInterface.run_udf_on_local_nodes
+    )
+    with ControllerRecorder(iteration_marker="marker"):
+        assert AsyncResult.get is not original_get
+    assert AsyncResult.get is original_get
+    assert (
+        AlgorithmExecutor.AlgorithmExecutionInterface.run_udf_on_local_nodes
+        is original_run_udf
+    )
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+from mipengine import config
+from mipengine.controller.celery_app import CeleryAppRegistry
+from mipengine.controller.celery_app import _get_pool_stats
+
+
+def test_celery_app_is_reused_per_node():
+    registry = CeleryAppRegistry()
+
+    celery_app = registry.get_celery_app("localnode1", "127.0.0.1:5670")
+
+    assert registry.get_celery_app("localnode1", "127.0.0.1:5670") is celery_app
+    assert registry.get_celery_app("localnode2", "127.0.0.1:5671") is not celery_app
+
+
+def test_new_celery_app_when_the_url_changes():
+    registry = CeleryAppRegistry()
+    celery_app = registry.get_celery_app("localnode1", "127.0.0.1:5670")
+
+    new_celery_app = registry.get_celery_app("localnode1", "127.0.0.1:5680")
+
+    assert new_celery_app is not celery_app
+    assert "127.0.0.1:5680" in new_celery_app.conf.broker_url
+    assert registry.get_celery_app("localnode1", "127.0.0.1:5680") is new_celery_app
+
+
+def test_replaced_celery_app_is_closed(monkeypatch):
+    registry = CeleryAppRegistry()
+    celery_app = registry.get_celery_app("localnode1", "127.0.0.1:5670")
+    closed_celery_apps = []
+    monkeypatch.setattr(
+        celery_app, "close", lambda: closed_celery_apps.append(celery_app)
+    )
+
+    registry.get_celery_app("localnode1", "127.0.0.1:5670")
+    assert closed_celery_apps == []
+
+    registry.get_celery_app("localnode1", "127.0.0.1:5680")
+    assert closed_celery_apps == [celery_app]
+
+
+def test_pool_stats():
+    registry = CeleryAppRegistry()
+    registry.get_celery_app("localnode1", "127.0.0.1:5670")
+    registry.get_celery_app("localnode1", "127.0.0.1:5680")
+
+    pool_stats = registry.get_pool_stats()
+
+    assert list(pool_stats) == ["localnode1"]
+    assert pool_stats["localnode1"]["limit"] == (
+        config.controller.celery.broker_pool_limit
+    )
+    assert pool_stats["localnode1"]["in_use"] == 0
+
+
+def test_pool_stats_without_the_pool_internals():
+    pool_stats = _get_pool_stats(SimpleNamespace(limit=10))
+
+    assert pool_stats == {"limit": 10, "in_use": None, "idle": None}
@@ -0,0 +1,103 @@
+import pandas
+import pytest
+
+from mipengine.common.common_data_elements import common_data_elements
+from mipengine.common.node_catalog import Nodes
+from mipengine.node.monetdb_interface.csv_validator import validate_csv
+from mipengine.utils.cohort_generator import assign_datasets_to_nodes
+from mipengine.utils.cohort_generator import generate_cohort
+from mipengine.utils.cohort_generator import get_pathology_datasets
+from mipengine.utils.cohort_generator import split_rows
+
+
+@pytest.fixture
+def cohort_path(tmp_path):
+    generate_cohort(
+        tmp_path,
+        pathologies=["dementia"],
+        rows=1000,
+        nodes=2,
+        datasets=["edsd", "ppmi", "demo_data"],
+        null_rate=0.1,
+    )
+    return tmp_path
+
+
+def test_generated_csvs_obey_the_metadata(cohort_path):
+    csv_file_paths = sorted(cohort_path.glob("localnode*/dementia/*.csv"))
+    assert len(csv_file_paths) == 3
+    for csv_file_path in csv_file_paths:
+        report = validate_csv(
+            csv_file_path, common_data_elements.pathologies["dementia"]
+        )
+        assert report.is_valid, str(report)
+
+
+def test_generated_rows_are_split_among_datasets(cohort_path):
+    rows = [
+        len(pandas.read_csv(csv_file_path))
+        for csv_file_path in cohort_path.glob("localnode*/dementia/*.csv")
+    ]
+    assert sorted(rows) == [333, 333, 334]
+
+
+def test_generated_node_catalog(cohort_path):
+    nodes = Nodes.from_json((cohort_path / "node_catalog.json").read_text())
+    assert nodes.globalNode.monetdbPort == "50000"
+    assert [local_node.nodeId for local_node in nodes.localNodes] == [
+        "localnode1",
+        "localnode2",
+    ]
+    assert [
+        local_node.data.pathologies[0].datasets for local_node in nodes.localNodes
+    ] == [["edsd", "demo_data"], ["ppmi"]]
+
+
+def test_generation_is_reproducible(cohort_path, tmp_path_factory):
+    other_cohort_path = tmp_path_factory.mktemp("other_cohort")
+    generate_cohort(
+        other_cohort_path,
+        pathologies=["dementia"],
+        rows=1000,
+        nodes=2,
+        datasets=["edsd", "ppmi", "demo_data"],
+        null_rate=0.1,
+    )
+    for csv_file_path in cohort_path.glob("localnode*/dementia/*.csv"):
+        other_csv_file_path = other_cohort_path / csv_file_path.relative_to(cohort_path)
+        assert csv_file_path.read_text() == other_csv_file_path.read_text()
+
+
+def test_numeric_columns_are_correlated(tmp_path):
+    generate_cohort(
+        tmp_path,
+        pathologies=["dementia"],
+        rows=2000,
+        datasets=["edsd"],
+        correlation=0.8,
+    )
+    data = pandas.read_csv(tmp_path / "localnode1" / "dementia" / "edsd.csv")
+    assert data["av45"].corr(data["fdg"]) > 0.5
+
+
+def test_unknown_datasets_are_rejected():
+    with pytest.raises(ValueError):
+        get_pathology_datasets("dementia", ["not_a_dataset"])
+
+
+@pytest.mark.parametrize(
+    "datasets_count, nodes_count, expected_nodes_datasets",
+    [
+        (3, 2, [[0, 2], [1]]),
+        (2, 3, [[0], [1], [0]]),
+        (1, 2, [[0], [0]]),
+    ],
+)
+def test_assign_datasets_to_nodes(datasets_count, nodes_count, expected_nodes_datasets):
+    assert (
+        assign_datasets_to_nodes(datasets_count, nodes_count) == expected_nodes_datasets
+    )
+
+
+def test_split_rows():
+    assert split_rows(10, 3) == [4, 3, 3]
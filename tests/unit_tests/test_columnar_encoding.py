@@ -0,0 +1,73 @@
+import numpy
+import pytest
+
+from mipengine.common.columnar_encoding import columns_to_rows
+from mipengine.common.columnar_encoding import concatenate_columns
+from mipengine.common.columnar_encoding import decode_table_data
+from mipengine.common.columnar_encoding import decode_table_data_b64
+from mipengine.common.columnar_encoding import encode_table_data
+from mipengine.common.columnar_encoding import encode_table_data_b64
+from mipengine.common.columnar_encoding import rows_to_columns
+from mipengine.common.node_tasks_DTOs import ColumnInfo
+from mipengine.common.node_tasks_DTOs import TableSchema
+
+SCHEMA = TableSchema(
+    [
+        ColumnInfo("col1", "int"),
+        ColumnInfo("col2", "real"),
+        ColumnInfo("col3", "text"),
+    ]
+)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        [],
+        [[1, 0.5, "a"], [2, 1.5, "βγ"], [3, -2.0, ""]],
+        [[1, None, "a"], [None, 1.5, None]],
+    ],
+)
+def test_encode_decode_table_data(data):
+    schema, columns = decode_table_data(encode_table_data(SCHEMA, data))
+    assert schema == SCHEMA
+    assert columns_to_rows(schema, columns) == data
+
+
+def test_decoded_numeric_columns_are_numpy_arrays():
+    data = [[1, 0.5, "a"], [2, 1.5, "b"]]
+    _, columns = decode_table_data_b64(encode_table_data_b64(SCHEMA, data))
+    assert columns["col1"].dtype == numpy.int64
+    assert columns["col2"].dtype == numpy.float64
+    assert list(columns["col3"]) == ["a", "b"]
+
+
+def test_decoded_column_with_nulls_is_masked():
+    data = [[1, None, "a"], [2, 1.5, "b"]]
+    _, columns = decode_table_data(encode_table_data(SCHEMA, data))
+    assert list(columns["col2"].mask) == [True, False]
+    assert columns["col2"][1] == 1.5
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        [],
+        [[1, 0.5, "a"], [2, 1.5, "βγ"], [3, -2.0, ""]],
+        [[1, None, "a"], [None, 1.5, None]],
+    ],
+)
+def test_rows_to_columns_like_decoded_columns(data):
+    _, decoded_columns = decode_table_data(encode_table_data(SCHEMA, data))
+    columns = rows_to_columns(SCHEMA, data)
+    for name, decoded_column in decoded_columns.items():
+        assert columns[name].dtype == decoded_column.dtype
+        assert type(columns[name]) is type(decoded_column)
+        assert columns[name].tolist() == decoded_column.tolist()
+
+
+def test_concatenate_columns_keeps_the_nulls_masked():
+    column = concatenate_columns(
+        [numpy.array([1.0]), numpy.ma.masked_array([0.0, 2.0], mask=[True, False])]
+    )
+    assert column.tolist() == [1.0, None, 2.0]
@@ -0,0 +1,79 @@
+from mipengine.node.monetdb_interface.csv_import_manifest import CSVManifestEntry
+from mipengine.node.monetdb_interface.csv_import_manifest import (
+    create_csv_manifest_entry,
+)
+from mipengine.node.monetdb_interface.csv_import_manifest import get_changed_csvs
+from mipengine.node.monetdb_interface.csv_import_manifest import (
+    plan_incremental_import,
+)
+
+
+def entry(csv_path, sha256, datasets=()):
+    return CSVManifestEntry(
+        csv_path=csv_path, size=10, sha256=sha256, datasets=set(datasets)
+    )
+
+
+def test_create_csv_manifest_entry(tmp_path):
+    (tmp_path / "dementia").mkdir()
+    csv_file_path = tmp_path / "dementia" / "edsd.csv"
+    csv_file_path.write_text("dataset\nedsd\n")
+    csv_entry = create_csv_manifest_entry(csv_file_path, tmp_path)
+    assert csv_entry.csv_path == "dementia/edsd.csv"
+    assert csv_entry.size == 13
+    assert len(csv_entry.sha256) == 64
+    assert create_csv_manifest_entry(csv_file_path, tmp_path) == csv_entry
+
+
+def test_get_changed_csvs():
+    manifest_entries = {"a.csv": entry("a.csv", "1"), "b.csv": entry("b.csv", "2")}
+    csv_entries = {
+        "a.csv": entry("a.csv", "1"),
+        "b.csv": entry("b.csv", "changed"),
+        "c.csv": entry("c.csv", "3"),
+    }
+    assert get_changed_csvs(csv_entries, manifest_entries) == ["b.csv", "c.csv"]
+
+
+def test_plan_incremental_import_without_changes():
+    manifest_entries = {"a.csv": entry("a.csv", "1", ["a"])}
+    csv_entries = {"a.csv": entry("a.csv", "1")}
+    import_plan = plan_incremental_import(csv_entries, manifest_entries)
+    assert not import_plan.has_changes
+    assert import_plan.replaced_datasets == set()
+
+
+def test_plan_incremental_import():
+    manifest_entries = {
+        "a.csv": entry("a.csv", "1", ["a"]),
+        "b.csv": entry("b.csv", "2", ["b"]),
+        "removed.csv": entry("removed.csv", "3", ["removed"]),
+    }
+    csv_entries = {
+        "a.csv": entry("a.csv", "1"),
+        "b.csv": entry("b.csv", "changed", ["b", "b2"]),
+        "new.csv": entry("new.csv", "4", ["new"]),
+    }
+    import_plan = plan_incremental_import(csv_entries, manifest_entries)
+    assert import_plan.csvs_to_import == ["b.csv", "new.csv"]
+    assert import_plan.removed_csvs == ["removed.csv"]
+    assert import_plan.replaced_datasets == {"b", "b2", "new", "removed"}
+
+
+def test_plan_incremental_import_reimports_csvs_of_replaced_datasets():
+    manifest_entries = {
+        "a.csv": entry("a.csv", "1", ["a"]),
+        "a_b.csv": entry("a_b.csv", "2", ["a", "b"]),
+        "b_c.csv": entry("b_c.csv", "3", ["b", "c"]),
+        "d.csv": entry("d.csv", "4", ["d"]),
+    }
+    csv_entries = {
+        "a.csv": entry("a.csv", "changed", ["a"]),
+        "a_b.csv": entry("a_b.csv", "2"),
+        "b_c.csv": entry("b_c.csv", "3"),
+        "d.csv": entry("d.csv", "4"),
+    }
+    import_plan = plan_incremental_import(csv_entries, manifest_entries)
+    assert import_plan.csvs_to_import == ["a.csv", "a_b.csv", "b_c.csv"]
+    assert import_plan.replaced_datasets == {"a", "b", "c"}
+    assert csv_entries["b_c.csv"].datasets == {"b", "c"}
@@ -0,0 +1,106 @@
+import pytest
+
+from mipengine.common.common_data_elements import CommonDataElement
+from mipengine.common.common_data_elements import MetadataEnumeration
+from mipengine.common.common_data_elements import MetadataVariable
+from mipengine.node.monetdb_interface.csv_validator import validate_csv
+
+
+def create_cde(sql_type, categorical=False, enumerations=None, min=None, max=None):
+    return CommonDataElement(
+        MetadataVariable(
+            code="code",
+            label="label",
+            sql_type=sql_type,
+            isCategorical=categorical,
+            enumerations=[
+                MetadataEnumeration(code=enumeration, label=enumeration)
+                for enumeration in enumerations or []
+            ],
+            min=min,
+            max=max,
+        )
+    )
+
+
+CDES = {
+    "dataset": create_cde("text", True, ["ds1", "ds2"]),
+    "age": create_cde("int", min=0, max=120),
+    "score": create_cde("real", max=1.5),
+    "grade": create_cde("int", True, ["1", "2"]),
+    "name": create_cde("text"),
+}
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    def _write_csv(content):
+        csv_file_path = tmp_path / "data.csv"
+        csv_file_path.write_text(content)
+        return csv_file_path
+
+    return _write_csv
+
+
+def test_validate_csv_valid(write_csv):
+    csv_file_path = write_csv(
+        "dataset,age,score,grade,name\n"
+        "ds1,10,0.5,1,a\n"
+        "ds2, 12.0 ,,2,\n"
+        "ds1,,1.5,,b\n"
+    )
+    report = validate_csv(csv_file_path, CDES)
+    assert report.is_valid
+
+
+def test_validate_csv_errors(write_csv):
+    csv_file_path = write_csv(
+        "dataset,age,score,grade,name\n"
+        "ds3,10,0.5,1,a\n"
+        "ds1,old,0.5,1,a\n"
+        ",130,2.5,3,a\n"
+        "ds1,10.5,high,2.0,a\n"
+    )
+    report = validate_csv(csv_file_path, CDES, chunk_size=2)
+    assert report.errors == {
+        ("dataset", "are not one of the enumerations"): (1, [2]),
+        ("dataset", "are empty"): (1, [4]),
+        ("age", "are not of type int"): (2, [3, 5]),
+        ("age", "are greater than the max 120"): (1, [4]),
+        ("score", "are greater than the max 1.5"): (1, [4]),
+        ("score", "are not of type real"): (1, [5]),
+        ("grade", "are not one of the enumerations"): (1, [4]),
+    }
+    assert "Column age: 2 values are not of type int, at rows: 3, 5" in str(report)
+
+
+def test_validate_csv_non_finite_numbers(write_csv):
+    csv_file_path = write_csv(
+        "dataset,age,score\nds1,10,inf\nds1,10,-inf\nds1,nan,0.5\n"
+    )
+    report = validate_csv(csv_file_path, CDES)
+    assert report.errors == {
+        ("age", "are not of type int"): (1, [4]),
+        ("score", "are not of type real"): (2, [2, 3]),
+    }
+
+
+def test_validate_csv_counts_rows_not_lines(write_csv):
+    csv_file_path = write_csv('dataset,age,name\nds1,10,"a\nb"\nds1,old,c\n')
+    report = validate_csv(csv_file_path, CDES)
+    assert report.errors == {("age", "are not of type int"): (1, [3])}
+
+
+def test_validate_csv_unknown_column(write_csv):
+    csv_file_path = write_csv("dataset,unknown\nds1,1\n")
+    report = validate_csv(csv_file_path, CDES)
+    assert report.errors == {("unknown", "does not exist in the metadata"): (1, [1])}
+
+
+def test_validate_csv_reports_first_lines(write_csv):
+    csv_file_path = write_csv("age\n" + "-1\n" * 15)
+    report = validate_csv(csv_file_path, CDES, chunk_size=4)
+    count, lines = report.errors[("age", "are less than the min 0")]
+    assert count == 15
+    assert lines == list(range(2, 12))
+    assert str(report).endswith("11, ...")
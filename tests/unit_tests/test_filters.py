@@ -0,0 +1,90 @@
+import pytest
+
+from mipengine.common.filters import build_filter_clause
+from mipengine.common.filters import load_filters
+from mipengine.common.filters import validate_filters
+
+PATHOLOGY = "tbi"
+
+
+def test_build_filter_clause():
+    filters = {
+        "condition": "AND",
+        "rules": [
+            {"id": "age_value", "operator": "greater_or_equal", "value": 20},
+            {
+                "condition": "OR",
+                "rules": [
+                    {"id": "gender_type", "operator": "equal", "value": "F"},
+                    {"id": "age_value", "operator": "between", "value": [5, 10]},
+                ],
+            },
+            {"id": "gcs_motor_response_scale", "operator": "is_not_null"},
+        ],
+    }
+    clause, parameters = build_filter_clause(filters, PATHOLOGY)
+    assert clause == (
+        "(age_value >= %(p0)s"
+        " AND (gender_type = %(p1)s OR age_value BETWEEN %(p2)s AND %(p3)s)"
+        " AND gcs_motor_response_scale IS NOT NULL)"
+    )
+    assert parameters == {"p0": 20, "p1": "F", "p2": 5, "p3": 10}
+
+
+def test_build_filter_clause_values_are_parameters():
+    filters = {
+        "condition": "AND",
+        "not": True,
+        "rules": [
+            {"id": "subjectcode", "operator": "contains", "value": "1'); DROP--%"},
+        ],
+    }
+    clause, parameters = build_filter_clause(filters, PATHOLOGY)
+    assert clause == "NOT (subjectcode LIKE %(p0)s ESCAPE '#')"
+    assert parameters == {"p0": "%1'); DROP--#%%"}
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {"condition": "AND", "rules": []},
+        {"condition": "XOR", "rules": [{"id": "age_value", "operator": "is_null"}]},
+        {"condition": "AND", "rules": [{"id": "age", "operator": "is_null"}]},
+        {"condition": "AND", "rules": [{"id": "age_value", "operator": "like"}]},
+        {"condition": "AND", "rules": [{"id": "age_value; --", "operator": "is_null"}]},
+        {
+            "condition": "AND",
+            "rules": [{"id": "age_value", "operator": "equal", "value": "old"}],
+        },
+        {
+            "condition": "AND",
+            "rules": [{"id": "gender_type", "operator": "equal", "value": "X"}],
+        },
+        {
+            "condition": "AND",
+            "rules": [{"id": "age_value", "operator": "between", "value": [1]}],
+        },
+        {
+            "condition": "AND",
+            "rules": [{"id": "age_value", "operator": "contains", "value": "1"}],
+        },
+    ],
+)
+def test_build_filter_clause_invalid_filters(filters):
+    with pytest.raises(ValueError):
+        build_filter_clause(filters, PATHOLOGY)
+
+
+def test_load_filters():
+    assert load_filters(None) is None
+    assert load_filters("") is None
+    assert load_filters('{"condition": "AND", "rules": []}') == {
+        "condition": "AND",
+        "rules": [],
+    }
+    with pytest.raises(ValueError):
+        load_filters("filters")
+
+
+def test_validate_filters_without_filters():
+    validate_filters(None, PATHOLOGY)
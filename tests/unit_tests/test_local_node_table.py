@@ -0,0 +1,134 @@
+import numpy
+import pytest
+
+from mipengine import config
+from mipengine.common.columnar_encoding import encode_table_data_b64
+from mipengine.common.node_tasks_DTOs import ColumnInfo
+from mipengine.common.node_tasks_DTOs import TableData
+from mipengine.common.node_tasks_DTOs import TableSchema
+from mipengine.controller.algorithm_executor.AlgorithmExecutor import (
+    AlgorithmExecutor,
+)
+from mipengine.controller.algorithm_executor.AlgorithmExecutor import TableName
+from mipengine.controller.algorithm_executor.table_schema_cache import (
+    TableSchemaCache,
+)
+
+Node = AlgorithmExecutor.Node
+LocalNodeTable = AlgorithmExecutor.AlgorithmExecutionInterface.LocalNodeTable
+LocalNodeData = AlgorithmExecutor.AlgorithmExecutionInterface.LocalNodeData
+
+SCHEMA = TableSchema(
+    [
+        ColumnInfo("col1", "int"),
+        ColumnInfo("col2", "real"),
+        ColumnInfo("col3", "text"),
+    ]
+)
+
+
+class FakeAsyncResult:
+    def __init__(self, result):
+        self.result = result
+
+    def ready(self):
+        return True
+
+    def failed(self):
+        return False
+
+    def get(self, timeout=None):
+        return self.result
+
+
+class FakeNode:
+    """
+    A node with the table data methods of the controller's Node, whose tasks
+    return the given rows in the requested encoding.
+    """
+
+    get_table_data = Node.get_table_data
+    queue_get_table_columns = Node.queue_get_table_columns
+    get_table_columns_result = Node.get_table_columns_result
+
+    def __init__(self, data):
+        self.data = data
+        self.table_schema_cache = TableSchemaCache()
+        self.task_signatures_str = {
+            "get_table_data": "get_table_data",
+            "get_table_data_columnar": "get_table_data_columnar",
+        }
+        self._Node__celery_obj = self
+        self.task_names = []
+
+    def signature(self, task_name):
+        self.task_name = task_name
+        self.task_names.append(task_name)
+        return self
+
+    def delay(self, table_name):
+        if self.task_name == "get_table_data_columnar":
+            return FakeAsyncResult(encode_table_data_b64(SCHEMA, self.data))
+        return FakeAsyncResult(TableData(SCHEMA, self.data).to_json())
+
+
+@pytest.fixture(params=["columnar", "json"])
+def table_data_encoding(request, monkeypatch):
+    monkeypatch.setitem(config.controller, "table_data_encoding", request.param)
+    return request.param
+
+
+def test_local_node_table_data_is_stacked_by_column(table_data_encoding):
+    node_1 = FakeNode([[1, 0.5, "a"], [2, None, "b"]])
+    node_2 = FakeNode([[3, 2.5, None]])
+    local_node_table = LocalNodeTable(
+        {
+            node_1: TableName("table_1_context_localnode1"),
+            node_2: TableName("table_1_context_localnode2"),
+        }
+    )
+
+    col1, col2, col3 = local_node_table.get_table_data()
+
+    assert col1.dtype == numpy.dtype("<i8")
+    assert col1.tolist() == [1, 2, 3]
+    assert col2.dtype == numpy.dtype("<f8")
+    assert isinstance(col2, numpy.ma.MaskedArray)
+    assert col2.tolist() == [0.5, None, 2.5]
+    assert col3.dtype == object
+    assert col3.tolist() == ["a", "b", None]
+
+
+def test_local_node_table_column_without_nulls_is_not_masked(table_data_encoding):
+    local_node_table = LocalNodeTable(
+        {
+            FakeNode([[1, 0.5, "a"]]): TableName("table_1_context_localnode1"),
+            FakeNode([[2, 1.5, "b"]]): TableName("table_1_context_localnode2"),
+        }
+    )
+
+    _, col2, _ = local_node_table.get_table_data()
+
+    assert not isinstance(col2, numpy.ma.MaskedArray)
+    assert col2.tolist() == [0.5, 1.5]
+
+
+def test_local_node_data_is_stacked_by_column():
+    local_node_data = LocalNodeData({"node1": [[1, 0.5]], "node2": [[2, 1.5]]})
+
+    col1, col2 = local_node_data.get_table_data()
+
+    assert col1.dtype.kind == "i"
+    assert col1.tolist() == [1, 2]
+    assert col2.tolist() == [0.5, 1.5]
+
+
+def test_node_table_data_rows_are_transferred_as_rows(table_data_encoding):
+    node = FakeNode([[1, 0.5, "a"], [2, None, "b"]])
+    table_name = TableName("table_1_context_localnode1")
+
+    table_data = node.get_table_data(table_name)
+
+    assert node.task_names == ["get_table_data"]
+    assert table_data.data == [[1, 0.5, "a"], [2, None, "b"]]
+    assert node.table_schema_cache.get(table_name.full_table_name) == SCHEMA
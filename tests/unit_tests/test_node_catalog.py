@@ -0,0 +1,33 @@
+import json
+
+from mipengine.common.node_catalog import NODE_CATALOG_PATH_ENV_VAR
+from mipengine.common.node_catalog import NodeCatalog
+
+
+def test_node_catalog_of_the_environment(tmp_path, monkeypatch):
+    node_catalog_path = tmp_path / "node_catalog.json"
+    node = {"rabbitmqURL": "127.0.0.1:5670", "monetdbHostname": "127.0.0.1"}
+    node_catalog_path.write_text(
+        json.dumps(
+            {
+                "globalNode": {**node, "nodeId": "globalnode", "monetdbPort": "50000"},
+                "localNodes": [
+                    {
+                        **node,
+                        "nodeId": "localnode9",
+                        "monetdbPort": "50009",
+                        "data": {
+                            "pathologies": [{"name": "dementia", "datasets": ["edsd"]}]
+                        },
+                    }
+                ],
+            }
+        )
+    )
+    monkeypatch.setenv(NODE_CATALOG_PATH_ENV_VAR, str(node_catalog_path))
+
+    node_catalog = NodeCatalog()
+
+    assert node_catalog.get_global_node().nodeId == "globalnode"
+    assert node_catalog.get_local_node("localnode9").monetdbPort == "50009"
+    assert node_catalog.dataset_exists("dementia", "edsd")
@@ -0,0 +1,181 @@
+import re
+
+import pytest
+
+from mipengine import config
+from mipengine.node.monetdb_interface import views
+from mipengine.node.monetdb_interface.views import SHARED_VIEWS_REGISTRY
+
+VIEWS_COLUMNS = {"view_x": ["age_value"], "view_y": ["dataset"]}
+
+
+class FakeMonetDB:
+    """
+    Runs the statements of the shared views registry on a list of
+    (view_name, context_id, expires_at) rows, and keeps the names of the
+    existing views. The current timestamp is the one of the now attribute.
+    """
+
+    def __init__(self):
+        self.registry = None
+        self.views = set()
+        self.now = 0
+
+    def execute_in_transaction(self, func):
+        return func()
+
+    def execute(self, query, parameters=None):
+        query = " ".join(query.split())
+        if query.startswith(f"CREATE TABLE IF NOT EXISTS {SHARED_VIEWS_REGISTRY}"):
+            if self.registry is None:
+                self.registry = []
+        elif match := re.fullmatch(r"DROP VIEW IF EXISTS (\w+)", query):
+            self.views.discard(match.group(1))
+        elif match := re.fullmatch(
+            rf"INSERT INTO {SHARED_VIEWS_REGISTRY} VALUES \('(\w+)', '(\w+)', "
+            rf"CURRENT_TIMESTAMP \+ INTERVAL '(\d+)' SECOND\)",
+            query,
+        ):
+            view_name, context_id, expiry = match.groups()
+            self.registry.append((view_name, context_id, self.now + int(expiry)))
+        elif (
+            query == f"DELETE FROM {SHARED_VIEWS_REGISTRY} "
+            f"WHERE expires_at < CURRENT_TIMESTAMP"
+        ):
+            self.registry = [row for row in self.registry if row[2] >= self.now]
+        elif match := re.fullmatch(
+            rf"DELETE FROM {SHARED_VIEWS_REGISTRY} WHERE context_id = '(\w+)'", query
+        ):
+            self.registry = [row for row in self.registry if row[1] != match.group(1)]
+        else:
+            raise ValueError(f"Unexpected query: {query}")
+
+    def execute_with_result(self, query, parameters=None):
+        query = " ".join(query.split())
+        if query == f"SELECT 1 FROM tables WHERE name = '{SHARED_VIEWS_REGISTRY}'":
+            return [[1]] if self.registry is not None else []
+        if match := re.fullmatch(
+            rf"SELECT DISTINCT view_name FROM {SHARED_VIEWS_REGISTRY} "
+            rf"WHERE context_id = '(\w+)'",
+            query,
+        ):
+            return [
+                [view_name]
+                for view_name in sorted(
+                    {row[0] for row in self.registry if row[1] == match.group(1)}
+                )
+            ]
+        if match := re.fullmatch(
+            rf"SELECT 1 FROM {SHARED_VIEWS_REGISTRY} WHERE view_name = '(\w+)'", query
+        ):
+            return [[1] for row in self.registry if row[0] == match.group(1)]
+        if (
+            query == f"SELECT DISTINCT view_name FROM {SHARED_VIEWS_REGISTRY} "
+            f"WHERE expires_at < CURRENT_TIMESTAMP"
+        ):
+            return [
+                [view_name]
+                for view_name in sorted(
+                    {row[0] for row in self.registry if row[2] < self.now}
+                )
+            ]
+        raise ValueError(f"Unexpected query: {query}")
+
+
+@pytest.fixture
+def monetdb(monkeypatch):
+    monkeypatch.setitem(config.node, "shared_views_expiry", 3600)
+    monetdb = FakeMonetDB()
+    monkeypatch.setattr(views, "MonetDB", lambda: monetdb)
+
+    def create_view(view_name, pathology, datasets, columns, filters=None):
+        monetdb.views.add(view_name)
+        monetdb.created_views.append(view_name)
+
+    monetdb.created_views = []
+    monkeypatch.setattr(views, "create_view", create_view)
+    return monetdb
+
+
+def acquire_views(context_id, datasets=("edsd",)):
+    return views.create_shared_views(
+        context_id, VIEWS_COLUMNS, "tbi", list(datasets), filters=None
+    )
+
+
+def test_acquire_creates_one_shared_view_per_view(monetdb):
+    acquired_views = acquire_views("context1")
+
+    assert set(acquired_views) == set(VIEWS_COLUMNS)
+    assert monetdb.views == set(acquired_views.values())
+    assert all("_shared_" in view_name for view_name in acquired_views.values())
+
+
+def test_acquired_views_are_shared_among_contexts(monetdb):
+    acquired_views = acquire_views("context1")
+
+    assert acquire_views("context2") == acquired_views
+    assert len(monetdb.created_views) == len(VIEWS_COLUMNS)
+
+
+def test_views_of_other_datasets_are_not_shared(monetdb):
+    acquired_views = acquire_views("context1")
+
+    other_acquired_views = acquire_views("context2", datasets=["ppmi"])
+
+    assert set(acquired_views.values()).isdisjoint(other_acquired_views.values())
+
+
+def test_release_keeps_the_views_used_by_other_contexts(monetdb):
+    acquired_views = acquire_views("context1")
+    acquire_views("context2")
+
+    views.release_shared_views("context1")
+
+    assert monetdb.views == set(acquired_views.values())
+
+
+def test_last_release_drops_the_views(monetdb):
+    acquire_views("context1")
+    acquire_views("context2")
+
+    views.release_shared_views("context1")
+    views.release_shared_views("context2")
+
+    assert monetdb.views == set()
+    assert monetdb.registry == []
+
+
+def test_release_without_registry(monetdb):
+    views.release_shared_views("context1")
+
+    assert monetdb.registry is None
+
+
+def test_release_drops_the_views_of_expired_references(monetdb):
+    acquire_views("context1")
+    monetdb.now += 3601
+    acquire_views("context2", datasets=["ppmi"])
+
+    views.release_shared_views("context2")
+
+    assert monetdb.views == set()
+    assert monetdb.registry == []
+
+
+def test_expired_references_do_not_keep_the_views(monetdb):
+    acquired_views = acquire_views("context1")
+    monetdb.now += 3601
+
+    assert acquire_views("context2") == acquired_views
+    assert len(monetdb.created_views) == 2 * len(VIEWS_COLUMNS)
+    assert {row[1] for row in monetdb.registry} == {"context2"}
+
+
+def test_unexpired_references_keep_the_views(monetdb):
+    acquired_views = acquire_views("context1")
+    monetdb.now += 3599
+
+    views.release_shared_views("context2")
+
+    assert monetdb.views == set(acquired_views.values())
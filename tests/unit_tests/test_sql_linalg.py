@@ -0,0 +1,132 @@
+import json
+
+import pytest
+
+from mipengine.node.udfgen import generate_udf_application_queries
+from mipengine.node.udfgen import get_udf_output_schema
+from mipengine.node.udfgen import ColumnInfo, TableInfo
+
+TABLENAME = "tablename"
+NODEID = "12345"
+
+TENSOR_SCHEMA = [
+    ColumnInfo("node_id", "text"),
+    ColumnInfo("dim0", "int"),
+    ColumnInfo("val", "real"),
+]
+
+EXPRESSION_fused_tensor1 = json.dumps(
+    ["+", ["table", 0], ["/", ["-", ["table", 1], ["const", 1]], ["table", 0]]]
+)
+QUERY_fused_tensor1 = """\
+DROP TABLE IF EXISTS tablename;
+CREATE TABLE tablename AS (
+    SELECT
+        CAST('12345' AS varchar(50)) AS node_id,
+        t0.dim0 AS dim0,
+        (t0.val + ((t1.val - 1.0) / t0.val)) AS val
+    FROM tens1 AS t0, tens2 AS t1
+    WHERE
+        t0.dim0=t1.dim0
+);"""
+
+
+def test_generate_fused_tensor1():
+    positional_args = [
+        EXPRESSION_fused_tensor1,
+        TableInfo("tens1", TENSOR_SCHEMA),
+        TableInfo("tens2", TENSOR_SCHEMA),
+    ]
+    udf_def, udf_query = generate_udf_application_queries(
+        "sql.fused_tensor1", positional_args, {}
+    )
+    assert udf_def.template == ""
+    assert (
+        udf_query.substitute(table_name=TABLENAME, node_id=NODEID)
+        == QUERY_fused_tensor1
+    )
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        ["+", ["table", 0], ["table", 1]],
+        ["%", ["table", 0], ["const", 2]],
+        ["-", ["const", "1; DROP TABLE tens1"], ["table", 0]],
+        ["*", ["const", "inf"], ["table", 0]],
+    ],
+)
+def test_generate_fused_tensor1_invalid_expression(expression):
+    positional_args = [json.dumps(expression), TableInfo("tens1", TENSOR_SCHEMA)]
+    with pytest.raises(ValueError):
+        generate_udf_application_queries("sql.fused_tensor1", positional_args, {})
+
+
+INT_TENSOR_SCHEMA = [
+    ColumnInfo("node_id", "text"),
+    ColumnInfo("dim0", "int"),
+    ColumnInfo("val", "int"),
+]
+
+
+@pytest.mark.parametrize(
+    "func_name, positional_args, expected_ndims, expected_dtype",
+    [
+        ("sql.zeros1", [3], 1, "real"),
+        (
+            "sql.tensor1_add",
+            [TableInfo("tens1", TENSOR_SCHEMA), TableInfo("tens2", INT_TENSOR_SCHEMA)],
+            1,
+            "real",
+        ),
+        (
+            "sql.tensor1_add",
+            [
+                TableInfo("tens1", INT_TENSOR_SCHEMA),
+                TableInfo("tens2", INT_TENSOR_SCHEMA),
+            ],
+            1,
+            "int",
+        ),
+        (
+            "sql.const_tensor1_sub",
+            ["10", TableInfo("tens1", INT_TENSOR_SCHEMA)],
+            1,
+            "int",
+        ),
+        (
+            "sql.const_tensor1_sub",
+            ["0.5", TableInfo("tens1", INT_TENSOR_SCHEMA)],
+            1,
+            "real",
+        ),
+        (
+            "sql.mat_transp_dot_diag_dot_mat",
+            [TableInfo("mat", TENSOR_SCHEMA), TableInfo("diag", TENSOR_SCHEMA)],
+            2,
+            "real",
+        ),
+        (
+            "sql.fused_tensor1",
+            [
+                json.dumps(["+", ["table", 0], ["table", 0]]),
+                TableInfo("tens1", INT_TENSOR_SCHEMA),
+            ],
+            1,
+            "int",
+        ),
+        (
+            "sql.fused_tensor1",
+            [EXPRESSION_fused_tensor1, TableInfo("tens1", INT_TENSOR_SCHEMA)],
+            1,
+            "real",
+        ),
+    ],
+)
+def test_sql_linalg_output_schema(
+    func_name, positional_args, expected_ndims, expected_dtype
+):
+    expected = [ColumnInfo("node_id", "text")]
+    expected += [ColumnInfo(f"dim{dim}", "int") for dim in range(expected_ndims)]
+    expected.append(ColumnInfo("val", expected_dtype))
+    assert get_udf_output_schema(func_name, positional_args, {}) == expected
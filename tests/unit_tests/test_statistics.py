@@ -0,0 +1,204 @@
+import pytest
+
+from mipengine.common.common_data_elements import CommonDataElement
+from mipengine.common.common_data_elements import MetadataEnumeration
+from mipengine.common.common_data_elements import MetadataVariable
+from mipengine.common.node_tasks_DTOs import ColumnStatistics
+from mipengine.node.monetdb_interface import statistics as statistics_module
+from mipengine.node.monetdb_interface.statistics import HISTOGRAM_BINS
+from mipengine.node.monetdb_interface.statistics import ColumnStatisticsAccumulator
+from mipengine.node.monetdb_interface.statistics import convert_statistics_to_parameters
+from mipengine.node.monetdb_interface.statistics import merge_column_statistics
+
+
+def create_cde(sql_type, categorical=False, enumerations=None, min=None, max=None):
+    return CommonDataElement(
+        MetadataVariable(
+            code="code",
+            label="label",
+            sql_type=sql_type,
+            isCategorical=categorical,
+            enumerations=[
+                MetadataEnumeration(code=enumeration, label=enumeration)
+                for enumeration in enumerations or []
+            ],
+            min=min,
+            max=max,
+        )
+    )
+
+
+CSV_HEADER = ["dataset", "age", "score", "grade", "name"]
+CDES = [
+    create_cde("text", True, ["ds1", "ds2"]),
+    create_cde("int", min=0, max=100),
+    create_cde("real"),
+    create_cde("int", True, ["1", "2"]),
+    create_cde("text"),
+]
+
+
+ROWS = [
+    ["ds1", "10", "0.5", "1", "a"],
+    ["ds1", "", "1.5", "1.0", ""],
+    ["ds1", "100", "", "2", "b"],
+    ["ds2", "54", "2", "2", "c"],
+]
+
+
+def accumulate_statistics(*batches):
+    accumulator = ColumnStatisticsAccumulator(CSV_HEADER, CDES)
+    for batch in batches:
+        accumulator.add_rows(batch)
+    return {
+        (column_statistics.dataset, column_statistics.column): column_statistics
+        for column_statistics in accumulator.get_statistics()
+    }
+
+
+@pytest.fixture
+def statistics():
+    return accumulate_statistics(ROWS)
+
+
+def test_statistics_are_kept_per_dataset_and_column(statistics):
+    assert set(statistics) == {
+        (dataset, column)
+        for dataset in ("ds1", "ds2")
+        for column in ("age", "score", "grade", "name")
+    }
+
+
+def test_numeric_statistics(statistics):
+    age = statistics[("ds1", "age")]
+    assert age.count == 2
+    assert age.nulls == 1
+    assert age.sum == 110
+    assert age.sum_of_squares == 10100
+    assert age.min == 10
+    assert age.max == 100
+    assert age.frequencies is None
+
+
+def test_histogram_bins_between_cde_min_and_max(statistics):
+    age = statistics[("ds1", "age")]
+    assert len(age.histogram) == HISTOGRAM_BINS
+    assert age.histogram_bin_edges[0] == 0
+    assert age.histogram_bin_edges[-1] == 100
+    assert age.histogram[2] == 1
+    assert age.histogram[-1] == 1
+    assert sum(age.histogram) == age.count
+
+
+def test_no_histogram_without_cde_min_and_max(statistics):
+    assert statistics[("ds1", "score")].histogram is None
+    assert statistics[("ds1", "score")].histogram_bin_edges is None
+
+
+def test_categorical_frequencies(statistics):
+    assert statistics[("ds1", "grade")].frequencies == {"1": 2, "2": 1}
+    assert statistics[("ds2", "grade")].frequencies == {"2": 1}
+
+
+def test_text_statistics(statistics):
+    name = statistics[("ds1", "name")]
+    assert name.count == 2
+    assert name.nulls == 1
+    assert name.sum is None
+    assert name.frequencies is None
+
+
+def test_statistics_of_many_batches_add_up(statistics):
+    assert accumulate_statistics(ROWS[:1], ROWS[1:3], [], ROWS[3:]) == statistics
+
+
+def test_datasets_of_the_rows():
+    accumulator = ColumnStatisticsAccumulator(CSV_HEADER, CDES)
+    accumulator.add_rows([[" ds1 ", "1", "", "", ""], ["ds2", "", "", "", ""]])
+    assert accumulator.datasets == {"ds1", "ds2"}
+
+
+def test_merge_column_statistics():
+    statistics = ColumnStatistics(
+        dataset="ds1",
+        column="grade",
+        count=3,
+        nulls=1,
+        sum=4.0,
+        sum_of_squares=6.0,
+        min=1.0,
+        max=2.0,
+        frequencies={"1": 2, "2": 1},
+        histogram=[2, 1],
+        histogram_bin_edges=[1.0, 1.5, 2.0],
+    )
+    other_statistics = ColumnStatistics(
+        dataset="ds1",
+        column="grade",
+        count=1,
+        nulls=0,
+        sum=3.0,
+        sum_of_squares=9.0,
+        min=3.0,
+        max=3.0,
+        frequencies={"3": 1},
+        histogram=[0, 1],
+        histogram_bin_edges=[1.0, 1.5, 2.0],
+    )
+    merged = merge_column_statistics(statistics, other_statistics)
+    assert merged.count == 4
+    assert merged.nulls == 1
+    assert merged.sum == 7.0
+    assert merged.sum_of_squares == 15.0
+    assert merged.min == 1.0
+    assert merged.max == 3.0
+    assert merged.frequencies == {"1": 2, "2": 1, "3": 1}
+    assert merged.histogram == [2, 2]
+    assert statistics.frequencies == {"1": 2, "2": 1}
+
+
+def test_merge_column_statistics_with_only_nulls():
+    statistics = ColumnStatistics(dataset="ds1", column="score", sum=1.0, min=1.0)
+    other_statistics = ColumnStatistics(dataset="ds1", column="score", nulls=2)
+    merged = merge_column_statistics(statistics, other_statistics)
+    assert merged.sum == 1.0
+    assert merged.min == 1.0
+    assert merged.nulls == 2
+
+
+def test_convert_statistics_to_parameters(statistics):
+    parameters = convert_statistics_to_parameters(
+        "dementia/data.csv", statistics[("ds1", "grade")]
+    )
+    assert parameters["csv_path"] == "dementia/data.csv"
+    assert parameters["frequencies"] == '{"1": 2, "2": 1}'
+    assert parameters["histogram"] is None
+
+
+class FakeMonetDB:
+    def __init__(self):
+        self.queries = []
+
+    def execute_with_result(self, query, parameters=None):
+        self.queries.append((query, parameters))
+        return []
+
+
+@pytest.fixture
+def monetdb(monkeypatch):
+    monetdb = FakeMonetDB()
+    monkeypatch.setattr(statistics_module, "MonetDB", lambda: monetdb)
+    return monetdb
+
+
+def test_statistics_of_no_datasets(monetdb):
+    assert statistics_module.get_datasets_statistics("dementia", []) == []
+    assert monetdb.queries == []
+
+
+def test_datasets_are_query_parameters(monetdb):
+    statistics_module.get_datasets_statistics("dementia", ["edsd", "ppmi"])
+
+    ((query, parameters),) = monetdb.queries
+    assert "edsd" not in query
+    assert parameters == {"dataset0": "edsd", "dataset1": "ppmi"}
@@ -0,0 +1,52 @@
+from mipengine import config
+from mipengine.common.node_tasks_DTOs import ColumnInfo
+from mipengine.common.node_tasks_DTOs import TableSchema
+from mipengine.controller.algorithm_executor.table_schema_cache import (
+    TableSchemaCache,
+)
+from mipengine.controller.algorithm_executor.table_schema_cache import (
+    create_table_schema_cache,
+)
+
+SCHEMA = TableSchema([ColumnInfo("col1", "int")])
+
+
+def test_get_missing_table_schema():
+    assert TableSchemaCache().get("table_1_2_localnode1") is None
+
+
+def test_put_and_get_table_schema():
+    cache = TableSchemaCache()
+    cache.put("table_1_2_localnode1", SCHEMA)
+    assert cache.get("table_1_2_localnode1") == SCHEMA
+
+
+def test_least_recently_used_table_schema_is_evicted():
+    cache = TableSchemaCache(max_size=2)
+    cache.put("table_1_2_localnode1", SCHEMA)
+    cache.put("table_2_2_localnode1", SCHEMA)
+    cache.get("table_1_2_localnode1")
+    cache.put("table_3_2_localnode1", SCHEMA)
+
+    assert len(cache) == 2
+    assert cache.get("table_1_2_localnode1") == SCHEMA
+    assert cache.get("table_2_2_localnode1") is None
+
+
+def test_every_experiment_has_its_own_cache(monkeypatch):
+    monkeypatch.setitem(config.controller, "table_schema_cache_size", 2)
+    cache = create_table_schema_cache()
+    cache.put("view_1_shared_localnode1", SCHEMA)
+
+    other_cache = create_table_schema_cache()
+
+    assert other_cache.get("view_1_shared_localnode1") is None
+
+
+def test_cache_size_from_config(monkeypatch):
+    monkeypatch.setitem(config.controller, "table_schema_cache_size", 1)
+    cache = create_table_schema_cache()
+    cache.put("table_1_2_localnode1", SCHEMA)
+    cache.put("table_2_2_localnode1", SCHEMA)
+
+    assert len(cache) == 1
@@ -9,6 +9,8 @@ from mipengine.algorithms import TensorT
 from mipengine.algorithms import LiteralParameterT
 from mipengine.algorithms import ScalarT
 from mipengine.node.udfgen import generate_udf_application_queries
+from mipengine.node.udfgen import get_udf_output_schema
+from mipengine.node.udfgen import udf_returns_scalar
 from mipengine.node.udfgen import ColumnInfo, TableInfo
 
 Schema1 = TypeVar("Schema1")
@@ -280,3 +282,62 @@ def test_generate_udf(test_input, expected):
         udf_query.substitute(udf_name=UDFNAME, table_name=TABLENAME, node_id=NODEID)
         == exp_query
     )
+
+
+def test_generate_udf_inline_result():
+    _, udf_query = generate_udf_application_queries(
+        "test_udf_generator.to_scalar", POSARGS_to_scalar, {}, inline_result=True
+    )
+    assert udf_query.substitute(udf_name=UDFNAME) == (
+        """\
+SELECT
+    udfname(tens1.dim0, tens1.val, tens2.dim0, tens2.val)
+FROM
+    tens1, tens2
+WHERE
+    tens1.dim0=tens2.dim0;"""
+    )
+
+
+def test_udf_returns_scalar():
+    assert udf_returns_scalar("test_udf_generator.to_scalar")
+    assert not udf_returns_scalar("test_udf_generator.table_to_tensor")
+    assert not udf_returns_scalar("sql.tensor1_add")
+
+
+@pytest.mark.parametrize(
+    "func_name, positional_args, expected",
+    [
+        (
+            "test_udf_generator.relations_to_relation",
+            POSARGS_relations_to_relation,
+            [
+                ColumnInfo("node_id", "text"),
+                ColumnInfo("col1", "int"),
+                ColumnInfo("col2", "real"),
+            ],
+        ),
+        (
+            "test_udf_generator.table_to_tensor",
+            POSARGS_table_to_tensor,
+            [
+                ColumnInfo("node_id", "text"),
+                ColumnInfo("dim0", "int"),
+                ColumnInfo("dim1", "int"),
+                ColumnInfo("val", "real"),
+            ],
+        ),
+        (
+            "test_udf_generator.with_literal",
+            POSARGS_with_literal,
+            [
+                ColumnInfo("node_id", "text"),
+                ColumnInfo("dim0", "int"),
+                ColumnInfo("val", "real"),
+            ],
+        ),
+        ("test_udf_generator.to_scalar", POSARGS_to_scalar, None),
+    ],
+)
+def test_get_udf_output_schema(func_name, positional_args, expected):
+    assert get_udf_output_schema(func_name, positional_args, {}) == expected